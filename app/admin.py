@@ -0,0 +1,33 @@
+"""
+Proteção das rotas /admin/*: header X-Admin-Token igual ao ADMIN_TOKEN.
+
+Sem ADMIN_TOKEN configurado as rotas de admin ficam desligadas (403):
+diagnóstico de produção nunca fica aberto por esquecimento. As rotas
+/debug/* e o header X-SQL-Profile (app/profiling.py) usam o mesmo token.
+"""
+import hmac
+
+from fastapi import Header, HTTPException, status
+
+from app.config import ADMIN_TOKEN
+
+
+def is_admin_token(token: str | None) -> bool:
+    """Token confere com ADMIN_TOKEN (sempre False sem ADMIN_TOKEN)."""
+    # Comparação em tempo constante: não vaza o token byte a byte
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(
+        token.encode(), ADMIN_TOKEN.encode())
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    """Dependência FastAPI: `dependencies=[Depends(require_admin)]`."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Rotas de admin desligadas (defina ADMIN_TOKEN)",
+        )
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="X-Admin-Token inválido",
+        )
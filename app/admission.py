@@ -0,0 +1,287 @@
+"""
+Controle de admissão: limite de concorrência adaptativo (AIMD) + descarte.
+
+Sem isso, quando o banco fica lento os requests se acumulam no threadpool
+do Starlette esperando conexão do pool: a latência explode para todo
+mundo e nada é recusado, só atrasado. Aqui um limite de requests em
+andamento fica NA FRENTE das rotas que usam banco:
+
+- Coube no limite: segue. Não coube: 503 na hora com Retry-After (sem
+  thread, sem conexão, sem fila).
+- O limite se ajusta sozinho (AIMD, como o controle de congestionamento
+  do TCP):
+    * request rápido com o limite em uso: +1/limite (≈ +1 a cada
+      "limite" requests)
+    * latência de uma RESERVA acima de ADMISSION_TARGET_LATENCY_MS ou
+      espera por conexão (qualquer rota) acima de ADMISSION_TARGET_WAIT_MS:
+      x ADMISSION_BACKOFF (no máximo 1 corte por janela de latência alvo:
+      uma rajada de respostas lentas é o mesmo congestionamento)
+    * navegação lenta NÃO corta o limite: uma listagem pesada é lenta
+      mesmo com o banco folgado, e cortar por ela descartaria reservas.
+      Se ela segura conexões, a espera por conexão denuncia
+- Espera por conexão = início do request até o checkout da 1ª conexão
+  do pool: soma a fila do threadpool e a fila do pool, exatamente onde os
+  requests se acumulam.
+- Prioridade: reserva/cancelamento podem usar o limite inteiro; o resto
+  (navegação) só ADMISSION_BROWSE_SHARE dele. E só a reserva espera: sem
+  vaga, ela fica numa fila curta (até ADMISSION_CRITICAL_WAIT_MS) e a
+  próxima vaga liberada vai direto para ela; navegação nunca espera e não
+  entra enquanto houver reserva na fila. Sob pressão a navegação é
+  descartada primeiro e as confirmações de compra continuam passando.
+- Fora do limite: health/ready/metrics/admin (diagnóstico precisa
+  responder justamente na sobrecarga) e rotas longas (SSE, import, seed).
+
+/ready (readiness) responde 503 enquanto o worker está saturado: o load
+balancer para de mandar tráfego para ele. /health continua só "vivo".
+
+O estado é por worker (cada processo tem o seu limite e o seu pool).
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from contextvars import ContextVar
+from collections import deque
+from typing import Deque, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import (
+    ADMISSION_BACKOFF, ADMISSION_BROWSE_SHARE, ADMISSION_CONTROL, ADMISSION_CRITICAL_WAIT_MS,
+    ADMISSION_INITIAL_LIMIT, ADMISSION_MAX_LIMIT, ADMISSION_MIN_LIMIT, ADMISSION_TARGET_LATENCY_MS,
+    ADMISSION_TARGET_WAIT_MS, DB_MAX_OVERFLOW, DB_POOL_SIZE,
+)
+from app.metrics import (
+    ADMISSION_DECISIONS, ADMISSION_IN_FLIGHT, ADMISSION_LIMIT, DB_CONNECTION_WAIT,
+)
+
+CRITICAL = "critical"
+BROWSE = "browse"
+
+# Confirmação de compra: passa na frente da navegação
+_CRITICAL_ROUTES = re.compile(
+    r"^/tickets/(reserve|reserve-block|\d+/cancel)$")
+# Nunca limitadas: diagnóstico e requests longos (seguram a vaga por minutos)
+_EXEMPT_ROUTES = re.compile(
+    r"^/(health|ready|metrics|docs|redoc|openapi\.json|import|seed)$"
+    r"|^/(admin|debug)/"
+    r"|/stream$")
+
+# Depois de descartar algo, /ready fica 503 por esta janela (segundos)
+READY_SHED_WINDOW = 1.0
+
+# [início do request, espera até a 1ª conexão]. O threadpool do Starlette
+# copia o contexto: o listener de checkout (na thread) vê a MESMA lista.
+_request_wait: ContextVar[Optional[list]] = ContextVar("request_wait", default=None)
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Prioridade do request; None = fora do controle de admissão."""
+    if _EXEMPT_ROUTES.search(path):
+        return None
+    if method == "POST" and _CRITICAL_ROUTES.match(path):
+        return CRITICAL
+    return BROWSE
+
+
+class AdaptiveLimiter:
+    """Limite de requests em andamento ajustado por AIMD. Thread-safe."""
+
+    def __init__(self, initial: float = ADMISSION_INITIAL_LIMIT,
+                 min_limit: float = ADMISSION_MIN_LIMIT,
+                 max_limit: float = ADMISSION_MAX_LIMIT,
+                 target_latency: float = ADMISSION_TARGET_LATENCY_MS / 1000,
+                 target_wait: float = ADMISSION_TARGET_WAIT_MS / 1000,
+                 backoff: float = ADMISSION_BACKOFF,
+                 browse_share: float = ADMISSION_BROWSE_SHARE,
+                 critical_wait: float = ADMISSION_CRITICAL_WAIT_MS / 1000,
+                 clock=time.monotonic) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min(max(initial, min_limit), max_limit)
+        self.target_latency = target_latency
+        self.target_wait = target_wait
+        self.backoff = backoff
+        self.browse_share = browse_share
+        self.critical_wait = critical_wait
+        self.clock = clock
+        self.in_flight = 0
+        self.wait_ewma = 0.0
+        self.last_wait = float("-inf")
+        self.last_decrease = float("-inf")
+        self.last_shed = float("-inf")
+        self.engine: Optional[Engine] = None
+        # Reservas esperando vaga (futures do event loop, ordem de chegada)
+        self._waiters: "Deque[asyncio.Future]" = deque()
+        self._lock = threading.Lock()
+
+    def capacity(self, priority: str) -> float:
+        return self.limit if priority == CRITICAL else self.limit * self.browse_share
+
+    def try_acquire(self, priority: str) -> bool:
+        """Vaga agora ou nunca (sem esperar)."""
+        with self._lock:
+            # Com reserva na fila, a próxima vaga é dela
+            if self._waiters or self.in_flight + 1 > max(1.0, self.capacity(priority)):
+                return False
+            self.in_flight += 1
+            ADMISSION_IN_FLIGHT.set(value=self.in_flight)
+            return True
+
+    async def acquire(self, priority: str) -> bool:
+        """Vaga para o request; reserva pode esperar até `critical_wait`."""
+        if self.try_acquire(priority):
+            return True
+        if priority == CRITICAL and self.critical_wait > 0:
+            waiter = asyncio.get_running_loop().create_future()
+            with self._lock:
+                self._waiters.append(waiter)
+            try:
+                # A vaga chega já contada em in_flight (ver release)
+                return await asyncio.wait_for(waiter, self.critical_wait)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+        with self._lock:
+            self.last_shed = self.clock()
+        return False
+
+    def release(self, latency: float, wait: Optional[float],
+                priority: str = CRITICAL) -> None:
+        """
+        Fim do request: ajusta o limite pela espera por conexão e, só para
+        reservas, pela latência.
+        """
+        with self._lock:
+            in_use = self.in_flight
+            self._hand_over()
+            now = self.clock()
+            if wait is not None:
+                self.wait_ewma += 0.2 * (wait - self.wait_ewma)
+                self.last_wait = now
+            slow = priority == CRITICAL and latency > self.target_latency
+            congested = slow or (wait is not None and wait > self.target_wait)
+            if congested:
+                if now - self.last_decrease >= self.target_latency:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.last_decrease = now
+            elif in_use >= self.limit / 2:
+                # Só cresce se o limite está sendo usado (ocioso não prova nada)
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            ADMISSION_LIMIT.set(value=self.limit)
+
+    def _hand_over(self) -> None:
+        # Vaga liberada: direto para a 1ª reserva na fila (in_flight não
+        # muda) se ela couber no limite atual; senão a vaga some
+        while self._waiters and self.in_flight <= self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.set(value=self.in_flight)
+
+    def pool_usage(self) -> Optional[float]:
+        """Conexões em uso / capacidade do pool (None sem QueuePool)."""
+        pool = self.engine.pool if self.engine is not None else None
+        checkedout = getattr(pool, "checkedout", None)
+        if checkedout is None:
+            return None
+        return checkedout() / max(1, DB_POOL_SIZE + DB_MAX_OVERFLOW)
+
+    def status(self) -> dict:
+        with self._lock:
+            now = self.clock()
+            shedding = now - self.last_shed < READY_SHED_WINDOW
+            # Média de espera sem requests recentes não diz nada (e prenderia o
+            # /ready em 503 depois que o load balancer parou de mandar tráfego)
+            waiting = (now - self.last_wait < READY_SHED_WINDOW
+                       and self.wait_ewma > self.target_wait)
+            saturated = (self.in_flight >= self.limit * self.browse_share
+                         or shedding or waiting)
+            status = {
+                "ready": self.engine is not None and not saturated,
+                "limit": round(self.limit, 2),
+                "browse_limit": round(self.limit * self.browse_share, 2),
+                "in_flight": self.in_flight,
+                "critical_waiting": len(self._waiters),
+                "shedding": shedding,
+                "connection_wait_ms": round(self.wait_ewma * 1000, 2),
+            }
+        usage = self.pool_usage()
+        status["pool_usage"] = round(usage, 2) if usage is not None else None
+        return status
+
+
+limiter = AdaptiveLimiter()
+
+
+def _record_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    current = _request_wait.get()
+    if current is not None and current[1] is None:
+        current[1] = time.perf_counter() - current[0]
+        DB_CONNECTION_WAIT.observe(current[1])
+
+
+def instrument_admission(engine: Engine, target: AdaptiveLimiter = limiter) -> None:
+    """Mede a espera por conexão do pool e liga o /ready ao engine (idempotente)."""
+    target.engine = engine
+    if not event.contains(engine, "checkout", _record_checkout):
+        event.listen(engine, "checkout", _record_checkout)
+
+
+# ═══════════════════════════════════════════════════════════
+# ASGI
+# ═══════════════════════════════════════════════════════════
+
+_OVERLOADED_BODY = json.dumps(
+    {"detail": "Servidor sobrecarregado; tente novamente"}).encode()
+
+
+async def _shed(send) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(_OVERLOADED_BODY)).encode()),
+            (b"retry-after", b"1"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": _OVERLOADED_BODY})
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI puro: descarta antes de ocupar thread ou conexão."""
+
+    def __init__(self, app, target: AdaptiveLimiter = limiter,
+                 enabled: bool = ADMISSION_CONTROL) -> None:
+        self.app = app
+        self.limiter = target
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        priority = classify(scope["method"], scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.limiter.acquire(priority):
+            ADMISSION_DECISIONS.inc(priority, "shed")
+            await _shed(send)
+            return
+        ADMISSION_DECISIONS.inc(priority, "admitted")
+
+        wait = [time.perf_counter(), None]
+        token = _request_wait.set(wait)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_wait.reset(token)
+            self.limiter.release(time.perf_counter() - wait[0], wait[1], priority)
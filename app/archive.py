@@ -0,0 +1,228 @@
+"""
+Arquivamento frio de eventos passados.
+
+O job move eventos com `date < cutoff` (e seus tickets) para arquivos
+comprimidos em disco e apaga as linhas das tabelas vivas, em lotes.
+
+Formato dos arquivos (append-only, um arquivo por lote):
+    ARCHIVE_DIR/events-<min_id>-<max_id>-<timestamp>.json.gz
+    {"format": "columnar-v1",
+     "events":  {"id": [...], "name": [...], ...},
+     "tickets": {"id": [...], "event_id": [...], ...}}
+
+Colunar (uma lista por coluna) + gzip comprime bem e não exige dependência
+nova. O intervalo de ids no nome do arquivo permite pular arquivos numa
+busca por id sem abrir o conteúdo.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.config import ARCHIVE_DIR
+from app.models import Event, Ticket
+from app.rollups import clear_event_rollups, record_event_day
+from app.waitlist import clear_waitlists
+
+FORMAT = "columnar-v1"
+
+EVENT_COLUMNS = [
+    "id", "external_ref", "name", "description", "date", "price", "creator_id",
+]
+TICKET_COLUMNS = [
+    "id", "seat_number", "section", "row", "number", "price", "event_id",
+    "event_date", "is_reserved", "reserved_at", "user_id",
+]
+
+_SEGMENT_RE = re.compile(r"^events-(\d+)-(\d+)-\d+\.json\.gz$")
+
+
+def _encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _to_columns(rows, columns: List[str]) -> Dict[str, list]:
+    data: Dict[str, list] = {name: [] for name in columns}
+    for row in rows:
+        for name in columns:
+            data[name].append(_encode(row[name]))
+    return data
+
+
+def _from_columns(data: Dict[str, list]) -> List[dict]:
+    names = list(data)
+    return [dict(zip(names, values)) for values in zip(*data.values())]
+
+
+def write_segment(events: List[dict], tickets: List[dict],
+                  directory: Optional[Path] = None) -> Path:
+    """Grava um lote num arquivo novo (escrita atômica via rename)."""
+    directory = Path(directory or ARCHIVE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    ids = [event["id"] for event in events]
+    name = f"events-{min(ids)}-{max(ids)}-{datetime.utcnow():%Y%m%d%H%M%S%f}.json.gz"
+    path = directory / name
+    tmp_path = directory / f".{name}.tmp"
+
+    payload = {
+        "format": FORMAT,
+        "events": _to_columns(events, EVENT_COLUMNS),
+        "tickets": _to_columns(tickets, TICKET_COLUMNS),
+    }
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+        json.dump(payload, fh, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+def archive_events_before(
+    session: Session,
+    cutoff: datetime,
+    batch_size: int = 100,
+    directory: Optional[Path] = None,
+) -> dict:
+    """
+    Move eventos anteriores a `cutoff` para o arquivo frio, em lotes.
+
+    Cada lote: lê eventos + tickets -> grava o arquivo -> apaga do banco
+    (tickets, eventos, filas de espera, rollups de vendas e -1 no balde do
+    dia de cada evento) -> commit. Se o processo cair entre gravar e
+    apagar, o próximo run re-arquiva o mesmo lote; a leitura deduplica por
+    id de evento.
+    """
+    archived_events = 0
+    archived_tickets = 0
+    segments: List[str] = []
+
+    while True:
+        events = session.execute(
+            select(*[getattr(Event, name) for name in EVENT_COLUMNS])
+            .where(Event.date < cutoff)
+            .order_by(Event.id)
+            .limit(batch_size)
+        ).mappings().all()
+        if not events:
+            break
+
+        event_ids = [event["id"] for event in events]
+        tickets = session.execute(
+            select(*[getattr(Ticket, name) for name in TICKET_COLUMNS])
+            .where(Ticket.event_id.in_(event_ids))
+            .order_by(Ticket.id)
+        ).mappings().all()
+
+        path = write_segment(events, tickets, directory)
+
+        session.execute(delete(Ticket).where(Ticket.event_id.in_(event_ids)))
+        session.execute(delete(Event).where(Event.id.in_(event_ids)))
+        clear_waitlists(session, event_ids)  # evento passado: fila não serve mais
+        clear_event_rollups(session, event_ids)
+        for event in events:
+            record_event_day(session, event["date"], -1)  # sai do calendário
+        session.commit()
+
+        archived_events += len(events)
+        archived_tickets += len(tickets)
+        segments.append(path.name)
+
+    return {
+        "archived_events": archived_events,
+        "archived_tickets": archived_tickets,
+        "segments": segments,
+    }
+
+
+def iter_segments(directory: Optional[Path] = None,
+                  event_id: Optional[int] = None) -> Iterator[dict]:
+    """
+    Lê os arquivos do mais antigo para o mais novo.
+
+    Com `event_id`, só abre arquivos cujo intervalo de ids o contém.
+    """
+    directory = Path(directory or ARCHIVE_DIR)
+    if not directory.is_dir():
+        return
+
+    for path in sorted(directory.iterdir()):
+        match = _SEGMENT_RE.match(path.name)
+        if not match:
+            continue
+        if event_id is not None:
+            low, high = int(match.group(1)), int(match.group(2))
+            if not low <= event_id <= high:
+                continue
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            yield json.load(fh)
+
+
+def _summarize(event: dict, tickets: List[dict]) -> dict:
+    reserved = sum(1 for ticket in tickets if ticket["is_reserved"])
+    return {
+        **event,
+        "total_tickets": len(tickets),
+        "reserved_tickets": reserved,
+        "revenue": sum(t["price"] or 0 for t in tickets if t["is_reserved"]),
+    }
+
+
+def find_archived_event(event_id: int,
+                        directory: Optional[Path] = None) -> Optional[dict]:
+    """Evento arquivado + seus tickets (o arquivo mais recente vence)."""
+    found = None
+    for segment in iter_segments(directory, event_id=event_id):
+        events = _from_columns(segment["events"])
+        for event in events:
+            if event["id"] == event_id:
+                tickets = [
+                    ticket for ticket in _from_columns(segment["tickets"])
+                    if ticket["event_id"] == event_id
+                ]
+                found = {**_summarize(event, tickets), "tickets": tickets}
+    return found
+
+
+def search_archived_events(name: Optional[str] = None, limit: int = 50,
+                           directory: Optional[Path] = None) -> List[dict]:
+    """Lista eventos arquivados (filtro opcional por nome, sem tickets)."""
+    needle = name.lower() if name else None
+    results: Dict[int, dict] = {}
+    for segment in iter_segments(directory):
+        tickets_by_event: Dict[int, List[dict]] = {}
+        for ticket in _from_columns(segment["tickets"]):
+            tickets_by_event.setdefault(ticket["event_id"], []).append(ticket)
+
+        for event in _from_columns(segment["events"]):
+            if needle and needle not in (event["name"] or "").lower():
+                continue
+            results[event["id"]] = _summarize(
+                event, tickets_by_event.get(event["id"], []))
+
+    return [results[key] for key in sorted(results)][:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Arquiva eventos passados em arquivos comprimidos")
+    parser.add_argument("--before", required=True,
+                        help="Data de corte (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    from app.config import SessionLocal
+
+    cutoff = datetime.strptime(args.before, "%Y-%m-%d")
+    with SessionLocal() as session:
+        summary = archive_events_before(session, cutoff, args.batch_size)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""
+Backfill online em lotes para migrations (tabelas grandes, sem downtime).
+
+Um `UPDATE tickets SET ...` único dentro do upgrade() trava centenas de
+milhões de linhas até o commit, e a migration inteira roda numa transação
+só (migrations/env.py): as reservas ficam paradas esperando. Aqui:
+
+- Lotes por keyset na chave (id): `WHERE id > :ultimo AND id <= :fim`.
+  Cada lote é uma transação curta; o próximo começa onde o anterior parou
+  (sem OFFSET, sem varrer de novo o que já foi feito).
+- Checkpoint (tabela backfill_checkpoints) gravado NA MESMA transação do
+  lote: a migration interrompida (deploy cancelado, Ctrl+C, queda) volta
+  do último lote commitado ao rodar `alembic upgrade` de novo.
+- Throttle entre lotes e lock_timeout por lote (Postgres): o backfill
+  nunca fica na fila atrás de uma reserva segurando lock (e nem faz as
+  reservas seguintes esperarem por ele). Lote abortado por lock_timeout,
+  deadlock ou SQLite ocupado espera e roda de novo (app/retry.py).
+- Progresso e ETA no log a cada BACKFILL_PROGRESS_SECONDS, pelo espaço de
+  chaves já percorrido (sem COUNT(*) na tabela grande).
+- Limite superior fixo no início (max(id)): linhas novas já são gravadas
+  pela app com o valor novo (expand -> backfill -> contract).
+
+O UPDATE precisa ser idempotente (ex.: `WHERE coluna IS NULL`): um lote
+pode rodar 2x se cair entre o UPDATE e o commit.
+
+Índices: CREATE INDEX CONCURRENTLY não bloqueia escrita, mas não roda em
+transação nem em tabela particionada. `create_index_concurrently` sai da
+transação da migration e, em tabela particionada (tickets no Postgres),
+cria o índice vazio no pai (ON ONLY), um índice CONCURRENTLY por
+partição e anexa cada um.
+
+Re-rodar a migration precisa dar certo: `migration_backfill` commita o
+DDL anterior a ele, então uma migration interrompida no meio do backfill
+volta SEM o alembic_version atualizado e roda o upgrade() de novo do
+início. Todo passo antes do backfill precisa ser idempotente: use
+`add_column_if_missing` em vez de add_column (os helpers de índice já
+usam IF NOT EXISTS).
+
+Exemplo num arquivo de migrations/versions/ (python -m benchmarks.backfill_rerun
+roda exatamente este upgrade(), interrompe no meio e roda de novo):
+
+    from app.backfill import (
+        add_column_if_missing, create_index_concurrently, migration_backfill,
+    )
+
+    def upgrade() -> None:
+        add_column_if_missing("tickets", sa.Column("currency", sa.String(), nullable=True))
+        migration_backfill("tickets_currency", "tickets",
+                           "currency = 'BRL'", where="currency IS NULL",
+                           batch_size=5000, throttle=0.1)
+        create_index_concurrently("ix_tickets_currency", "tickets", ["currency"])
+
+Acompanhar / refazer do zero:
+    python -m app.backfill --status
+    python -m app.backfill --reset tickets_currency
+"""
+import argparse
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.config import (
+    BACKFILL_BATCH_SIZE, BACKFILL_LOCK_TIMEOUT_MS, BACKFILL_PROGRESS_SECONDS,
+    BACKFILL_THROTTLE_MS,
+)
+from app.models import BackfillCheckpoint
+from app.retry import RetryBudget, RetryPolicy, retry_transaction
+
+logger = logging.getLogger(__name__)
+
+# Um job só, longo: mais paciência que as rotas e orçamento que não acaba
+# (cada lote deposita 1 ficha)
+BATCH_RETRY_POLICY = RetryPolicy(attempts=10, base_delay=0.1, max_delay=5.0,
+                                 budget=RetryBudget(ratio=1.0, initial=10.0))
+
+
+def _format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class Backfill:
+    """UPDATE `set_sql` em `table` por lotes de chave, com checkpoint."""
+
+    def __init__(self, engine: Engine, name: str, table: str, set_sql: str,
+                 where: Optional[str] = None, key: str = "id",
+                 batch_size: int = BACKFILL_BATCH_SIZE,
+                 throttle: float = BACKFILL_THROTTLE_MS / 1000,
+                 lock_timeout_ms: int = BACKFILL_LOCK_TIMEOUT_MS,
+                 progress_every: float = BACKFILL_PROGRESS_SECONDS,
+                 params: Optional[dict] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size precisa ser >= 1")
+        self.engine = engine
+        self.name = name
+        self.table = table
+        self.batch_size = batch_size
+        self.throttle = throttle
+        self.lock_timeout_ms = lock_timeout_ms
+        self.progress_every = progress_every
+        self.params = params or {}
+        self.sleep = sleep
+        self.clock = clock
+
+        # set_sql/where são SQL da própria migration; só os nomes são citados
+        quote = engine.dialect.identifier_preparer.quote
+        table_sql, key_sql = quote(table), quote(key)
+        self._bounds_sql = text(f"SELECT min({key_sql}), max({key_sql}) FROM {table_sql}")
+        # Fim do lote: a `batch_size`-ésima chave depois do checkpoint (só índice)
+        self._batch_end_sql = text(
+            f"SELECT {key_sql} FROM {table_sql} "
+            f"WHERE {key_sql} > :low AND {key_sql} <= :upper "
+            f"ORDER BY {key_sql} LIMIT 1 OFFSET :offset")
+        condition = f" AND ({where})" if where else ""
+        self._update_sql = text(
+            f"UPDATE {table_sql} SET {set_sql} "
+            f"WHERE {key_sql} > :low AND {key_sql} <= :high{condition}")
+
+    def _start(self) -> Tuple[BackfillCheckpoint, Optional[int], Optional[int]]:
+        """Checkpoint (criado na 1ª vez) + (menor, maior) chave da tabela agora."""
+        with Session(self.engine) as session, session.begin():
+            first, last = session.execute(self._bounds_sql).one()
+            checkpoint = session.get(BackfillCheckpoint, self.name)
+            if checkpoint is None:
+                checkpoint = BackfillCheckpoint(
+                    name=self.name, table_name=self.table,
+                    last_key=(first - 1) if first is not None else 0)
+                session.add(checkpoint)
+            elif checkpoint.table_name != self.table:
+                raise ValueError(f"backfill {self.name!r} já existe para a tabela "
+                                 f"{checkpoint.table_name!r}")
+            session.flush()
+            session.expunge(checkpoint)
+        return checkpoint, first, last
+
+    @retry_transaction("backfill", policy=BATCH_RETRY_POLICY)
+    def _run_batch(self, session: Session, low: int, upper: int) -> Tuple[int, int]:
+        """Um lote: (última chave coberta, linhas atualizadas)."""
+        with session.begin():
+            if session.get_bind().dialect.name == "postgresql" and self.lock_timeout_ms:
+                session.execute(text(f"SET LOCAL lock_timeout = {int(self.lock_timeout_ms)}"))
+            high = session.execute(self._batch_end_sql, {
+                "low": low, "upper": upper, "offset": self.batch_size - 1}).scalar()
+            if high is None:  # último lote (menos de batch_size chaves)
+                high = upper
+            rows = session.execute(self._update_sql, {
+                **self.params, "low": low, "high": high}).rowcount
+            session.execute(
+                update(BackfillCheckpoint)
+                .where(BackfillCheckpoint.name == self.name)
+                .values(last_key=high,
+                        rows_updated=BackfillCheckpoint.rows_updated + max(rows, 0),
+                        batches=BackfillCheckpoint.batches + 1,
+                        updated_at=datetime.utcnow()))
+        return high, max(rows, 0)
+
+    def _finish(self) -> None:
+        with Session(self.engine) as session, session.begin():
+            session.execute(
+                update(BackfillCheckpoint)
+                .where(BackfillCheckpoint.name == self.name)
+                .values(finished_at=datetime.utcnow(), updated_at=datetime.utcnow()))
+
+    def run(self) -> Dict[str, object]:
+        """Roda (ou retoma) até a maior chave que existia no início."""
+        checkpoint, first, upper = self._start()
+        if checkpoint.finished_at is not None:
+            logger.info("backfill %s: já concluído em %s", self.name, checkpoint.finished_at)
+            return {"name": self.name, "rows": 0, "batches": 0, "resumed_from": None,
+                    "finished": True}
+
+        resumed_from = checkpoint.last_key if checkpoint.batches else None
+        if resumed_from is not None:
+            logger.info("backfill %s: retomando depois da chave %s (%s linhas já feitas)",
+                        self.name, resumed_from, checkpoint.rows_updated)
+        origin = (first - 1) if first is not None else 0
+        low = start_key = checkpoint.last_key
+        rows = batches = 0
+        started = last_report = self.clock()
+
+        with Session(self.engine) as session:
+            while upper is not None and low < upper:
+                low, updated = self._run_batch(session, low, upper)
+                rows += updated
+                batches += 1
+                now = self.clock()
+                if now - last_report >= self.progress_every:
+                    self._report(origin, start_key, low, upper, rows, now - started)
+                    last_report = now
+                if self.throttle > 0 and low < upper:
+                    self.sleep(self.throttle)
+
+        self._finish()
+        elapsed = self.clock() - started
+        logger.info("backfill %s: concluído, %s linhas em %s lotes (%.1fs)",
+                    self.name, rows, batches, elapsed)
+        return {"name": self.name, "rows": rows, "batches": batches,
+                "resumed_from": resumed_from, "finished": True,
+                "seconds": round(elapsed, 2)}
+
+    def _report(self, origin: int, start_key: int, current: int, upper: int,
+                rows: int, elapsed: float) -> None:
+        span = max(1, upper - origin)
+        done_here = current - start_key
+        speed = done_here / elapsed if elapsed > 0 else 0.0
+        eta = (upper - current) / speed if speed > 0 else None
+        logger.info("backfill %s: %.1f%% (chave %s de %s), %s linhas, %.0f linhas/s, ETA %s",
+                    self.name, 100.0 * (current - origin) / span, current, upper,
+                    rows, rows / elapsed if elapsed > 0 else 0.0, _format_eta(eta))
+
+
+# ═══════════════════════════════════════════════════════════
+# DENTRO DE UMA MIGRATION (alembic op)
+# ═══════════════════════════════════════════════════════════
+
+
+def add_column_if_missing(table: str, column) -> bool:
+    """
+    ADD COLUMN que pode rodar 2x (False se a coluna já existia).
+
+    Para o DDL antes de um `migration_backfill`: a 1ª execução já commitou
+    a coluna, e a migration retomada não pode falhar com "duplicate column".
+    """
+    from alembic import op
+    from sqlalchemy import inspect
+
+    if not op.get_context().as_sql:
+        existing = {col["name"] for col in inspect(op.get_bind()).get_columns(table)}
+        if column.name in existing:
+            logger.info("coluna %s.%s já existe (migration retomada)", table, column.name)
+            return False
+    with op.batch_alter_table(table, schema=None) as batch_op:
+        batch_op.add_column(column)
+    return True
+
+
+def migration_backfill(name: str, table: str, set_sql: str, **options) -> Dict[str, object]:
+    """
+    Backfill chamado de dentro do upgrade().
+
+    Commita o que a migration já fez (o ADD COLUMN precisa estar visível e
+    sem lock para os lotes, que usam outra conexão) e roda fora da
+    transação da migration. Por isso o DDL antes dele tem que ser
+    idempotente (`add_column_if_missing`): interrompida, a migration roda
+    de novo do início. Em `alembic upgrade --sql` não há banco:
+    só deixa um comentário no script.
+    """
+    from alembic import op
+
+    context = op.get_context()
+    if context.as_sql:
+        op.execute(f"-- backfill {name} em {table}: rode `alembic upgrade` online")
+        return {"name": name, "finished": False}
+    bind = op.get_bind()
+    with context.autocommit_block():
+        return Backfill(bind.engine, name, table, set_sql, **options).run()
+
+
+def _partitions(conn: Connection, table: str) -> Optional[List[str]]:
+    """Partições de `table` (None se ela não for particionada)."""
+    partitioned = conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :name"),
+        {"name": table}).scalar()
+    if not partitioned:
+        return None
+    return list(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name ORDER BY c.relname"), {"name": table}).scalars())
+
+
+def _drop_if_invalid(conn: Connection, index_name: str) -> None:
+    # CONCURRENTLY interrompido deixa o índice INVALID (existe, mas não é
+    # usado e o IF NOT EXISTS pularia): apaga para criar de novo
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"), {"name": index_name}).scalar()
+    if invalid:
+        quote = conn.dialect.identifier_preparer.quote
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {quote(index_name)}"))
+
+
+def create_index_concurrently(index_name: str, table: str, columns: Sequence[str],
+                              unique: bool = False, where: Optional[str] = None) -> None:
+    """CREATE INDEX sem bloquear escrita (Postgres); índice comum nos outros bancos."""
+    from alembic import op
+
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.create_index(index_name, table, list(columns), unique=unique,
+                        if_not_exists=True,
+                        sqlite_where=text(where) if where else None)
+        return
+
+    quote = bind.dialect.identifier_preparer.quote
+    unique_sql = "UNIQUE " if unique else ""
+    columns_sql = ", ".join(quote(column) for column in columns)
+    where_sql = f" WHERE {where}" if where else ""
+    with op.get_context().autocommit_block():
+        partitions = _partitions(bind, table)
+        if partitions is None:
+            _drop_if_invalid(bind, index_name)
+            bind.execute(text(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {quote(index_name)} "
+                f"ON {quote(table)} ({columns_sql}){where_sql}"))
+            return
+
+        # Pai: ON ONLY cria o índice vazio (inválido) sem tocar nas partições;
+        # fica válido sozinho quando a última partição é anexada
+        bind.execute(text(
+            f"CREATE {unique_sql}INDEX IF NOT EXISTS {quote(index_name)} "
+            f"ON ONLY {quote(table)} ({columns_sql}){where_sql}"))
+        for partition in partitions:
+            child = f"{partition}_{index_name}"[:63]
+            _drop_if_invalid(bind, child)
+            bind.execute(text(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {quote(child)} "
+                f"ON {quote(partition)} ({columns_sql}){where_sql}"))
+            bind.execute(text(
+                f"ALTER INDEX {quote(index_name)} ATTACH PARTITION {quote(child)}"))
+            logger.info("índice %s: partição %s pronta", index_name, partition)
+
+
+def drop_index_concurrently(index_name: str, table: str) -> None:
+    """DROP INDEX sem bloquear escrita (Postgres; índice de tabela particionada: DROP comum)."""
+    from alembic import op
+
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.drop_index(index_name, table_name=table, if_exists=True)
+        return
+    quote = bind.dialect.identifier_preparer.quote
+    with op.get_context().autocommit_block():
+        # Índice de tabela particionada não aceita CONCURRENTLY
+        concurrently = "" if _partitions(bind, table) is not None else "CONCURRENTLY "
+        bind.execute(text(f"DROP INDEX {concurrently}IF EXISTS {quote(index_name)}"))
+
+
+# ═══════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Checkpoints dos backfills de migration")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--status", action="store_true",
+                       help="Lista os backfills e até onde cada um foi")
+    group.add_argument("--reset", metavar="NOME",
+                       help="Apaga o checkpoint (o próximo upgrade refaz do início)")
+    args = parser.parse_args()
+
+    from app.config import SessionLocal
+
+    with SessionLocal() as session, session.begin():
+        if args.reset:
+            removed = session.execute(
+                delete(BackfillCheckpoint).where(BackfillCheckpoint.name == args.reset)).rowcount
+            print(f"{args.reset}: {'checkpoint apagado' if removed else 'não encontrado'}")
+            return
+        checkpoints = session.execute(
+            select(BackfillCheckpoint).order_by(BackfillCheckpoint.started_at)).scalars().all()
+        for checkpoint in checkpoints:
+            state = (f"concluído {checkpoint.finished_at:%Y-%m-%d %H:%M}"
+                     if checkpoint.finished_at else
+                     f"parado em {checkpoint.updated_at:%Y-%m-%d %H:%M}")
+            print(f"{checkpoint.name:<30} {checkpoint.table_name:<15} "
+                  f"chave {checkpoint.last_key:<12} {checkpoint.rows_updated:>12} linhas "
+                  f"{checkpoint.batches:>8} lotes  {state}")
+        if not checkpoints:
+            print("nenhum backfill registrado")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 import os
+import threading
+from typing import Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -8,31 +12,220 @@ DATABASE_URL = os.getenv(
     "sqlite:///./app.db"  # Cria arquivo app.db na raiz
 )
 
-if "sqlite" in DATABASE_URL:
-    # SQLite precisa desssa config para evitar "database is locked"
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-        echo=True
-    )
-else:
+# Arquivos frios de eventos passados (ver app/archive.py)
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+
+# Profiling de SQL (ver app/profiling.py)
+SQL_PROFILE = os.getenv("SQL_PROFILE", "0") == "1"
+SQL_NPLUSONE_THRESHOLD = int(os.getenv("SQL_NPLUSONE_THRESHOLD", "5"))
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+
+# Tracing (ver app/tracing.py): none | memory | file:/caminho/spans.ndjson
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "0.01"))
+
+# Warm-up no startup (ver app/warmup.py): conexões abertas antes do 1º request
+DB_WARMUP_CONNECTIONS = int(os.getenv("DB_WARMUP_CONNECTIONS", "2"))
+
+# Pool por processo. Com N workers o banco vê N x (size + overflow)
+# conexões: `python -m app.server` calcula esses valores pelo
+# max_connections do banco e repassa aos workers por estas variáveis.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+# Métricas multi-processo (ver app/metrics.py): cada worker grava um
+# snapshot aqui e o /metrics de qualquer worker soma todos
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+
+# PREPARE das queries quentes em cada conexão (Postgres + psycopg2, ver
+# app/queries.py). Desligue atrás de PgBouncer em modo transaction.
+DB_SERVER_PREPARE = os.getenv("DB_SERVER_PREPARE", "1") == "1"
+
+
+# Cadastro (ver app/passwords.py e app/bloom.py)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS",
+                                      str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+SCRYPT_N = int(os.getenv("SCRYPT_N", str(2 ** 14)))
+EMAIL_BLOOM_CAPACITY = int(os.getenv("EMAIL_BLOOM_CAPACITY", "1000000"))
+
+# Retry de transações abortadas por concorrência (ver app/retry.py)
+DB_RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "4"))
+DB_RETRY_BASE_DELAY_MS = float(os.getenv("DB_RETRY_BASE_DELAY_MS", "20"))
+DB_RETRY_MAX_DELAY_MS = float(os.getenv("DB_RETRY_MAX_DELAY_MS", "500"))
+DB_RETRY_BUDGET_RATIO = float(os.getenv("DB_RETRY_BUDGET_RATIO", "0.2"))
+
+# Visão de mês do calendário pela tabela event_day_buckets (mantida a cada
+# evento criado). Desligado: GROUP BY no índice (date, id) a cada request.
+# Ao ligar num banco já populado: python -m app.event_calendar --rebuild-buckets
+CALENDAR_DAY_BUCKETS = os.getenv("CALENDAR_DAY_BUCKETS", "1") == "1"
+
+# Feed SSE de disponibilidade (ver app/live.py): cada worker só vê os
+# próprios deltas; a cada LIVE_RESYNC_SECONDS o canal relê event_sales_totals
+# (0 = nunca, só faz sentido com um worker)
+LIVE_RESYNC_SECONDS = float(os.getenv("LIVE_RESYNC_SECONDS", "5"))
+
+# POST /import (ver app/importer.py): tamanho máximo do corpo gravado em disco
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Rotas /admin/* (header X-Admin-Token). Vazio = rotas de admin desligadas
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Diagnóstico de memória (ver app/memory.py): tracemalloc só sob demanda
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "1"))
+TRACEMALLOC_MAX_SECONDS = float(os.getenv("TRACEMALLOC_MAX_SECONDS", "300"))
+TRACEMALLOC_MAX_SNAPSHOTS = int(os.getenv("TRACEMALLOC_MAX_SNAPSHOTS", "4"))
+
+# Sessões de login (ver app/sessions.py). SESSION_BACKEND: memory | sql
+# (sql = compartilhado entre workers, tabela user_sessions)
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(12 * 3600)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "100000"))
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_CACHE_SECONDS = float(os.getenv("SESSION_CACHE_SECONDS", "60"))
+# 1 = reserva/cancelamento exigem Authorization: Bearer <token>
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "0") == "1"
+
+# Controle de admissão (ver app/admission.py): limite adaptativo de requests
+# em andamento por worker. Começa em 2x o pool (o excedente espera conexão)
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_INITIAL_LIMIT = float(os.getenv(
+    "ADMISSION_INITIAL_LIMIT", str(2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW))))
+ADMISSION_MIN_LIMIT = float(os.getenv("ADMISSION_MIN_LIMIT", "4"))
+# 40 = threads do threadpool do Starlette: acima disso só se ganha fila
+ADMISSION_MAX_LIMIT = float(os.getenv("ADMISSION_MAX_LIMIT", "40"))
+ADMISSION_TARGET_LATENCY_MS = float(os.getenv("ADMISSION_TARGET_LATENCY_MS", "500"))
+ADMISSION_TARGET_WAIT_MS = float(os.getenv("ADMISSION_TARGET_WAIT_MS", "100"))
+ADMISSION_BACKOFF = float(os.getenv("ADMISSION_BACKOFF", "0.9"))
+# Fração do limite que a navegação pode usar (o resto fica para reservas)
+ADMISSION_BROWSE_SHARE = float(os.getenv("ADMISSION_BROWSE_SHARE", "0.75"))
+# Quanto uma reserva espera por vaga antes do 503 (navegação não espera)
+ADMISSION_CRITICAL_WAIT_MS = float(os.getenv("ADMISSION_CRITICAL_WAIT_MS", "200"))
+
+# Backfills em lotes nas migrations (ver app/backfill.py); cada migration
+# pode passar outros valores. lock_timeout: um lote não fica na fila atrás
+# de uma reserva (e não trava as reservas que chegam depois dele)
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "1000"))
+BACKFILL_THROTTLE_MS = float(os.getenv("BACKFILL_THROTTLE_MS", "50"))
+BACKFILL_LOCK_TIMEOUT_MS = int(os.getenv("BACKFILL_LOCK_TIMEOUT_MS", "2000"))
+BACKFILL_PROGRESS_SECONDS = float(os.getenv("BACKFILL_PROGRESS_SECONDS", "10"))
+
+def _create_engine(url: str) -> Engine:
+    if "sqlite" in url and ":memory:" in url:
+        # Banco em memória só existe numa conexão: todas as threads compartilham
+        return create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            echo=True
+        )
+    if "sqlite" in url:
+        # Arquivo: 1 conexão por thread (compartilhar uma conexão entre requests
+        # concorrentes mistura transações e derruba o sqlite3). `timeout` espera
+        # o lock do arquivo em vez de falhar na hora com "database is locked".
+        return create_engine(
+            url,
+            connect_args={"check_same_thread": False, "timeout": 30},
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            echo=True
+        )
     # Para PostgreSQL (depois)
-    engine = create_engine(DATABASE_URL, echo=False)
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        echo=False
+    )
 
-# Criar sessão
-SessionLocal = sessionmaker(
-    bind=engine,
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker que cria o engine na primeira Session sem bind."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            get_engine()
+        return super().__call__(**local_kw)
+
+
+# Criar sessão (o bind entra quando o engine for criado)
+SessionLocal = _LazySessionmaker(
     autocommit=False,
     autoflush=False
 )
 
+# O engine NÃO é criado no import: importar a app (ferramentas, migrations,
+# testes) não abre pool nem lê driver. Ele nasce no lifespan da app
+# (init_engine) ou no primeiro uso (get_engine / `app.config.engine`).
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def init_engine(url: Optional[str] = None) -> Engine:
+    """Cria o engine (uma vez) e liga o SessionLocal a ele."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = _create_engine(url or DATABASE_URL)
+            SessionLocal.configure(bind=_engine)
+        return _engine
+
+
+def get_engine() -> Engine:
+    return _engine if _engine is not None else init_engine()
+
+
+def dispose_engine() -> None:
+    """Fecha o pool e esquece o engine (shutdown / depois de um fork)."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+            SessionLocal.configure(bind=None)
+
+
+def _reset_engine_after_fork() -> None:
+    # Conexões herdadas do processo pai não podem ser usadas no filho (os
+    # dois falariam no mesmo socket). close=False: só esquece o pool, sem
+    # fechar os sockets que o pai continua usando.
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engine_after_fork)
+
+
+def __getattr__(name: str):
+    # Compatibilidade: `from app.config import engine` continua funcionando,
+    # só que criando o engine na hora do import de quem pede
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 Base = declarative_base()
 
 
 def get_db():
-    db = SessionLocal()
+    from app.tracing import is_recording, tracer
+
+    if not is_recording():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+
+    # Trace amostrado: o checkout do pool vira um span próprio (espera por
+    # conexão). A Session usa a conexão já aberta; sem transação iniciada,
+    # `session.begin()` nas rotas continua controlando BEGIN/COMMIT.
+    with tracer.span("db.acquire_connection"):
+        connection = get_engine().connect()
+    db = SessionLocal(bind=connection)
     try:
         yield db
     finally:
         db.close()
+        connection.close()
@@ -0,0 +1,117 @@
+"""
+Calendário de eventos: listagem por faixa de datas e visão de mês.
+
+Listagem (GET /events?from=&to=): paginação KEYSET pelo índice
+ix_events_date_id (date, id). O cursor é a última (date, id) entregue;
+a próxima página pede `(date, id) > cursor`, então toda página custa o
+mesmo range scan curto, seja a 1ª ou a 500ª. No Postgres o índice inclui
+name e price: a listagem sai só do índice (index-only scan).
+
+Visão de mês (GET /events/calendar/{ano}/{mes}): eventos por dia.
+- CALENDAR_DAY_BUCKETS=1: lê ~30 linhas de event_day_buckets, mantida
+  por delta a cada evento criado (app/rollups.py)
+- desligado: COUNT ... GROUP BY dia sobre o mesmo índice
+
+Ligando os buckets num banco já populado:
+    python -m app.event_calendar --rebuild-buckets
+"""
+import argparse
+import base64
+import json
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.config import CALENDAR_DAY_BUCKETS
+from app.models import Event, EventDayBucket
+from app.rollups import rebuild_event_days
+
+Cursor = Tuple[datetime, int]  # última (date, id) entregue
+
+
+class InvalidCursor(ValueError):
+    """Cursor adulterado ou de outro formato."""
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """Opaco para o cliente: base64 de [date ISO, id]."""
+    raw = json.dumps([cursor[0].isoformat(), cursor[1]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(value: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        moment, event_id = json.loads(raw)
+        return datetime.fromisoformat(moment), int(event_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("cursor inválido") from exc
+
+
+def events_in_range(session: Session, start: datetime, end: datetime,
+                    limit: int = 50,
+                    after: Optional[Cursor] = None) -> Tuple[List[dict], Optional[str]]:
+    """Uma página de eventos em [start, end) por (date, id) + cursor da próxima."""
+    # 1ª página: "depois de (start, 0)" = tudo a partir de start (ids > 0)
+    after_date, after_id = after if after is not None else (start, 0)
+    # limit + 1: sabe se existe próxima página sem um COUNT
+    rows = queries.execute(session, queries.EVENTS_IN_RANGE, start=start, end=end,
+                           after_date=after_date, after_id=after_id,
+                           limit=limit + 1).all()
+    page = [{"id": row.id, "name": row.name, "date": row.date, "price": row.price}
+            for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor((last["date"], last["id"]))
+    return page, next_cursor
+
+
+def month_bounds(year: int, month: int) -> Tuple[date, date]:
+    """[1º dia do mês, 1º dia do mês seguinte)."""
+    first = date(year, month, 1)
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return first, following
+
+
+def month_view(session: Session, year: int, month: int) -> List[dict]:
+    """Eventos por dia do mês (só os dias com eventos)."""
+    first, following = month_bounds(year, month)
+    if CALENDAR_DAY_BUCKETS:
+        rows = session.execute(
+            select(EventDayBucket.day, EventDayBucket.event_count)
+            .where(EventDayBucket.day >= first,
+                   EventDayBucket.day < following,
+                   EventDayBucket.event_count > 0)
+            .order_by(EventDayBucket.day)).all()
+    else:
+        day = func.date(Event.date)
+        rows = session.execute(
+            select(day, func.count(Event.id))
+            .where(Event.date >= datetime.combine(first, datetime.min.time()),
+                   Event.date < datetime.combine(following, datetime.min.time()))
+            .group_by(day).order_by(day)).all()
+    return [{"day": value if isinstance(value, date) else date.fromisoformat(value),
+             "events": count} for value, count in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manutenção do calendário de eventos")
+    parser.add_argument("--rebuild-buckets", action="store_true",
+                        help="Recalcula event_day_buckets a partir de events")
+    args = parser.parse_args()
+    if not args.rebuild_buckets:
+        parser.error("nada a fazer (use --rebuild-buckets)")
+
+    from app.config import SessionLocal
+
+    with SessionLocal() as session, session.begin():
+        days = rebuild_event_days(session)
+    print(f"event_day_buckets: {days} dias recalculados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Export analítico em lote (reconciliação financeira).
+
+Em vez de hidratar milhões de objetos `Ticket`, lemos só as colunas
+necessárias em lotes grandes (server-side cursor no Postgres) e agregamos
+cada lote com NumPy:
+
+    lote -> arrays (event_id, price, is_reserved, reserved_at, event_date)
+         -> np.bincount por event_id  (total, vendidos, receita, lead time)
+         -> histograma global do lead time (percentis)
+
+A memória é limitada pelo tamanho do lote + um array por métrica indexado
+por event_id; o número de tickets não importa (100M linhas = mais lotes).
+
+"Latência de reserva" = lead time: horas entre a reserva e a data do
+evento (não guardamos o horário de abertura das vendas).
+
+NumPy (e pyarrow, só para Parquet) são importados sob demanda; ficam no
+extra `export` do pyproject:
+    pip install ".[export]"
+"""
+import argparse
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.models import Ticket
+
+DEFAULT_BATCH_SIZE = 100_000
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+# Bins log do lead time em horas: 1 min .. ~5 anos (+ underflow/overflow)
+_LEAD_BINS = 256
+_LEAD_MIN_HOURS = 1 / 60
+_LEAD_MAX_HOURS = 5 * 365 * 24
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError as exc:  # pragma: no cover - depende do ambiente
+        raise RuntimeError(
+            'O export analítico precisa do NumPy: pip install ".[export]"') from exc
+    return np
+
+
+class TicketAggregator:
+    """Acumula agregados por evento a partir de lotes colunares."""
+
+    def __init__(self) -> None:
+        np = _numpy()
+        self.np = np
+        self.size = 0
+        self.total = np.zeros(0, dtype=np.int64)
+        self.reserved = np.zeros(0, dtype=np.int64)
+        self.revenue = np.zeros(0, dtype=np.float64)
+        self.lead_sum = np.zeros(0, dtype=np.float64)
+        self.lead_edges = np.concatenate((
+            [-np.inf],
+            np.geomspace(_LEAD_MIN_HOURS, _LEAD_MAX_HOURS, _LEAD_BINS),
+        ))
+        self.lead_hist = np.zeros(len(self.lead_edges) + 1, dtype=np.int64)
+        self.rows = 0
+
+    def _grow(self, max_id: int) -> None:
+        np = self.np
+        if max_id < self.size:
+            return
+        new_size = max(max_id + 1, self.size * 2)
+        pad = new_size - self.size
+        self.total = np.concatenate((self.total, np.zeros(pad, np.int64)))
+        self.reserved = np.concatenate((self.reserved, np.zeros(pad, np.int64)))
+        self.revenue = np.concatenate((self.revenue, np.zeros(pad)))
+        self.lead_sum = np.concatenate((self.lead_sum, np.zeros(pad)))
+        self.size = new_size
+
+    def add_batch(self, event_id, price, is_reserved, lead_hours) -> None:
+        """
+        Soma um lote. `lead_hours` vale NaN para tickets não reservados.
+        Todas as operações são vetorizadas (nenhum loop Python por linha).
+        """
+        np = self.np
+        if len(event_id) == 0:
+            return
+        self._grow(int(event_id.max()))
+        n = self.size
+
+        self.total += np.bincount(event_id, minlength=n)
+        self.reserved += np.bincount(
+            event_id, weights=is_reserved, minlength=n).astype(np.int64)
+        self.revenue += np.bincount(
+            event_id, weights=price * is_reserved, minlength=n)
+
+        has_lead = ~np.isnan(lead_hours)
+        self.lead_sum += np.bincount(
+            event_id[has_lead], weights=lead_hours[has_lead], minlength=n)
+        bins = np.searchsorted(self.lead_edges, lead_hours[has_lead])
+        self.lead_hist += np.bincount(bins, minlength=len(self.lead_hist))
+        self.rows += len(event_id)
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        """Percentis do lead time estimados pelo histograma (erro < 1 bin)."""
+        np = self.np
+        count = int(self.lead_hist.sum())
+        if count == 0:
+            return {f"p{p:g}": None for p in PERCENTILES}
+
+        cumulative = np.cumsum(self.lead_hist)
+        edges = np.concatenate((self.lead_edges, [np.inf]))
+        result = {}
+        for p in PERCENTILES:
+            target = count * p / 100
+            idx = int(np.searchsorted(cumulative, target))
+            low, high = edges[idx - 1] if idx > 0 else -np.inf, edges[idx]
+            # Bins abertos (underflow/overflow) devolvem a borda finita
+            if not np.isfinite(low):
+                value = high if np.isfinite(high) else 0.0
+            elif not np.isfinite(high):
+                value = low
+            else:
+                before = cumulative[idx - 1] if idx > 0 else 0
+                inside = self.lead_hist[idx] or 1
+                value = low + (high - low) * (target - before) / inside
+            result[f"p{p:g}"] = round(float(value), 3)
+        return result
+
+    def per_event(self):
+        """Arrays finais por evento (só ids que têm tickets)."""
+        np = self.np
+        ids = np.nonzero(self.total)[0]
+        total = self.total[ids]
+        reserved = self.reserved[ids]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sell_through = np.where(total > 0, reserved / total, 0.0)
+            lead_mean = np.where(reserved > 0, self.lead_sum[ids] / reserved, np.nan)
+        return {
+            "event_id": ids,
+            "tickets": total,
+            "reserved": reserved,
+            "revenue": self.revenue[ids],
+            "sell_through": sell_through,
+            "lead_time_mean_hours": lead_mean,
+        }
+
+
+def _columns(rows, np):
+    """Lote de tuplas -> arrays NumPy (uma conversão por coluna)."""
+    event_id, price, is_reserved, reserved_at, event_date = zip(*rows)
+    reserved_at = np.array(reserved_at, dtype="datetime64[us]")
+    event_date = np.array(event_date, dtype="datetime64[us]")
+    lead = (event_date - reserved_at) / np.timedelta64(1, "h")
+    return (
+        np.array(event_id, dtype=np.int64),
+        np.array(price, dtype=np.float64),
+        np.array(is_reserved, dtype=np.float64),
+        lead.astype(np.float64),  # NaT -> NaN
+    )
+
+
+def aggregate_tickets(engine: Engine,
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> TicketAggregator:
+    """Varre `tickets` em lotes colunares e devolve os agregados."""
+    np = _numpy()
+    aggregator = TicketAggregator()
+    stmt = select(
+        Ticket.event_id,
+        Ticket.price,
+        Ticket.is_reserved,
+        Ticket.reserved_at,
+        Ticket.event_date,
+    ).where(Ticket.event_id.is_not(None))
+
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=batch_size).execute(stmt)
+        for rows in result.partitions(batch_size):
+            event_id, price, is_reserved, lead = _columns(rows, np)
+            price = np.nan_to_num(price)
+            is_reserved = np.nan_to_num(is_reserved)
+            aggregator.add_batch(event_id, price, is_reserved, lead)
+
+    return aggregator
+
+
+def write_csv(per_event: dict, path: Path) -> None:
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(list(per_event))
+        writer.writerows(zip(*(column.tolist() for column in per_event.values())))
+
+
+def write_parquet(per_event: dict, path: Path) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError(
+            'Saída Parquet precisa do pyarrow: pip install ".[export]"') from exc
+    pq.write_table(pa.table(per_event), path, compression="zstd")
+
+
+def export(engine: Engine, out_dir: Path, fmt: str = "csv",
+           batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """Roda o export completo: agregados por evento + resumo JSON."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    aggregator = aggregate_tickets(engine, batch_size)
+    per_event = aggregator.per_event()
+
+    events_path = out_dir / f"events.{fmt}"
+    if fmt == "parquet":
+        write_parquet(per_event, events_path)
+    else:
+        write_csv(per_event, events_path)
+
+    total = int(per_event["tickets"].sum())
+    reserved = int(per_event["reserved"].sum())
+    summary = {
+        "rows": aggregator.rows,
+        "events": len(per_event["event_id"]),
+        "tickets": total,
+        "reserved": reserved,
+        "revenue": round(float(per_event["revenue"].sum()), 2),
+        "sell_through": round(reserved / total, 4) if total else 0.0,
+        "lead_time_hours": aggregator.percentiles(),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "events_file": events_path.name,
+    }
+    (out_dir / "summary.json").write_text(json.dumps(summary, indent=2))
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Export analítico de tickets (agregados vetorizados)")
+    parser.add_argument("--out", default="./export", help="Diretório de saída")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app.config import engine
+
+    summary = export(engine, Path(args.out), args.format, args.batch_size)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""
+Import em lote do catálogo (eventos + mapas de assentos) a partir de CSV
+ou NDJSON, em streaming.
+
+O arquivo é lido linha a linha e processado em chunks de `chunk_size`
+registros; cada chunk é validado (mesmas regras do EventCreate), gravado
+com INSERT ... ON CONFLICT em lote e commitado. A memória depende do
+chunk, não do arquivo: 1 GB de catálogo = mais chunks.
+
+Registros (campo `type`):
+
+    event: external_ref, name, description, date, price, total_tickets,
+           creator_id, seated
+    seats: event_ref, section, row, first_number, last_number, price
+
+- Evento: upsert pelo external_ref (nome, descrição e preço são
+  atualizados). A data NÃO muda num re-import: os ingressos copiam
+  events.date (chave de partição); a linha é reportada como erro.
+- seated=false: `total_tickets` ingressos de pista (seção GA, fileira 1).
+- seats: um ingresso por número; ON CONFLICT no índice único do assento
+  (ix_tickets_event_seat) não duplica, e o preço dos assentos ainda
+  livres é atualizado.
+
+No CSV as colunas são a união dos dois tipos (vazias quando não se
+aplicam). Re-importar o mesmo arquivo é idempotente.
+
+Progresso e erros por linha saem como dicts (o POST /import manda cada
+um como uma linha NDJSON; a CLI imprime):
+
+    python -m app.importer catalogo.csv
+    python -m app.importer catalogo.ndjson --chunk-size 5000
+"""
+import argparse
+import csv
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import and_, bindparam, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import Event, Ticket
+from app.partitioning import ensure_ticket_partitions
+from app.rollups import record_event_day, record_inventory
+from app.schemas import EventImportRow, SeatRangeImportRow
+from app.seating import seat_index
+
+DEFAULT_CHUNK_SIZE = 1000
+# Ingressos por INSERT (o SQLAlchemy ainda quebra em páginas de VALUES)
+TICKET_BATCH_SIZE = 5000
+# Erros detalhados por import; depois disso só a contagem
+MAX_REPORTED_ERRORS = 1000
+# external_ref -> (id, date, price) já resolvidos (LRU)
+EVENT_CACHE_SIZE = 10_000
+
+GENERAL_ADMISSION = "GA"
+FORMATS = {"csv", "ndjson"}
+
+Record = Tuple[int, Optional[dict], Optional[str]]  # (linha, registro, erro)
+# (event_id, event_date, section, row, first, last, price, preço explícito?)
+SeatRange = Tuple[int, datetime, str, int, int, int, float, bool]
+
+
+def detect_format(filename: str, content_type: str = "") -> str:
+    """csv | ndjson pela extensão ou content-type (padrão: ndjson)."""
+    if filename.lower().endswith(".csv") or "csv" in content_type:
+        return "csv"
+    return "ndjson"
+
+
+# ═══════════════════════════════════════════════════════════
+# LEITURA EM STREAMING
+# ═══════════════════════════════════════════════════════════
+
+
+class _ByteCounter:
+    """
+    Linhas de texto de um arquivo binário, contando os bytes lidos.
+
+    Linha que não é UTF-8 válido não derruba o import: o leitor recebe uma
+    linha vazia no lugar (csv e ndjson pulam, a numeração continua certa) e
+    o erro fica em `bad_lines` até `take_bad_lines()`.
+    """
+
+    def __init__(self, raw) -> None:
+        self.raw = raw
+        self.bytes_read = 0
+        self.line_no = 0
+        self.bad_lines: List[Record] = []
+
+    def __iter__(self) -> Iterator[str]:
+        encoding = "utf-8-sig"  # BOM do Excel só na 1ª linha
+        for line in self.raw:
+            self.bytes_read += len(line)
+            self.line_no += 1
+            try:
+                text = line.decode(encoding)
+            except UnicodeDecodeError as exc:
+                self.bad_lines.append((self.line_no, None,
+                                       f"Linha não é UTF-8 válido: {exc}"))
+                text = "\n"
+            encoding = "utf-8"
+            yield text
+
+    def take_bad_lines(self) -> List[Record]:
+        bad, self.bad_lines = self.bad_lines, []
+        return bad
+
+
+def _read_csv(lines: _ByteCounter) -> Iterator[Record]:
+    reader = csv.DictReader(lines)
+    for record in reader:
+        # Coluna vazia = campo ausente (defaults do schema valem)
+        yield reader.line_num, {k: v for k, v in record.items()
+                                if k and v not in ("", None)}, None
+
+
+def _read_ndjson(lines: _ByteCounter) -> Iterator[Record]:
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_no, None, f"JSON inválido: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield line_no, record, None
+
+
+def _validate(record: dict):
+    kind = record.pop("type", None)
+    if kind == "event":
+        return EventImportRow.model_validate(record)
+    if kind == "seats":
+        return SeatRangeImportRow.model_validate(record)
+    raise ValueError(f"type deve ser 'event' ou 'seats' (recebido: {kind!r})")
+
+
+def _error_message(exc: Exception) -> List[str]:
+    if isinstance(exc, ValidationError):
+        return [f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()]
+    return [str(exc)]
+
+
+# ═══════════════════════════════════════════════════════════
+# GRAVAÇÃO EM LOTE
+# ═══════════════════════════════════════════════════════════
+
+
+def _insert(session: Session):
+    dialect = session.get_bind().dialect.name
+    return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+
+class CatalogImporter:
+    """Processa chunks de registros validados numa Session."""
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+        self.insert = _insert(session)
+        self._events: "OrderedDict[str, Tuple[int, datetime, float]]" = OrderedDict()
+        self.stats = {"rows": 0, "events": 0, "seat_ranges": 0,
+                      "tickets_inserted": 0, "errors": 0}
+
+    def _remember(self, ref: str, event_id: int, date: datetime,
+                  price: float) -> None:
+        self._events[ref] = (event_id, date, price)
+        self._events.move_to_end(ref)
+        if len(self._events) > EVENT_CACHE_SIZE:
+            self._events.popitem(last=False)
+
+    def _resolve(self, refs) -> None:
+        """Busca no banco os external_ref que não estão no cache."""
+        missing = [ref for ref in set(refs) if ref not in self._events]
+        if not missing:
+            return
+        rows = self.session.execute(
+            select(Event.external_ref, Event.id, Event.date, Event.price)
+            .where(Event.external_ref.in_(missing)))
+        for ref, event_id, date, price in rows:
+            self._remember(ref, event_id, date, price)
+
+    def upsert_events(self, rows: List[Tuple[int, EventImportRow]]) -> List[dict]:
+        """INSERT ... ON CONFLICT (external_ref) DO UPDATE; devolve erros."""
+        if not rows:
+            return []
+        # Último registro de cada external_ref vence dentro do chunk
+        latest = {row.external_ref: (line, row) for line, row in rows}
+        # O que não existe ainda vai virar evento novo (bucket do calendário)
+        self._resolve(latest)
+        new = [ref for ref in latest if ref not in self._events]
+        stmt = self.insert(Event)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Event.external_ref],
+            set_={"name": stmt.excluded.name,
+                  "description": stmt.excluded.description,
+                  "price": stmt.excluded.price},
+        ).returning(Event.external_ref, Event.id, Event.date, Event.price)
+        result = self.session.execute(stmt, [
+            {"external_ref": row.external_ref, "name": row.name,
+             "description": row.description, "date": row.date,
+             "price": row.price, "creator_id": row.creator_id}
+            for _, row in latest.values()
+        ])
+        errors = []
+        for ref, event_id, date, price in result:
+            self._remember(ref, event_id, date, price)
+            line, row = latest[ref]
+            if date != row.date:
+                errors.append({"line": line, "errors": [
+                    f"date: evento {ref} já existe em {date.isoformat()}; "
+                    f"mudança de data não é aplicada pelo import"]})
+        for ref in new:
+            record_event_day(self.session, latest[ref][1].date)
+        self.stats["events"] += len(latest)
+        return errors
+
+    def seat_ranges(self, rows: list) -> List[SeatRange]:
+        """Faixas de assentos: pista dos eventos seated=false + linhas seats."""
+        ranges = []
+        for row in rows:
+            if isinstance(row, EventImportRow):
+                if row.seated:
+                    continue
+                event_id, date, _ = self._events[row.external_ref]
+                ranges.append((event_id, date, GENERAL_ADMISSION, 1,
+                               1, row.total_tickets, row.price, True))
+            else:
+                event_id, date, event_price = self._events[row.event_ref]
+                ranges.append((event_id, date, row.section, row.row,
+                               row.first_number, row.last_number,
+                               row.price or event_price, row.price is not None))
+        return ranges
+
+    def insert_tickets(self, ranges: List[SeatRange]) -> Dict[int, int]:
+        """Ingressos novos (ON CONFLICT DO NOTHING); devolve inseridos por evento."""
+        inserted: Dict[int, int] = {}
+        batch: List[dict] = []
+
+        def flush() -> None:
+            if not batch:
+                return
+            stmt = self.insert(Ticket).on_conflict_do_nothing(
+                index_elements=["event_id", "event_date", "section", "row", "number"],
+            ).returning(Ticket.event_id)
+            for event_id in self.session.execute(stmt, batch).scalars():
+                inserted[event_id] = inserted.get(event_id, 0) + 1
+            batch.clear()
+
+        for event_id, date, section, row, first, last, price, _ in ranges:
+            for number in range(first, last + 1):
+                batch.append({"event_id": event_id, "event_date": date,
+                              "section": section, "row": row, "number": number,
+                              "seat_number": f"{section}-{row}-{number}",
+                              "price": price, "is_reserved": False})
+                if len(batch) >= TICKET_BATCH_SIZE:
+                    flush()
+        flush()
+        return inserted
+
+    def update_prices(self, ranges: List[SeatRange]) -> None:
+        """Preço novo para assentos que já existiam e ainda estão livres."""
+        params = [
+            {"e_id": event_id, "e_date": date, "e_section": section, "e_row": row,
+             "e_first": first, "e_last": last, "e_price": price}
+            for event_id, date, section, row, first, last, price, explicit in ranges
+            if explicit
+        ]
+        if not params:
+            return
+        # executemany: um UPDATE por faixa, não por assento
+        stmt = update(Ticket).where(and_(
+            Ticket.event_id == bindparam("e_id"),
+            Ticket.event_date == bindparam("e_date"),
+            Ticket.section == bindparam("e_section"),
+            Ticket.row == bindparam("e_row"),
+            Ticket.number.between(bindparam("e_first"), bindparam("e_last")),
+            Ticket.is_reserved.is_(False),
+            Ticket.price != bindparam("e_price"),
+        )).values(price=bindparam("e_price"))
+        self.session.connection().execute(stmt, params)
+
+    def process_chunk(self, chunk: List[Record]) -> List[dict]:
+        """Valida e grava um chunk numa transação; devolve os erros por linha."""
+        errors: List[dict] = []
+        events: List[Tuple[int, EventImportRow]] = []
+        seats: List[Tuple[int, SeatRangeImportRow]] = []
+        for line, record, parse_error in chunk:
+            self.stats["rows"] += 1
+            if parse_error is not None:
+                errors.append({"line": line, "errors": [parse_error]})
+                continue
+            try:
+                row = _validate(record)
+            except (ValidationError, ValueError) as exc:
+                errors.append({"line": line, "errors": _error_message(exc)})
+                continue
+            (events if isinstance(row, EventImportRow) else seats).append((line, row))
+
+        # Postgres particionado: as partições dos meses precisam existir antes
+        # dos INSERTs, criadas fora da transação do chunk (ver partitioning)
+        with self.session.begin():
+            self._resolve([row.external_ref for _, row in events]
+                          + [row.event_ref for _, row in seats])
+        # Evento que já existe mantém a data gravada (o import não muda datas)
+        dates = {self._events[row.external_ref][1] if row.external_ref in self._events
+                 else row.date for _, row in events}
+        dates.update(self._events[row.event_ref][1] for _, row in seats
+                     if row.event_ref in self._events)
+        ensure_ticket_partitions(self.session.get_bind(), dates)
+
+        # Rollback do chunk: ids de eventos que nunca foram commitados não
+        # podem ficar no cache (o próximo chunk gravaria tickets com eles)
+        cached_events = self._events.copy()
+        events_before = self.stats["events"]
+        try:
+            with self.session.begin():
+                errors.extend(self.upsert_events(events))
+                self._resolve(row.event_ref for _, row in seats)
+                known = []
+                for line, row in seats:
+                    if row.event_ref in self._events:
+                        known.append(row)
+                    else:
+                        errors.append({"line": line, "errors": [
+                            f"event_ref: evento {row.event_ref!r} não encontrado"]})
+                ranges = self.seat_ranges([row for _, row in events] + known)
+                inserted = self.insert_tickets(ranges)
+                self.update_prices(ranges)
+                for event_id, count in inserted.items():
+                    record_inventory(self.session, event_id, count)
+        except BaseException:
+            self._events = cached_events
+            self.stats["events"] = events_before
+            raise
+
+        for event_id in inserted:
+            seat_index.invalidate(event_id)
+        self.stats["seat_ranges"] += len(known)
+        self.stats["tickets_inserted"] += sum(inserted.values())
+        self.stats["errors"] += len(errors)
+        return sorted(errors, key=lambda error: error["line"])
+
+
+def import_catalog(session: Session, raw, fmt: str, total_bytes: int = 0,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Importa o arquivo binário `raw`; gera as mensagens de progresso:
+
+        {"type": "error", "line": 12, "errors": [...]}
+        {"type": "progress", "rows": ..., "bytes": ..., "percent": ...}
+        {"type": "done", ...estatísticas, "elapsed_seconds": ...}
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconhecido: {fmt} (use csv ou ndjson)")
+    started = time.perf_counter()
+    lines = _ByteCounter(raw)
+    records = _read_csv(lines) if fmt == "csv" else _read_ndjson(lines)
+    importer = CatalogImporter(session)
+    reported = 0
+
+    def flush(chunk: List[Record]) -> Iterator[dict]:
+        nonlocal reported
+        try:
+            errors = importer.process_chunk(chunk)
+        except SQLAlchemyError as exc:
+            # Ex.: creator_id inexistente (FK). O chunk inteiro volta atrás;
+            # os próximos seguem.
+            importer.stats["errors"] += 1
+            errors = [{"line": chunk[0][0], "last_line": chunk[-1][0],
+                       "errors": [f"chunk não gravado: {exc.__class__.__name__}: "
+                                  f"{getattr(exc, 'orig', exc)}"]}]
+        for error in errors:
+            if reported < MAX_REPORTED_ERRORS:
+                reported += 1
+                yield {"type": "error", **error}
+        yield _progress(importer.stats, lines.bytes_read, total_bytes)
+
+    chunk: List[Record] = []
+    for record in records:
+        # Linhas não decodificadas entram no chunk como erro de leitura
+        chunk.extend(lines.take_bad_lines())
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield from flush(chunk)
+            chunk = []
+    chunk.extend(lines.take_bad_lines())
+    if chunk:
+        yield from flush(chunk)
+
+    yield {"type": "done", **importer.stats,
+           "errors_omitted": importer.stats["errors"] - reported,
+           "elapsed_seconds": round(time.perf_counter() - started, 3)}
+
+
+def _progress(stats: dict, bytes_read: int, total_bytes: int) -> dict:
+    progress = {"type": "progress", **stats, "bytes": bytes_read}
+    if total_bytes:
+        progress["percent"] = round(100 * bytes_read / total_bytes, 1)
+    return progress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Import em streaming de eventos e assentos (CSV/NDJSON)")
+    parser.add_argument("path", help="Arquivo .csv ou .ndjson")
+    parser.add_argument("--format", choices=sorted(FORMATS),
+                        help="Padrão: pela extensão do arquivo")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    from app.config import SessionLocal
+
+    path = Path(args.path)
+    fmt = args.format or detect_format(path.name)
+    with path.open("rb") as raw, SessionLocal() as session:
+        for message in import_catalog(session, raw, fmt, path.stat().st_size,
+                                      args.chunk_size):
+            print(json.dumps(message, default=str, ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Feed ao vivo de disponibilidade por evento (Server-Sent Events).
+
+Em vez de N clientes fazendo polling a cada segundo, cada evento tem UM
+canal que recebe os deltas (assentos tomados/liberados) das rotas de
+reserva e repassa para todos os assinantes.
+
+- Produtor único por evento: as rotas síncronas rodam no threadpool e
+  entregam o delta ao loop via call_soon_threadsafe; só o loop mexe no canal.
+- Coalescência: cada assinante acumula deltas em contadores e envia no
+  máximo 1 mensagem a cada `coalesce_interval`.
+- Backpressure: cliente lento não gera fila; os contadores só somam, então
+  a memória por assinante é constante.
+
+O snapshot inicial vem dos rollups (`event_sales_totals`), sem varrer
+tickets. Cada worker só vê os deltas das reservas feitas nele mesmo (com
+vários workers, ou reservas vindas do import/admin, o contador do canal
+derivaria). Por isso, enquanto o canal tem assinantes, ele relê o total do
+banco a cada LIVE_RESYNC_SECONDS (1 leitura por evento assistido, não por
+assinante) e, se divergiu, corrige e avisa os assinantes. Os deltas do
+próprio worker continuam saindo na hora; os dos outros chegam no resync.
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Callable, Dict, Optional, Set
+
+from app.config import LIVE_RESYNC_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# event_id -> disponíveis segundo o banco (None = evento sumiu)
+Fetcher = Callable[[int], Optional[int]]
+
+
+class _Subscriber:
+    __slots__ = ("taken", "released", "wakeup")
+
+    def __init__(self) -> None:
+        self.taken = 0
+        self.released = 0
+        self.wakeup = asyncio.Event()
+
+
+class _Channel:
+    """Estado de um evento: disponibilidade atual + assinantes."""
+
+    def __init__(self, available: int) -> None:
+        self.available = available
+        self.subscribers: Set[_Subscriber] = set()
+        self.resync_task: Optional[asyncio.Task] = None
+
+    def apply(self, taken: int, released: int) -> None:
+        self.available += released - taken
+        for sub in self.subscribers:
+            sub.taken += taken
+            sub.released += released
+            sub.wakeup.set()
+
+    def reset(self, available: int) -> None:
+        """Valor do banco substitui o contador local (o delta sai zerado)."""
+        self.available = available
+        for sub in self.subscribers:
+            sub.wakeup.set()
+
+
+class AvailabilityBroker:
+    """Distribui deltas de disponibilidade para os assinantes de cada evento."""
+
+    def __init__(self, coalesce_interval: float = 0.25,
+                 heartbeat_interval: float = 15.0,
+                 resync_interval: float = LIVE_RESYNC_SECONDS) -> None:
+        self.coalesce_interval = coalesce_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.resync_interval = resync_interval
+        self._channels: Dict[int, _Channel] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscriber_count(self, event_id: Optional[int] = None) -> int:
+        if event_id is not None:
+            channel = self._channels.get(event_id)
+            return len(channel.subscribers) if channel else 0
+        return sum(len(c.subscribers) for c in self._channels.values())
+
+    def publish(self, event_id: int, taken: int = 0, released: int = 0) -> None:
+        """
+        Chamado pelas rotas (qualquer thread) DEPOIS do commit.
+        Sem assinantes para o evento, não custa nada.
+        """
+        loop = self._loop
+        if loop is None or event_id not in self._channels:
+            return
+        loop.call_soon_threadsafe(self._apply, event_id, taken, released)
+
+    def _apply(self, event_id: int, taken: int, released: int) -> None:
+        channel = self._channels.get(event_id)
+        if channel is not None:
+            channel.apply(taken, released)
+
+    async def _resync(self, event_id: int, channel: _Channel, fetch: Fetcher) -> None:
+        """Relê a disponibilidade do banco enquanto o canal existir."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.resync_interval)
+            try:
+                available = await loop.run_in_executor(None, fetch, event_id)
+            except Exception as exc:
+                logger.warning("Resync do feed do evento %s falhou: %s", event_id, exc)
+                continue
+            # Um delta local aplicado durante a leitura pode contar duas vezes;
+            # o erro fica limitado às reservas em voo e o próximo resync corrige
+            if available is not None and available != channel.available:
+                channel.reset(available)
+
+    async def stream(self, event_id: int, available: int,
+                     fetch: Optional[Fetcher] = None) -> AsyncIterator[str]:
+        """
+        Gera mensagens SSE para um assinante.
+
+        `available` só é usado se este for o primeiro assinante do evento;
+        os demais herdam o estado do canal (sem ir ao banco). `fetch` (roda
+        no threadpool) é a leitura usada no resync periódico do canal.
+        """
+        self._loop = asyncio.get_running_loop()
+        channel = self._channels.get(event_id)
+        if channel is None:
+            channel = self._channels[event_id] = _Channel(available)
+            if fetch is not None and self.resync_interval > 0:
+                channel.resync_task = asyncio.create_task(
+                    self._resync(event_id, channel, fetch))
+
+        sub = _Subscriber()
+        channel.subscribers.add(sub)
+        try:
+            yield _sse("snapshot", {"event_id": event_id,
+                                    "available": channel.available})
+            while True:
+                try:
+                    await asyncio.wait_for(sub.wakeup.wait(),
+                                           self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+
+                # Janela de coalescência: junta as rajadas num único delta
+                await asyncio.sleep(self.coalesce_interval)
+                sub.wakeup.clear()
+                taken, released = sub.taken, sub.released
+                sub.taken = sub.released = 0
+                yield _sse("delta", {
+                    "event_id": event_id,
+                    "taken": taken,
+                    "released": released,
+                    "available": channel.available,
+                })
+        finally:
+            channel.subscribers.discard(sub)
+            if not channel.subscribers:
+                self._channels.pop(event_id, None)
+                if channel.resync_task is not None:
+                    channel.resync_task.cancel()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+broker = AvailabilityBroker()
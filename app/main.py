@@ -1,121 +1,577 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+
+from fastapi import (
+    APIRouter, FastAPI, Depends, Header, HTTPException, Query, Request, Response, status,
+)
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+import logging
+import os
+import tempfile
 import time
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import List
-from app.config import get_db, engine, Base
-from app.models import User, Event, Ticket
+from typing import List, Literal
+from app.config import (
+    DB_WARMUP_CONNECTIONS, EMAIL_BLOOM_CAPACITY, IMPORT_MAX_BYTES, METRICS_MULTIPROC_DIR, get_db,
+    dispose_engine, init_engine, Base, SessionLocal,
+)
+from app.models import User, UserSession, Event, Ticket, EventSalesTotal, WaitlistEntry
+from app.live import broker
+from app.metrics import (
+    RESERVATION_OUTCOMES, SIGNUP_EMAIL_CHECKS, WAITLIST_OPERATIONS, MetricsMiddleware,
+    SnapshotWriter,
+    instrument_engine, render_metrics,
+)
+from app.partitioning import ensure_ticket_partitions, ticket_partition_filter
+from app.profiling import SQLProfilerMiddleware, get_report, instrument_profiling
+from app.outbox import (
+    TICKET_RELEASED, TICKET_RESERVED, WAITLIST_ASSIGNED, enqueue, outbox_stats,
+)
+from app.rollups import (
+    GRANULARITIES, clear_rollups, record_event_day, record_inventory, record_sale,
+    sales_timeseries, sell_through, top_events,
+)
+from app.archive import find_archived_event, search_archived_events
+from app.tracing import TracingMiddleware, instrument_tracing, tracer
+from app.serialization import BACKEND as JSON_BACKEND, FastJSONResponse, dumps, rows_to_dicts
+from app.importer import FORMATS as IMPORT_FORMATS, detect_format, import_catalog
+from app.admin import require_admin
+from app.admission import AdmissionMiddleware, instrument_admission, limiter
+from app.memory import SnapshotNotFound, instrument_sessions, memory_report, sampler
+from app.event_calendar import InvalidCursor, decode_cursor, events_in_range, month_view
+from app.warmup import warm_up
+from app import queries
+from app.queries import install_prepared_statements
+from app.seating import Seat, seat_index
+from app.retry import TransactionRetryExhausted, retry_transaction
+from app.bloom import EmailPrefilter
+from app.passwords import PasswordHasherBusy, hasher
+from app import waitlist
+from app.sessions import (
+    AuthSession, bearer_token, check_owner, expires_at_datetime, optional_session,
+    session_store,
+)
 from app.schemas import (
-    UserCreate, UserResponse,
+    UserCreate, UserResponse, LoginRequest, LoginResponse,
     EventCreate, EventResponse, EventWithTicketsResponse,
-    TicketCreate, TicketResponse, TicketReserveRequest, TicketReserveResponse
+    TicketCreate, TicketResponse, TicketReserveRequest, TicketReserveResponse,
+    TicketBlockReserveRequest, TicketBlockReserveResponse, SeatResponse,
+    TicketCancelRequest, TicketCancelResponse,
+    WaitlistJoinRequest, WaitlistPositionResponse,
+    SalesBucket, TopEvent, SellThrough
 )
 
-# Criar aplicação
-app = FastAPI(title="Ticket reservation API - Semana 5")
+logger = logging.getLogger(__name__)
+
+# Emails cadastrados (por worker); carregado no startup (lifespan)
+email_prefilter = EmailPrefilter(EMAIL_BLOOM_CAPACITY)
 
+# Rotas ficam num router; a app é montada em create_app() (fim do arquivo)
+router = APIRouter()
 
-def check_user_ticket_limit(user_id: int, session: Session) -> None:
+
+def check_user_ticket_limit(user_id: int, session: Session, quantity: int = 1) -> None:
     """
     Regra de negócio: usuario não pode ter mais de 5 reservas ativas 
+    (contando as `quantity` que está pedindo agora)
     """
-    active_count = session.query(func.count(Ticket.id)).filter(
-        Ticket.user_id == user_id,
-        Ticket.is_reserved == True
-    ).scalar()
+    active_count = queries.execute(
+        session, queries.ACTIVE_TICKET_COUNT, user_id=user_id).scalar()
 
     if active_count >= 5:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Você já possui 5 reservas ativas. Cancele uma para continuar"
         )
+    if active_count + quantity > 5:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Limite de 5 reservas ativas: você tem {active_count} "
+                   f"e pediu {quantity}"
+        )
+
+
+def lock_user_row(user_id: int, session: Session) -> None:
+    """
+    Serializa as reservas/cancelamentos do MESMO usuário.
+
+    Sem isso, duas reservas simultâneas leem "4 ativas" e as duas passam
+    (o harness benchmarks/race_harness.py pega exatamente esse caso).
+    - Postgres: SELECT ... FOR UPDATE na linha do usuário.
+    - SQLite: o driver só abre a transação no primeiro write, então um
+      UPDATE no-op pega o lock de escrita antes de qualquer leitura.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        found = session.execute(
+            queries.LOCK_USER_SQLITE, {"user_id": user_id}).rowcount == 1
+    else:
+        found = queries.execute(
+            session, queries.LOCK_USER, user_id=user_id).scalar() is not None
+
+    if not found:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+
+
+def find_available_ticket(session: Session, event_id: int,
+                          event_date: datetime) -> Ticket | None:
+    """1 ingresso livre do evento; no Postgres com lock que pula os já travados."""
+    # Com a data do evento: no Postgres toca 1 partição
+    if session.get_bind().dialect.name == "sqlite":
+        result = session.execute(queries.AVAILABLE_TICKET_SQLITE,
+                                 {"event_id": event_id, "event_date": event_date})
+    else:
+        result = queries.execute(session, queries.AVAILABLE_TICKET,
+                                 event_id=event_id, event_date=event_date)
+    return result.scalar_one_or_none()
+
+
+@retry_transaction("reserve")
+def _reserve_once(req: TicketReserveRequest,
+                  session: Session) -> tuple[TicketReserveResponse, Seat]:
+    # 1. Iniciar transação explicita
+    with session.begin():
+        # 2. Validar limite de tickets do usuario (dentro da transação,
+        #    com a linha do usuário travada)
+        with tracer.span("lock_user_row"):
+            lock_user_row(req.user_id, session)
+        with tracer.span("check_user_ticket_limit"):
+            check_user_ticket_limit(req.user_id, session)
+
+        # 3. Buscar evento
+        event = session.get(Event, req.event_id)
+        if event is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Event not found",
+            )
+
+        # 4. Ingresso livre (query pré-construída em app/queries.py)
+        ticket = find_available_ticket(session, event.id, event.date)
+
+        if ticket is None:
+            # Nenhum ingresso livre: conflito de reserva. O Link aponta a
+            # fila de espera (tentar de novo em loop não adianta)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="No tickets available for this event",
+                headers={"Link": f'</events/{event.id}/waitlist>; rel="waitlist"'},
+            )
 
+        # 5. Atualizar ticket (marcar como reservado)
+        ticket.is_reserved = True
+        ticket.user_id = req.user_id
+        ticket.reserved_at = datetime.utcnow()
 
-@app.post("/tickets/reserve", response_model=TicketReserveResponse, status_code=201)
+        # 6. Outbox na mesma transação: sistemas externos serão avisados
+        enqueue(session, TICKET_RESERVED, ticket.event_id, {
+            "ticket_id": ticket.id,
+            "user_id": ticket.user_id,
+            "price": ticket.price,
+            "reserved_at": ticket.reserved_at,
+        })
+
+        # 7. Rollup de vendas por último (menor tempo segurando o lock)
+        record_sale(session, ticket.event_id, ticket.price,
+                    ticket.reserved_at)
+
+        # 8. Commit acontece automaticamente ao sair do with session.begin()
+        response = TicketReserveResponse(
+            ticket_id=ticket.id,
+            event_id=ticket.event_id,
+            user_id=ticket.user_id,  # type: ignore [arg-type]
+            reserved_at=ticket.reserved_at,  # type: ignore [arg-type]
+        )
+        seat = (ticket.section, ticket.row, ticket.number)
+    return response, seat
+
+
+def _retry_exhausted(exc: TransactionRetryExhausted) -> HTTPException:
+    """Concorrência que não cedeu: 503 (tente de novo), não 500."""
+    logger.warning("Desistindo da transação: %s", exc)
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Muita disputa por este evento; tente novamente",
+        headers={"Retry-After": "1"},
+    )
+
+
+@router.post("/tickets/reserve", response_model=TicketReserveResponse, status_code=201)
 def reserve_ticket(
         req: TicketReserveRequest,
-        session: Session = Depends(get_db),) -> TicketReserveResponse:
+        session: Session = Depends(get_db),
+        auth: AuthSession | None = Depends(optional_session),) -> TicketReserveResponse:
     """
-    Reserva com validação de limite de tickets por usuario.
+    Reserva 1 ingresso disponível para um evento específico,
+    usando transação ACID + row lock, com validação de limite por usuario.
+    Deadlock/serialização/SQLite ocupado: a transação roda de novo
+    (app/retry.py).
     """
-    # 1. Validar limite de tickets do usuario
-    check_user_ticket_limit(req.user_id, session)
+    try:
+        check_owner(auth, req.user_id)
+        response, seat = _reserve_once(req, session)
+        # 9. Só depois do commit: avisa os assinantes do feed ao vivo e
+        #    tira o assento do índice de blocos (app/seating.py)
+        broker.publish(response.event_id, taken=1)
+        seat_index.mark_taken(response.event_id, seat)
+        RESERVATION_OUTCOMES.inc("201")
+        return response
+    except HTTPException as exc:
+        # Repassa exceções de negócio (404, 409)
+        RESERVATION_OUTCOMES.inc(str(exc.status_code))
+        raise
+    except TransactionRetryExhausted as exc:
+        RESERVATION_OUTCOMES.inc("503")
+        raise _retry_exhausted(exc)
+    except Exception:
+        session.rollback()
+        RESERVATION_OUTCOMES.inc("500")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while reserving ticket",
+        )
+
+
+# Tentativas quando o índice de assentos do worker está desatualizado
+SEAT_ALLOCATION_ATTEMPTS = 3
+
+
+class StaleSeatMap(Exception):
+    """Algum assento escolhido pelo índice já foi vendido (outro worker)."""
+
+
+def lock_seats(session: Session, event: Event, seats: List[Seat]) -> List[Ticket]:
+    """Trava os ingressos do bloco que AINDA estão livres (ordem fixa: sem deadlock)."""
+    section, row, _ = seats[0]
+    query = select(Ticket).where(
+        *ticket_partition_filter(event.id, event.date),
+        Ticket.section == section,
+        Ticket.row == row,
+        Ticket.number.in_([number for _, _, number in seats]),
+        Ticket.is_reserved.is_(False),
+    ).order_by(Ticket.number)
+    if session.get_bind().dialect.name != "sqlite":
+        # Sem skip_locked: espera quem está comprando e relê (READ COMMITTED)
+        query = query.with_for_update()
+    return list(session.execute(query).scalars())
+
 
-    # 2. Resto da logica (mesmo da semana 4)
+@retry_transaction("reserve_block")
+def _reserve_block_once(req: TicketBlockReserveRequest,
+                        session: Session) -> TicketBlockReserveResponse:
+    seat_map, seats = None, None
     try:
         with session.begin():
-            # ... (codio de reserva ACID aqui)
-            pass
+            lock_user_row(req.user_id, session)
+            check_user_ticket_limit(req.user_id, session, req.quantity)
+
+            event = session.get(Event, req.event_id)
+            if event is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Event not found",
+                )
+
+            # Escolhe no índice e já segura o bloco: outro request deste worker
+            # não recebe os mesmos assentos enquanto esta transação roda
+            seat_map = seat_index.get(session, event)
+            with seat_map.lock:
+                seats = seat_map.best_available(req.quantity, req.section)
+                if seats is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=f"Não há {req.quantity} assentos lado a lado disponíveis",
+                    )
+                seat_map.take(seats)
+
+            tickets = lock_seats(session, event, seats)
+            if len(tickets) != len(seats):
+                raise StaleSeatMap()
+
+            reserved_at = datetime.utcnow()
+            for ticket in tickets:
+                ticket.is_reserved = True
+                ticket.user_id = req.user_id
+                ticket.reserved_at = reserved_at
+                enqueue(session, TICKET_RESERVED, ticket.event_id, {
+                    "ticket_id": ticket.id,
+                    "user_id": req.user_id,
+                    "price": ticket.price,
+                    "reserved_at": reserved_at,
+                })
+            # Um delta por preço: o bloco pode ter assentos de preços diferentes
+            for price, count in Counter(t.price for t in tickets).items():
+                record_sale(session, event.id, price, reserved_at, quantity=count)
+
+            response = TicketBlockReserveResponse(
+                event_id=event.id,
+                user_id=req.user_id,
+                reserved_at=reserved_at,
+                seats=[SeatResponse(ticket_id=t.id, section=t.section,
+                                    row=t.row, number=t.number) for t in tickets],
+            )
+    except BaseException:
+        # Fora do begin(): falha no próprio COMMIT também devolve os assentos
+        if seats is not None:
+            with seat_map.lock:
+                seat_map.release(seats)
+        raise
+    return response
+
+
+@router.post("/tickets/reserve-block", response_model=TicketBlockReserveResponse,
+             status_code=201)
+def reserve_block(
+        req: TicketBlockReserveRequest,
+        session: Session = Depends(get_db),
+        auth: AuthSession | None = Depends(optional_session),) -> TicketBlockReserveResponse:
+    """
+    Reserva os MELHORES `quantity` assentos lado a lado (mesma fileira).
+
+    O índice em memória (app/seating.py) escolhe o bloco em O(log fileiras);
+    o banco confirma com lock. Se o índice estava desatualizado (venda em
+    outro worker), recarrega o evento e tenta de novo.
+    """
+    try:
+        check_owner(auth, req.user_id)
+        for _ in range(SEAT_ALLOCATION_ATTEMPTS):
+            try:
+                response = _reserve_block_once(req, session)
+            except StaleSeatMap:
+                seat_index.invalidate(req.event_id)
+                continue
+            broker.publish(response.event_id, taken=len(response.seats))
+            RESERVATION_OUTCOMES.inc("201")
+            return response
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Assentos disputados; tente novamente",
+        )
+    except HTTPException as exc:
+        RESERVATION_OUTCOMES.inc(str(exc.status_code))
+        raise
+    except TransactionRetryExhausted as exc:
+        RESERVATION_OUTCOMES.inc("503")
+        raise _retry_exhausted(exc)
+    except Exception:
+        session.rollback()
+        RESERVATION_OUTCOMES.inc("500")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while reserving seats",
+        )
+
+
+# Pessoas da fila testadas por cancelamento (quem não pode receber sai da fila)
+WAITLIST_HANDOFF_ATTEMPTS = 5
+
+
+def hand_off_to_waitlist(session: Session, ticket: Ticket,
+                         released_by: int) -> WaitlistEntry | None:
+    """
+    Reserva o ingresso recém-liberado para o 1º da fila que puder recebê-lo.
+
+    Mesma transação do cancelamento: trava o usuário da fila (como numa
+    reserva normal) e confere o limite de 5. Quem já está no limite perde
+    o lugar e a vez passa ao seguinte.
+    """
+    for _ in range(WAITLIST_HANDOFF_ATTEMPTS):
+        entry = waitlist.pop_next(session, ticket.event_id, exclude_user_id=released_by)
+        if entry is None:
+            return None
+        try:
+            lock_user_row(entry.user_id, session)
+            check_user_ticket_limit(entry.user_id, session)
+        except HTTPException:  # usuário apagado ou já com 5 reservas
+            WAITLIST_OPERATIONS.inc("skipped")
+            continue
+
+        ticket.is_reserved = True
+        ticket.user_id = entry.user_id
+        ticket.reserved_at = datetime.utcnow()
+        enqueue(session, WAITLIST_ASSIGNED, ticket.event_id, {
+            "ticket_id": ticket.id,
+            "user_id": entry.user_id,
+            "price": ticket.price,
+            "reserved_at": ticket.reserved_at,
+            "waited_since": entry.joined_at,
+        })
+        WAITLIST_OPERATIONS.inc("assigned")
+        return entry
+    return None
+
+
+@retry_transaction("cancel")
+def _cancel_once(ticket_id: int, req: TicketCancelRequest,
+                 session: Session) -> tuple[TicketCancelResponse, Seat]:
+    with session.begin():
+        lock_user_row(req.user_id, session)
+        if session.get_bind().dialect.name == "sqlite":
+            result = session.execute(queries.TICKET_BY_ID_SQLITE,
+                                     {"ticket_id": ticket_id})
+        else:
+            result = queries.execute(session, queries.TICKET_FOR_UPDATE,
+                                     ticket_id=ticket_id)
+        ticket: Ticket | None = result.scalar_one_or_none()
+
+        if ticket is None or not ticket.is_reserved:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Reservation not found",
+            )
+        if ticket.user_id != req.user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Reservation belongs to another user",
+            )
+
+        released_at = datetime.utcnow()
+        ticket.is_reserved = False
+        ticket.user_id = None
+        ticket.reserved_at = None
+
+        enqueue(session, TICKET_RELEASED, ticket.event_id, {
+            "ticket_id": ticket.id,
+            "user_id": req.user_id,
+            "price": ticket.price,
+            "released_at": released_at,
+        })
+
+        # Fila de espera: o ingresso vai direto para o próximo, sem voltar
+        # à venda. Vendidos não mudam, então o rollup fica como está
+        entry = hand_off_to_waitlist(session, ticket, req.user_id)
+        if entry is None:
+            record_sale(session, ticket.event_id, ticket.price,
+                        released_at, quantity=-1)
+
+        response = TicketCancelResponse(
+            ticket_id=ticket.id,
+            event_id=ticket.event_id,
+            released_at=released_at,
+            waitlist_handoff=entry is not None,
+        )
+        seat = (ticket.section, ticket.row, ticket.number)
+    return response, seat
+
+
+@router.post("/tickets/{ticket_id}/cancel", response_model=TicketCancelResponse)
+def cancel_ticket(
+        ticket_id: int,
+        req: TicketCancelRequest,
+        session: Session = Depends(get_db),
+        auth: AuthSession | None = Depends(optional_session),) -> TicketCancelResponse:
+    """
+    Cancela uma reserva e devolve o ingresso para venda
+    (ou para o 1º da fila de espera do evento, se houver).
+    """
+    try:
+        check_owner(auth, req.user_id)
+        response, seat = _cancel_once(ticket_id, req, session)
+        if not response.waitlist_handoff:
+            broker.publish(response.event_id, released=1)
+            seat_index.mark_released(response.event_id, seat)
+        return response
     except HTTPException:
         raise
+    except TransactionRetryExhausted as exc:
+        raise _retry_exhausted(exc)
+    except Exception:
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while cancelling ticket",
+        )
 
 
-# @app.post("/tickets/reserve", response_model=TicketReserveResponse, status_code=201
-#           )
-# def reserve_ticket(req: TicketReserveRequest,
-#                    session: Session = Depends(get_db),) -> TicketReserveResponse:
-#     """
-#         Reserva 1 ingresso disponível para um evento específico,
-#         usando transação ACID + row lock.
-#     """
-#     try:
-#         # 1. Iniciar transação explicita
-#         with session.begin():
-#             # 2. Buscar evento
-#             event = session.get(Event, req.event_id)
-#             if event is None:
-#                 raise HTTPException(
-#                     status_code=status.HTTP_404_NOT_FOUND,
-#                     detail="Event not found",
-#                 )
-#            # 1. Montar a Query BÁSICA (sem travas ainda)
-#             query = select(Ticket).where(
-#                 Ticket.event_id == req.event_id,
-#                 Ticket.is_reserved.is_(False),
-#             )
-
-#             # 2. Aplicar a trava CONDICIONALMENTE
-#             # Se NÃO for SQLite, usa o lock avançado (Postgres)
-#             if "sqlite" not in str(session.bind.url):
-#                 query = query.with_for_update(skip_locked=True)
-
-#             # 3. Finalizar com o limite (apenas 1 ingresso)
-#             query = query.limit(1)
-
-#             result = session.execute(query)
-#             ticket: Ticket | None = result.scalar_one_or_none()
-
-#             if ticket is None:
-#                 # Nenhum ingresso livre: conlifot de reserva
-#                 raise HTTPException(
-#                     status_code=status.HTTP_409_CONFLICT,
-#                     detail="No tickets available for this event",
-#                 )
-#             # 4. Atualizar ticket (marcar como reservado)
-#             ticket.is_reserved = True
-#             ticket.user_id = req.user_id
-#             ticket.reserved_at = datetime.utcnow()
-
-#             # 5. Commit acontece automaticamente ao sair do with sessions.begin()
-
-#             # 6. Montar resposta
-#             response = TicketReserveResponse(
-#                 ticket_id=ticket.id,
-#                 event_id=ticket.event_id,
-#                 user_id=ticket.user_id,  # type: ignore [arg-type]
-#                 reserved_at=ticket.reserved_at,  # type: ignora [arg-type]
-#             )
-#             return response
-#     except HTTPException:
-#         # Repassa exceções de negócio (404, 409)
-#         raise
-#     except Exception:
-#         session.rollback()
-#         raise HTTPException(
-#             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-#             detail="Unexpected error while reserving ticket",
-#         )
+# ═══════════════════════════════════════════════════════════
+# FILA DE ESPERA: evento esgotado (ver app/waitlist.py)
+# ═══════════════════════════════════════════════════════════
+
+
+def _waitlist_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Usuário não está na fila deste evento",
+    )
+
+
+@router.post("/events/{event_id}/waitlist", response_model=WaitlistPositionResponse,
+             status_code=201)
+def join_waitlist(
+        event_id: int,
+        req: WaitlistJoinRequest,
+        response: Response,
+        session: Session = Depends(get_db),
+        auth: AuthSession | None = Depends(optional_session),) -> dict:
+    """
+    Entra na fila de um evento esgotado. Quando alguém cancelar, o ingresso
+    é reservado para o 1º da fila e ele é avisado (outbox waitlist.assigned).
+    Já na fila: 200 com a posição atual (o lugar não muda).
+    """
+    check_owner(auth, req.user_id)
+    try:
+        with session.begin():
+            if session.get(Event, event_id) is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                    detail="Event not found")
+            if session.get(User, req.user_id) is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                    detail="User not found")
+            totals = session.get(EventSalesTotal, event_id)
+            if totals is not None and totals.reserved_count < totals.capacity:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Ainda há ingressos para este evento: reserve direto",
+                )
+            # Quem já tem 5 reservas não poderia receber o ingresso da fila
+            check_user_ticket_limit(req.user_id, session)
+            result, created = waitlist.join(session, event_id, req.user_id)
+    except IntegrityError:
+        # Join simultâneo do mesmo usuário: o outro request já o colocou na fila
+        with session.begin():
+            result, created = waitlist.position(session, event_id, req.user_id), False
+        if result is None:
+            raise
+    WAITLIST_OPERATIONS.inc("join" if created else "rejoin")
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    return result
+
+
+@router.get("/events/{event_id}/waitlist/{user_id}",
+            response_model=WaitlistPositionResponse)
+def get_waitlist_position(
+        event_id: int,
+        user_id: int,
+        session: Session = Depends(get_db),
+        auth: AuthSession | None = Depends(optional_session),) -> dict:
+    """Posição na fila (2 leituras por chave, sem COUNT: pode consultar à vontade)."""
+    check_owner(auth, user_id)
+    result = waitlist.position(session, event_id, user_id)
+    if result is None:
+        raise _waitlist_not_found()
+    return result
+
+
+@router.delete("/events/{event_id}/waitlist/{user_id}", status_code=204)
+def leave_waitlist(
+        event_id: int,
+        user_id: int,
+        session: Session = Depends(get_db),
+        auth: AuthSession | None = Depends(optional_session),) -> None:
+    """Sai da fila do evento."""
+    check_owner(auth, user_id)
+    with session.begin():
+        removed = waitlist.leave(session, event_id, user_id)
+    if not removed:
+        raise _waitlist_not_found()
+    WAITLIST_OPERATIONS.inc("leave")
 
 
 # Criar tabelas no banco (automatico)
@@ -124,15 +580,23 @@ def reserve_ticket(
 #
 # SEED: Gerar dados fake para testes
 # ═══════════════════════════════════════════════════════════
-@app.post("/seed")
+@router.post("/seed")
 def seed_database(session: Session = Depends(get_db)):
     # 1. Limpar banco (Staging)
     session.query(Ticket).delete()
     session.query(Event).delete()
+    # Sessões de login antes dos usuários (FK); os ids dos usuários novos
+    # repetem os antigos, então um token velho viraria login de outra pessoa
+    session.query(UserSession).delete()
     session.query(User).delete()
+    clear_rollups(session)
+    waitlist.clear_waitlists(session)
 
     # Commit imediato para garantir que o banco limpe MESMO se der erro depois
     session.commit()
+    # Cache de sessões deste worker (os outros expiram em SESSION_CACHE_SECONDS
+    # com SESSION_BACKEND=sql; em memória, só reiniciando)
+    session_store.clear()
 
     print("--- Banco Limpo ---")  # Debug no terminal
 
@@ -161,34 +625,171 @@ def seed_database(session: Session = Depends(get_db)):
         )
         session.add(event)
         events.append(event)
+        record_event_day(session, event.date)
 
     session.commit()  # Salva eventos
     print(f"--- {len(events)} Eventos Criados ---")
 
     # 4. Criar Ingressos
+    # Postgres particionado: a partição do mês precisa existir antes (DDL
+    # em transação própria, antes de esta sessão tocar em `tickets`)
+    ensure_ticket_partitions(session.get_bind(), [event.date for event in events])
     for event in events:
-        for i in range(50):  # 50 ingressos por evento
+        for i in range(50):  # 50 ingressos por evento (5 fileiras de 10)
             ticket = Ticket(
                 seat_number=f"Seat {i}",
+                section="A",
+                row=i // 10 + 1,
+                number=i % 10 + 1,
                 price=event.price,
-                event_id=event.id
+                event_id=event.id,
+                event_date=event.date
             )
             session.add(ticket)
+        record_inventory(session, event.id, 50)
 
     session.commit()  # Salva ingressos
+    seat_index.invalidate()  # mapas antigos apontam para eventos apagados
 
     return {
         "message": "Seed Realizado com Sucesso!",
         "users": len(users),
         "events": len(events)
     }
+# ═══════════════════════════════════════════════════════════
+# CADASTRO: hash em processo separado + prefiltro de email
+# ═══════════════════════════════════════════════════════════
+
+
+def _email_taken(email: str) -> bool:
+    with SessionLocal() as session:
+        return session.execute(
+            select(User.id).where(User.email == email)).first() is not None
+
+
+def _insert_user(name: str, email: str, password_hash: str) -> User | None:
+    """INSERT; None se o índice único de email recusar (corrida/outro worker)."""
+    with SessionLocal() as session:
+        user = User(name=name, email=email, password_hash=password_hash)
+        session.add(user)
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            return None
+        session.refresh(user)
+        session.expunge(user)
+        return user
+
+
+def _email_conflict() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Email já cadastrado",
+    )
+
+
+@router.post("/users", response_model=UserResponse, status_code=201)
+async def create_user(payload: UserCreate) -> UserResponse:
+    """
+    Cadastro. A rota é async e nada pesado roda no event loop:
+    - email "com certeza novo" (Bloom filter) pula o SELECT de existência
+    - email "talvez existente" é conferido no banco ANTES do hash (409 barato)
+    - scrypt roda no pool de processos (app/passwords.py)
+    - o índice único ix_users_email é quem garante: INSERT duplicado -> 409
+    """
+    email = email_prefilter.normalize(payload.email)
+    if email_prefilter.might_exist(email):
+        taken = await run_in_threadpool(_email_taken, email)
+        SIGNUP_EMAIL_CHECKS.inc("db_hit" if taken else "db_miss")
+        if taken:
+            raise _email_conflict()
+    else:
+        SIGNUP_EMAIL_CHECKS.inc("bloom_skip")
+
+    try:
+        password_hash = await hasher.hash(payload.password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitos cadastros simultâneos; tente novamente",
+            headers={"Retry-After": "1"},
+        )
+
+    user = await run_in_threadpool(_insert_user, payload.name, email, password_hash)
+    email_prefilter.add(email)
+    if user is None:
+        raise _email_conflict()
+    return UserResponse.model_validate(user)
+
+
+# ═══════════════════════════════════════════════════════════
+# LOGIN: sessões em memória (ver app/sessions.py)
+# ═══════════════════════════════════════════════════════════
+
+# Hash de uma senha qualquer: email inexistente também paga um scrypt,
+# senão o tempo de resposta diz quais emails têm conta
+_dummy_password_hash: str | None = None
+
+
+def _password_hash_for(email: str) -> tuple[int, str] | None:
+    with SessionLocal() as session:
+        row = session.execute(
+            select(User.id, User.password_hash).where(User.email == email)).first()
+    if row is None or row.password_hash is None:
+        return None
+    return row.id, row.password_hash
+
+
+@router.post("/auth/login", response_model=LoginResponse)
+async def login(payload: LoginRequest) -> LoginResponse:
+    """Confere a senha (pool de processos) e abre uma sessão; devolve o token."""
+    global _dummy_password_hash
+    found = await run_in_threadpool(_password_hash_for,
+                                    email_prefilter.normalize(payload.email))
+    try:
+        if found is None:
+            if _dummy_password_hash is None:
+                _dummy_password_hash = await hasher.hash("senha-que-ninguem-tem")
+            await hasher.verify(payload.password, _dummy_password_hash)
+            valid = False
+        else:
+            valid = await hasher.verify(payload.password, found[1])
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitos logins simultâneos; tente novamente",
+            headers={"Retry-After": "1"},
+        )
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Email ou senha inválidos",
+        )
+    token, auth = await run_in_threadpool(session_store.create, found[0])
+    return LoginResponse(token=token, user_id=auth.user_id,
+                         expires_at=expires_at_datetime(auth))
+
+
+@router.post("/auth/logout", status_code=204)
+def logout(authorization: str | None = Header(default=None)) -> None:
+    """Encerra a sessão do token (idempotente)."""
+    token = bearer_token(authorization)
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authorization: Bearer <token> obrigatório",
+        )
+    session_store.revoke(token)
+
+
 # ═══════════════════════════════════════════════════════════
 #
 # /events-bad: DEMONSTRAR N+1 (lento demais)
 # ═══════════════════════════════════════════════════════════
 
 
-@app.get("/events-bad")
+@router.get("/events-bad")
 def get_events_bad(session: Session = Depends(get_db)) -> dict:
     """
     N+1 PROBLEMA: Pega eventos, depois acessa .tickets de cada um.
@@ -236,7 +837,7 @@ def get_events_bad(session: Session = Depends(get_db)) -> dict:
 # /events-good: SOLUÇÃO COM JOINEDLOAD (rápido)
 # ═══════════════════════════════════════════════════════════
 
-@app.get("/events-good")
+@router.get("/events-good")
 def get_events_good(session: Session = Depends(get_db)) -> dict:
     """
     EAGER LOADING: Usa joinedload para trazer TUDO em 1 query.
@@ -268,20 +869,21 @@ def get_events_good(session: Session = Depends(get_db)) -> dict:
         })
     elapsed = time.time() - start
 
-    return {
+    # Response pronta: pula o jsonable_encoder sobre a lista inteira
+    return FastJSONResponse({
         "method":  "good (Eager Loading)",
         "elapsed_seconds": round(elapsed, 3),
         "events_count": len(events_data),
         "events": events_data,
         "success": "Isto dispara apenas 1 query! (com JOIN)"
-    }
+    })
 
 # ═══════════════════════════════════════════════════════════
 # /compare - Comparar Bad vs Good
 # ═══════════════════════════════════════════════════════════
 
 
-@app.get("/compare")
+@router.get("/compare")
 def compare_performace(session: Session = Depends(get_db)) -> dict:
     """
     Executa ambas as rotas e compara performance.
@@ -317,13 +919,114 @@ def compare_performace(session: Session = Depends(get_db)) -> dict:
 # ═══════════════════════════════════════════════════════════
 
 
-@app.get("/health")
+@router.get("/health")
 def health_check() -> dict:
-    """Simples health check."""
+    """Simples health check (liveness: o processo responde; ver /ready)."""
     return {"status": "online", "week": "Semana 3 - Database & N+1"}
 
 
-@app.get("/events/search")
+@router.get("/ready")
+async def readiness_check() -> FastJSONResponse:
+    """
+    Readiness: 503 enquanto este worker está saturado (limite de admissão
+    cheio, descartando requests ou esperando conexão do pool). Async e sem
+    banco: responde na hora mesmo com o threadpool e o pool esgotados.
+    """
+    report = limiter.status()
+    return FastJSONResponse(
+        report,
+        status_code=status.HTTP_200_OK if report["ready"]
+        else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Métricas no formato texto do Prometheus."""
+    return PlainTextResponse(
+        render_metrics(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+# ═══════════════════════════════════════════════════════════
+# ADMIN: diagnóstico de memória (ver app/memory.py)
+# ═══════════════════════════════════════════════════════════
+
+SnapshotGroup = Literal["lineno", "filename", "traceback"]
+
+
+def _snapshot_not_found(snapshot_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Snapshot {snapshot_id} não existe (descartado ou de antes do stop)",
+    )
+
+
+@router.get("/admin/memory", dependencies=[Depends(require_admin)])
+def admin_memory() -> dict:
+    """RSS/USS, GC, identity maps das Sessions vivas e estado do tracemalloc."""
+    return {**memory_report(), "auth_sessions": session_store.stats()}
+
+
+@router.post("/admin/memory/tracemalloc/start", dependencies=[Depends(require_admin)])
+def admin_tracemalloc_start(frames: int = Query(1, ge=1, le=25),
+                            seconds: float | None = Query(None, gt=0)) -> dict:
+    """Liga o tracemalloc (desliga sozinho em TRACEMALLOC_MAX_SECONDS)."""
+    return sampler.start(frames, seconds)
+
+
+@router.post("/admin/memory/tracemalloc/stop", dependencies=[Depends(require_admin)])
+def admin_tracemalloc_stop() -> dict:
+    return sampler.stop()
+
+
+@router.post("/admin/memory/snapshots", dependencies=[Depends(require_admin)])
+def admin_take_snapshot(top: int = Query(20, gt=0, le=100),
+                        group_by: SnapshotGroup = "lineno") -> dict:
+    """Snapshot agora + as `top` origens que mais alocaram."""
+    try:
+        snapshot_id = sampler.take()
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    return {"id": snapshot_id, "top": sampler.top(snapshot_id, top, group_by)}
+
+
+@router.get("/admin/memory/snapshots/{snapshot_id}", dependencies=[Depends(require_admin)])
+def admin_snapshot_top(snapshot_id: int, top: int = Query(20, gt=0, le=100),
+                       group_by: SnapshotGroup = "lineno") -> dict:
+    try:
+        return {"id": snapshot_id, "top": sampler.top(snapshot_id, top, group_by)}
+    except SnapshotNotFound:
+        raise _snapshot_not_found(snapshot_id)
+
+
+@router.get("/admin/memory/snapshots/{snapshot_id}/diff/{base_id}",
+            dependencies=[Depends(require_admin)])
+def admin_snapshot_diff(snapshot_id: int, base_id: int,
+                        top: int = Query(20, gt=0, le=100),
+                        group_by: SnapshotGroup = "lineno") -> dict:
+    """O que cresceu entre `base_id` e `snapshot_id`."""
+    try:
+        diff = sampler.diff(snapshot_id, base_id, top, group_by)
+    except SnapshotNotFound as exc:
+        raise _snapshot_not_found(exc.args[0])
+    return {"id": snapshot_id, "base_id": base_id, "diff": diff}
+
+
+@router.get("/debug/sql-profile/{profile_id}", dependencies=[Depends(require_admin)])
+def get_sql_profile(profile_id: str) -> dict:
+    """Relatório completo de um request perfilado (header X-SQL-Profile-Id)."""
+    report = get_report(profile_id)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found (expirado ou id inválido)",
+        )
+    return report
+
+
+@router.get("/events/search")
 def search_events(
     name: str,
     session: Session = Depends(get_db),
@@ -332,13 +1035,342 @@ def search_events(
     Busca eventos por nome.
     Teste de SQL injection: tentar 'evento\' OR \'1\'=\'1'
     """
-    stmt = select(Event).where(Event.name.ilike(f"%{name}%"))
-    results = session.execute(stmt).scalars().all()
-    return [
-        {
-            "id": event.id,
-            "name": event.name,
-            "price": event.price,
-        }
-        for event in results
-    ]
+    # Só as colunas da resposta, direto do Core: sem montar objetos ORM
+    # (identity map) que seriam jogados fora logo em seguida
+    result = queries.execute(session, queries.SEARCH_EVENTS, pattern=f"%{name}%")
+    return FastJSONResponse(rows_to_dicts(result))
+
+
+# ═══════════════════════════════════════════════════════════
+# CALENDÁRIO: faixa de datas com keyset + visão de mês
+# ═══════════════════════════════════════════════════════════
+
+
+@router.get("/events")
+def list_events_by_date(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    limit: int = Query(50, gt=0, le=200),
+    cursor: str | None = None,
+    session: Session = Depends(get_db),
+) -> dict:
+    """
+    Eventos em [from, to) por data, paginados por cursor (keyset):
+
+        GET /events?from=2026-11-14&to=2026-11-16        # "este fim de semana"
+        GET /events?from=...&to=...&cursor=<next_cursor>
+
+    Ver app/event_calendar.py.
+    """
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' deve ser depois de 'from'",
+        )
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    events, next_cursor = events_in_range(session, start, end, limit, after)
+    return FastJSONResponse({"events": events, "next_cursor": next_cursor})
+
+
+@router.get("/events/calendar/{year}/{month}")
+def event_calendar_month(
+    year: int,
+    month: int,
+    session: Session = Depends(get_db),
+) -> dict:
+    """Quantidade de eventos por dia do mês (só dias com eventos)."""
+    if not 1 <= month <= 12 or not 1 <= year <= 9998:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Mês inválido",
+        )
+    return FastJSONResponse({"year": year, "month": month,
+                             "days": month_view(session, year, month)})
+
+
+# ═══════════════════════════════════════════════════════════
+# ARQUIVO FRIO: eventos passados (somente leitura)
+# ═══════════════════════════════════════════════════════════
+
+
+@router.get("/archive/events")
+def list_archived_events(name: str | None = None, limit: int = 50) -> List[dict]:
+    """
+    Busca eventos arquivados varrendo os arquivos de ARCHIVE_DIR.
+    Não toca o banco (os eventos já saíram das tabelas vivas).
+    """
+    return FastJSONResponse(search_archived_events(name=name, limit=limit))
+
+
+@router.get("/archive/events/{event_id}")
+def get_archived_event(event_id: int) -> dict:
+    """Evento arquivado com seus tickets."""
+    event = find_archived_event(event_id)
+    if event is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Archived event not found",
+        )
+    return event
+
+
+# ═══════════════════════════════════════════════════════════
+# ANALYTICS: respondem só pelos rollups (nunca varrem tickets)
+# ═══════════════════════════════════════════════════════════
+
+
+@router.get("/analytics/events/{event_id}/sales", response_model=List[SalesBucket])
+def get_event_sales(
+    event_id: int,
+    granularity: str = "minute",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    session: Session = Depends(get_db),
+) -> List[dict]:
+    """Série temporal de vendas (granularity = minute | hour)."""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"granularity deve ser um de {sorted(GRANULARITIES)}",
+        )
+    # Dado interno (rollups): o response_model fica só para a documentação
+    return FastJSONResponse(
+        sales_timeseries(session, event_id, granularity, start, end))
+
+
+@router.get("/analytics/top-events", response_model=List[TopEvent])
+def get_top_events(limit: int = 10, session: Session = Depends(get_db)) -> List[dict]:
+    """Ranking de eventos por ingressos vendidos."""
+    return FastJSONResponse(top_events(session, limit=min(limit, 100)))
+
+
+@router.get("/analytics/events/{event_id}/sell-through", response_model=SellThrough)
+def get_sell_through(event_id: int, session: Session = Depends(get_db)) -> dict:
+    """Percentual vendido da capacidade do evento."""
+    result = sell_through(session, event_id)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No sales data for this event",
+        )
+    return result
+
+
+# ═══════════════════════════════════════════════════════════
+# OUTBOX: lag do dispatcher (python -m app.outbox)
+# ═══════════════════════════════════════════════════════════
+
+
+@router.get("/outbox/stats")
+def get_outbox_stats(session: Session = Depends(get_db)) -> dict:
+    """Pendentes, mortas e idade da mensagem mais antiga (lag)."""
+    return outbox_stats(session)
+
+
+# ═══════════════════════════════════════════════════════════
+# IMPORT DO CATÁLOGO (CSV/NDJSON em streaming, ver app/importer.py)
+# ═══════════════════════════════════════════════════════════
+
+
+def _import_progress(path: str, fmt: str):
+    """Roda o import (no threadpool) emitindo uma linha NDJSON por mensagem."""
+    try:
+        with open(path, "rb") as raw, SessionLocal() as session:
+            for message in import_catalog(session, raw, fmt, os.path.getsize(path)):
+                yield dumps(message) + b"\n"
+    finally:
+        os.unlink(path)
+
+
+def _import_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Arquivo de import maior que {IMPORT_MAX_BYTES} bytes",
+    )
+
+
+@router.post("/import", dependencies=[Depends(require_admin)])
+async def import_events(request: Request, format: str | None = None) -> StreamingResponse:
+    """
+    Import em lote de eventos e assentos (admin: header X-Admin-Token). O
+    corpo é o arquivo CRU (CSV ou NDJSON), não multipart:
+
+        curl -T catalogo.csv -H "Content-Type: text/csv" \\
+             -H "X-Admin-Token: ..." .../import
+
+    O corpo vai para um arquivo temporário em pedaços (nunca inteiro na
+    memória), até IMPORT_MAX_BYTES: passou disso, 413 e o arquivo é
+    apagado. A resposta é NDJSON com erros por linha e o progresso a cada
+    chunk gravado.
+    """
+    fmt = format or detect_format("", request.headers.get("content-type", ""))
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format deve ser um de {sorted(IMPORT_FORMATS)}",
+        )
+    # Content-Length declarado já acima do limite: recusa sem ler nada
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > IMPORT_MAX_BYTES:
+        raise _import_too_large()
+
+    upload = tempfile.NamedTemporaryFile(prefix="import-", suffix=f".{fmt}",
+                                         delete=False)
+    try:
+        with upload:
+            # Conta o que chega de fato (chunked ou Content-Length mentiroso)
+            received = 0
+            async for piece in request.stream():
+                received += len(piece)
+                if received > IMPORT_MAX_BYTES:
+                    raise _import_too_large()
+                await run_in_threadpool(upload.write, piece)
+    except BaseException:
+        os.unlink(upload.name)
+        raise
+    return StreamingResponse(_import_progress(upload.name, fmt),
+                             media_type="application/x-ndjson")
+
+
+# ═══════════════════════════════════════════════════════════
+# FEED AO VIVO: disponibilidade por evento (SSE)
+# ═══════════════════════════════════════════════════════════
+
+
+def _available_tickets(event_id: int) -> int | None:
+    """Snapshot inicial pelos rollups; sem rollup, conta na partição do evento."""
+    with SessionLocal() as session:
+        total = session.get(EventSalesTotal, event_id)
+        if total is not None:
+            return total.capacity - total.reserved_count
+
+        event = session.get(Event, event_id)
+        if event is None:
+            return None
+        return session.execute(
+            select(func.count(Ticket.id)).where(
+                *ticket_partition_filter(event.id, event.date),
+                Ticket.is_reserved.is_(False),
+            )
+        ).scalar()
+
+
+@router.get("/events/{event_id}/availability/stream")
+async def stream_availability(event_id: int) -> StreamingResponse:
+    """
+    Server-Sent Events com deltas de disponibilidade do evento.
+    Substitui o polling do seat-picker: 1 conexão, push a cada mudança.
+    """
+    available = await run_in_threadpool(_available_tickets, event_id)
+    if available is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found",
+        )
+    return StreamingResponse(
+        broker.stream(event_id, available, fetch=_available_tickets),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ═══════════════════════════════════════════════════════════
+# APP: factory + lifespan (engine e warm-up no startup)
+# ═══════════════════════════════════════════════════════════
+
+
+def _warm_reserve_path(session: Session) -> None:
+    """Queries da reserva com ids inexistentes (só compilam e cacheiam)."""
+    try:
+        lock_user_row(0, session)
+    except HTTPException:
+        pass  # 404 esperado: o usuário 0 não existe
+    check_user_ticket_limit(0, session)
+    session.get(Event, 0)
+    find_available_ticket(session, 0, datetime(2000, 1, 1))
+
+
+def _warm_listings(session: Session) -> None:
+    queries.execute(session, queries.SEARCH_EVENTS, pattern="%warmup%").all()
+
+
+WARMUP_QUERIES = [_warm_reserve_path, _warm_listings]
+
+
+def _load_seat_index() -> None:
+    """Mapas de assentos dos eventos de hoje em diante (os outros: sob demanda)."""
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    try:
+        with SessionLocal() as session:
+            loaded = seat_index.rebuild(session, since=today)
+        logger.info("Índice de assentos: %s eventos carregados", loaded)
+    except SQLAlchemyError as exc:
+        logger.warning("Índice de assentos não carregado no startup: %s", exc)
+
+
+def _load_email_prefilter() -> None:
+    """Carrega os emails existentes no Bloom filter (em lotes, sem ORM)."""
+    try:
+        with SessionLocal() as session:
+            emails = session.execute(
+                select(User.email).execution_options(yield_per=5000)).scalars()
+            loaded = email_prefilter.load(email for email in emails if email)
+        logger.info("Prefiltro de emails: %s emails carregados", loaded)
+    except SQLAlchemyError as exc:
+        logger.warning("Prefiltro de emails desligado (todo cadastro vai ao banco): %s", exc)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup: cria o engine, liga a instrumentação e aquece pool + cache de
+    statements ANTES do worker aceitar requests. Shutdown: fecha o pool.
+    """
+    engine = init_engine()
+    install_prepared_statements(engine)
+    instrument_engine(engine)
+    instrument_profiling(engine)
+    instrument_tracing(engine)
+    instrument_sessions(SessionLocal)
+    instrument_admission(engine)
+    logger.info("Serialização JSON: %s", JSON_BACKEND)
+    app.state.warmup = await run_in_threadpool(
+        warm_up, engine, DB_WARMUP_CONNECTIONS, WARMUP_QUERIES)
+    await run_in_threadpool(_load_seat_index)
+    await run_in_threadpool(_load_email_prefilter)
+    # Vários workers (app/server.py): cada um publica seu snapshot de métricas
+    snapshots = SnapshotWriter(METRICS_MULTIPROC_DIR).start() \
+        if METRICS_MULTIPROC_DIR else None
+    yield
+    if snapshots is not None:
+        snapshots.stop()
+    hasher.shutdown()
+    # Esquece o engine também: um novo startup (testes, --factory) cria outro
+    dispose_engine()
+
+
+def create_app() -> FastAPI:
+    """
+    Monta a app sem efeitos colaterais: nada de engine nem conexão aqui.
+
+        uvicorn app.main:app                      (instância padrão)
+        uvicorn --factory app.main:create_app     (uma app nova por worker)
+    """
+    application = FastAPI(
+        title="Ticket reservation API - Semana 5",
+        default_response_class=FastJSONResponse,
+        lifespan=lifespan,
+    )
+    application.add_middleware(SQLProfilerMiddleware)
+    # Dentro das métricas: os 503 de descarte aparecem em http_requests_total
+    application.add_middleware(AdmissionMiddleware)
+    application.add_middleware(MetricsMiddleware)
+    application.add_middleware(TracingMiddleware)
+    application.include_router(router)
+    return application
+
+
+app = create_app()
@@ -0,0 +1,224 @@
+"""
+Diagnóstico de memória do processo (rotas /admin/memory, só admin).
+
+Barato, sempre disponível:
+- RSS (o que o SO vê) e USS (memória só deste processo, sem as páginas
+  compartilhadas com outros workers) via psutil
+- GC: objetos pendentes por geração e coletas feitas
+- identity map das Sessions vivas: cada objeto ORM carregado fica preso
+  na Session até ela fechar; uma listagem com joinedload de 10.000
+  ingressos aparece aqui como uma Session gigante
+
+Sob demanda, com custo limitado (tracemalloc):
+- tracemalloc deixa cada alocação ~30% mais lenta e guarda um traceback
+  por bloco vivo. Por isso fica DESLIGADO e só roda entre start e stop,
+  com poucos frames (1 por padrão), no máximo TRACEMALLOC_MAX_SECONDS
+  (depois desliga sozinho) e no máximo TRACEMALLOC_MAX_SNAPSHOTS
+  snapshots guardados (o mais antigo sai).
+- snapshot: top N linhas de código que mais alocaram
+- diff entre dois snapshots: o que cresceu (ex.: antes e depois de
+  repetir /events-good algumas vezes)
+
+Memória é por processo: com vários workers, cada request cai num deles.
+"""
+import gc
+import itertools
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import (
+    TRACEMALLOC_FRAMES, TRACEMALLOC_MAX_SECONDS, TRACEMALLOC_MAX_SNAPSHOTS,
+)
+
+MB = 1024 * 1024
+
+# Sessions com transação aberta em algum momento (somem sozinhas ao serem
+# coletadas: a WeakSet não segura nenhuma)
+_live_sessions: "weakref.WeakSet[Session]" = weakref.WeakSet()
+
+
+def _track_session(session: Session, transaction, connection) -> None:
+    _live_sessions.add(session)
+
+
+def instrument_sessions(factory: sessionmaker) -> None:
+    """Registra as Sessions da factory (idempotente; 1 add por transação)."""
+    if not event.contains(factory, "after_begin", _track_session):
+        event.listen(factory, "after_begin", _track_session)
+
+
+def session_stats(top: int = 5) -> dict:
+    """Sessions vivas e o tamanho do identity map de cada uma."""
+    sizes = sorted((len(session.identity_map) for session in list(_live_sessions)),
+                   reverse=True)
+    return {
+        "live": len(sizes),
+        "identity_map_objects": sum(sizes),
+        "largest_identity_maps": sizes[:top],
+    }
+
+
+def process_memory() -> dict:
+    import psutil
+
+    process = psutil.Process(os.getpid())
+    info = process.memory_info()
+    usage = {"pid": process.pid, "rss_mb": round(info.rss / MB, 2),
+             "vms_mb": round(info.vms / MB, 2)}
+    try:
+        # USS lê /proc/<pid>/smaps: ok sob demanda, caro para polling rápido
+        usage["uss_mb"] = round(process.memory_full_info().uss / MB, 2)
+    except (psutil.AccessDenied, AttributeError):
+        usage["uss_mb"] = None
+    return usage
+
+
+def gc_stats() -> dict:
+    return {
+        "pending_by_generation": list(gc.get_count()),
+        "thresholds": list(gc.get_threshold()),
+        "collections": [stat["collections"] for stat in gc.get_stats()],
+        "collected": [stat["collected"] for stat in gc.get_stats()],
+        "uncollectable": len(gc.garbage),
+    }
+
+
+# ═══════════════════════════════════════════════════════════
+# TRACEMALLOC (sob demanda)
+# ═══════════════════════════════════════════════════════════
+
+
+class SnapshotNotFound(KeyError):
+    """Snapshot descartado (limite) ou de antes do último stop."""
+
+
+class TracemallocSampler:
+    """Liga/desliga o tracemalloc e guarda poucos snapshots."""
+
+    # Alocações do próprio diagnóstico não interessam
+    _FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self, max_snapshots: int = TRACEMALLOC_MAX_SNAPSHOTS,
+                 max_seconds: float = TRACEMALLOC_MAX_SECONDS) -> None:
+        self.max_snapshots = max_snapshots
+        self.max_seconds = max_seconds
+        self.started_at: Optional[float] = None
+        self._snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = TRACEMALLOC_FRAMES,
+              seconds: Optional[float] = None) -> dict:
+        seconds = min(seconds or self.max_seconds, self.max_seconds)
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, frames))
+                self.started_at = time.monotonic()
+            # Desliga sozinho: ninguém esquece o tracemalloc ligado em produção
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(seconds, self.stop)
+            self._timer.daemon = True
+            self._timer.start()
+        return self.status()
+
+    def stop(self) -> dict:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            tracemalloc.stop()  # também libera os tracebacks guardados
+            self.started_at = None
+            self._snapshots.clear()
+        return self.status()
+
+    def status(self) -> dict:
+        status = {"running": self.running,
+                  "snapshots": list(self._snapshots),
+                  "max_snapshots": self.max_snapshots}
+        if self.running:
+            current, peak = tracemalloc.get_traced_memory()
+            status.update({
+                "frames": tracemalloc.get_traceback_limit(),
+                # None: ligado por fora (PYTHONTRACEMALLOC), sem limite de tempo
+                "running_seconds": (round(time.monotonic() - self.started_at, 1)
+                                    if self.started_at is not None else None),
+                "traced_mb": round(current / MB, 2),
+                "traced_peak_mb": round(peak / MB, 2),
+                "overhead_mb": round(tracemalloc.get_tracemalloc_memory() / MB, 2),
+            })
+        return status
+
+    def take(self) -> int:
+        """Snapshot agora; devolve o id (o mais antigo sai se passar do limite)."""
+        if not self.running:
+            raise RuntimeError("tracemalloc desligado: chame start antes")
+        snapshot = tracemalloc.take_snapshot().filter_traces(self._FILTERS)
+        with self._lock:
+            snapshot_id = next(self._ids)
+            self._snapshots[snapshot_id] = snapshot
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return snapshot_id
+
+    def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        try:
+            return self._snapshots[snapshot_id]
+        except KeyError:
+            raise SnapshotNotFound(snapshot_id) from None
+
+    def top(self, snapshot_id: int, limit: int = 20,
+            group_by: str = "lineno") -> List[dict]:
+        stats = self._get(snapshot_id).statistics(group_by)
+        return [_stat(stat) for stat in stats[:limit]]
+
+    def diff(self, snapshot_id: int, base_id: int, limit: int = 20,
+             group_by: str = "lineno") -> List[dict]:
+        """O que mudou de `base_id` para `snapshot_id` (maior crescimento 1º)."""
+        stats = self._get(snapshot_id).compare_to(self._get(base_id), group_by)
+        return [_stat_diff(stat) for stat in stats[:limit]]
+
+
+def _where(traceback: tracemalloc.Traceback) -> List[str]:
+    return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+
+def _stat(stat: tracemalloc.Statistic) -> dict:
+    return {"where": _where(stat.traceback), "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count}
+
+
+def _stat_diff(stat: tracemalloc.StatisticDiff) -> dict:
+    return {"where": _where(stat.traceback), "size_kb": round(stat.size / 1024, 1),
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "count": stat.count, "count_diff": stat.count_diff}
+
+
+sampler = TracemallocSampler()
+
+
+def memory_report() -> Dict[str, object]:
+    """Resumo barato (sem tracemalloc): o que o GET /admin/memory devolve."""
+    return {
+        **process_memory(),
+        "gc": gc_stats(),
+        "sessions": session_stats(),
+        "tracemalloc": sampler.status(),
+    }
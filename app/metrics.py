@@ -0,0 +1,430 @@
+"""
+Métricas no formato de exposição do Prometheus (GET /metrics).
+
+Implementação própria e enxuta (sem prometheus_client):
+- Counter / Gauge / Histogram com labels, protegidos por um lock cada
+- MetricsMiddleware (ASGI puro): latência por rota, in-flight, status
+- instrument_engine: contagem e duração de queries via eventos
+  before/after_cursor_execute, também agregadas POR REQUEST
+- estatísticas do pool lidas na hora do scrape (custo zero no hot path)
+
+Custo por request: 2 perf_counter, algumas buscas em dict e 3 locks curtos.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import METRICS_MULTIPROC_DIR
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues,
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}",
+                f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(total: Dict[LabelValues, float], samples: Dict[LabelValues, float]) -> None:
+        for labels, value in samples.items():
+            total[labels] = total.get(labels, 0) + value
+
+    def render(self, samples: Optional[Dict[LabelValues, float]] = None) -> List[str]:
+        samples = self.samples() if samples is None else samples
+        lines = self.header()
+        for labels, value in sorted(samples.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} "
+                         f"{_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Valor que sobe e desce; ou calculado no scrape via `callback`."""
+    kind = "gauge"
+
+    def __init__(self, *args, callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+                 **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.callback = callback
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def samples(self) -> Dict[LabelValues, float]:
+        if self.callback is not None:
+            return self.callback()
+        return super().samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [contagem por bucket (+Inf no fim), soma, total]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(labels)
+            if data is None:
+                data = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+
+    def samples(self) -> Dict[LabelValues, list]:
+        with self._lock:
+            return {k: [list(v[0]), v[1], v[2]] for k, v in self._values.items()}
+
+    @staticmethod
+    def merge(total: Dict[LabelValues, list], samples: Dict[LabelValues, list]) -> None:
+        for labels, (counts, total_sum, count) in samples.items():
+            current = total.setdefault(labels, [[0] * len(counts), 0.0, 0])
+            current[0] = [a + b for a, b in zip(current[0], counts)]
+            current[1] += total_sum
+            current[2] += count
+
+    def render(self, samples: Optional[Dict[LabelValues, list]] = None) -> List[str]:
+        samples = self.samples() if samples is None else samples
+        lines = self.header()
+        bounds = self.buckets + (float("inf"),)
+        for labels, (counts, total_sum, count) in sorted(samples.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                label_str = _format_labels(self.labelnames, labels,
+                                           ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {total_sum!r}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, merged: Optional[Dict[str, dict]] = None) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render(None if merged is None
+                                       else merged.get(metric.name, {})))
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, list]:
+        """Amostras de todas as métricas em formato JSON (labels como lista)."""
+        return {
+            metric.name: [[list(labels), value]
+                          for labels, value in metric.samples().items()]
+            for metric in self._metrics
+        }
+
+    def merge_snapshots(self, snapshots: List[Tuple[bool, Dict[str, list]]]) -> Dict[str, dict]:
+        """Soma os snapshots dos workers. Gauges de worker morto são ignorados."""
+        merged: Dict[str, dict] = {metric.name: {} for metric in self._metrics}
+        for metric in self._metrics:
+            for alive, data in snapshots:
+                if isinstance(metric, Gauge) and not alive:
+                    continue
+                samples = {tuple(labels): value
+                           for labels, value in data.get(metric.name, [])}
+                metric.merge(merged[metric.name], samples)
+        return merged
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Latência dos requests HTTP por rota",
+    ["method", "route"]))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Requests HTTP em andamento"))
+REQUESTS_TOTAL = registry.register(Counter(
+    "http_requests_total", "Requests HTTP por rota e status",
+    ["method", "route", "status"]))
+DB_QUERY_DURATION = registry.register(Histogram(
+    "db_query_duration_seconds", "Duração de cada statement SQL",
+    buckets=QUERY_BUCKETS))
+DB_QUERIES_PER_REQUEST = registry.register(Histogram(
+    "db_queries_per_request", "Statements SQL por request",
+    ["route"], buckets=COUNT_BUCKETS))
+DB_TIME_PER_REQUEST = registry.register(Histogram(
+    "db_time_per_request_seconds", "Tempo total de SQL por request",
+    ["route"], buckets=QUERY_BUCKETS))
+RESERVATION_OUTCOMES = registry.register(Counter(
+    "reservation_outcomes_total", "Resultado das reservas por status HTTP",
+    ["status"]))
+SIGNUP_EMAIL_CHECKS = registry.register(Counter(
+    "signup_email_checks_total",
+    "Checagem de email no cadastro (bloom_skip = SELECT evitado)",
+    ["result"]))
+TRANSACTION_RETRIES = registry.register(Counter(
+    "db_transaction_retries_total",
+    "Transações reexecutadas por erro transitório (ver app/retry.py)",
+    ["operation", "reason"]))
+TRANSACTION_RETRY_GIVEUPS = registry.register(Counter(
+    "db_transaction_retry_giveups_total",
+    "Erros transitórios que não foram mais reexecutados",
+    ["operation", "cause"]))
+WAITLIST_OPERATIONS = registry.register(Counter(
+    "waitlist_operations_total",
+    "Fila de espera: join, rejoin, leave, assigned e skipped (ver app/waitlist.py)",
+    ["operation"]))
+ADMISSION_DECISIONS = registry.register(Counter(
+    "admission_decisions_total",
+    "Requests admitidos/descartados pelo limite adaptativo (ver app/admission.py)",
+    ["priority", "outcome"]))
+ADMISSION_LIMIT = registry.register(Gauge(
+    "admission_concurrency_limit", "Limite atual de requests em andamento"))
+ADMISSION_IN_FLIGHT = registry.register(Gauge(
+    "admission_in_flight", "Requests admitidos ainda em andamento"))
+DB_CONNECTION_WAIT = registry.register(Histogram(
+    "db_connection_wait_seconds",
+    "Do início do request até o checkout da 1ª conexão (threadpool + pool)",
+    buckets=QUERY_BUCKETS))
+
+# [queries, segundos] do request corrente. O threadpool do Starlette copia o
+# contexto, então a MESMA lista é vista pela rota síncrona.
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+
+# ═══════════════════════════════════════════════════════════
+# SQLALCHEMY
+# ═══════════════════════════════════════════════════════════
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_QUERY_DURATION.observe(elapsed)
+    current = _request_db.get()
+    if current is not None:
+        current[0] += 1
+        current[1] += elapsed
+
+
+def _pool_stats(engine: Engine) -> Dict[LabelValues, float]:
+    pool = engine.pool
+    stats = {}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            stats[(name,)] = method()
+    return stats
+
+
+# Engine cujas estatísticas de pool o gauge publica (o último instrumentado)
+_pool_engine: Optional[Engine] = None
+
+
+def _pool_gauge_samples() -> Dict[LabelValues, float]:
+    return _pool_stats(_pool_engine) if _pool_engine is not None else {}
+
+
+DB_POOL_CONNECTIONS = registry.register(Gauge(
+    "db_pool_connections", "Conexões do pool por estado", ["state"],
+    callback=_pool_gauge_samples))
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Liga contadores de query e gauges do pool a um Engine (idempotente)."""
+    global _pool_engine
+    _pool_engine = engine
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ═══════════════════════════════════════════════════════════
+# ASGI
+# ═══════════════════════════════════════════════════════════
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro (sem BaseHTTPMiddleware, que custa uma task extra)."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = ["500"]
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                status_holder[0] = str(message["status"])
+            await send(message)
+
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            _request_db.reset(token)
+
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.observe(elapsed, method, route_path)
+            REQUESTS_TOTAL.inc(method, route_path, status_holder[0])
+            DB_QUERIES_PER_REQUEST.observe(db[0], route_path)
+            DB_TIME_PER_REQUEST.observe(db[1], route_path)
+
+
+# ═══════════════════════════════════════════════════════════
+# MULTI-PROCESSO (python -m app.server)
+# ═══════════════════════════════════════════════════════════
+#
+# Cada worker tem o próprio registry (nada compartilhado entre processos).
+# Com METRICS_MULTIPROC_DIR, cada um grava `metrics-<pid>.json` a cada
+# SNAPSHOT_INTERVAL segundos e no shutdown; o /metrics de qualquer worker
+# soma todos os arquivos. Counters/histogramas de workers mortos continuam
+# na soma (o total não "volta"); gauges só contam workers vivos.
+
+SNAPSHOT_INTERVAL = 2.0
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def write_snapshot(directory: str) -> None:
+    path = _snapshot_path(directory, os.getpid())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(registry.snapshot(), fh)
+    os.replace(tmp, path)  # atômico: quem lê nunca vê arquivo pela metade
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_snapshots(directory: str) -> List[Tuple[bool, Dict[str, list]]]:
+    snapshots = []
+    for name in os.listdir(directory):
+        if not (name.startswith("metrics-") and name.endswith(".json")):
+            continue
+        pid = int(name[len("metrics-"):-len(".json")])
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as fh:
+                snapshots.append((_pid_alive(pid), json.load(fh)))
+        except (OSError, ValueError):
+            continue  # worker reescrevendo ou arquivo removido no meio
+    return snapshots
+
+
+class SnapshotWriter:
+    """Thread daemon que grava o snapshot do worker periodicamente."""
+
+    def __init__(self, directory: str, interval: float = SNAPSHOT_INTERVAL) -> None:
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="metrics-snapshot")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            write_snapshot(self.directory)
+
+    def start(self) -> "SnapshotWriter":
+        os.makedirs(self.directory, exist_ok=True)
+        write_snapshot(self.directory)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+        write_snapshot(self.directory)
+
+
+def render_metrics(multiproc_dir: str = METRICS_MULTIPROC_DIR) -> str:
+    if not multiproc_dir:
+        return registry.render()
+    write_snapshot(multiproc_dir)  # o próprio worker sempre fresco
+    return registry.render(registry.merge_snapshots(read_snapshots(multiproc_dir)))
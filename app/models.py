@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import date as date_type, datetime
 # Importar Base do config para garantir que o Alembic e o main.py enxerguem as tabelas
 from app.config import Base
 from sqlalchemy.sql import func
@@ -12,6 +12,8 @@ class User(Base):
     id: int = Column(Integer, primary_key=True, index=True)
     name: str = Column(String, index=True)
     email: str = Column(String, unique=True, index=True)
+    # scrypt (ver app/passwords.py); NULL para usuários criados pelo /seed
+    password_hash: str | None = Column(String, nullable=True)
     created_at = Column(DateTime, server_default=func.now(), nullable=True)
     events = relationship(
         "Event",
@@ -31,6 +33,8 @@ class Event(Base):
     description: str = Column(String)
     date: datetime = Column(DateTime, default=datetime.utcnow)
     price: float = Column(Float)
+    # Id do evento no sistema do organizador (chave do upsert do importador)
+    external_ref: str | None = Column(String, nullable=True)
 
     creator_id: int = Column(Integer, ForeignKey("users.id"))
 
@@ -40,12 +44,25 @@ class Event(Base):
     )
 
     # CORREÇÃO: Removido ": list"
+    # O join inclui a data: no Postgres particionado (ver app/partitioning.py)
+    # o lazy load de event.tickets toca só a partição do mês do evento.
     tickets = relationship(
         "Ticket",
+        primaryjoin="and_(Event.id == foreign(Ticket.event_id), "
+                    "Event.date == foreign(Ticket.event_date))",
         back_populates="event",
         cascade="all, delete-orphan"
     )
 
+    # Índice único nomeado: alvo do ON CONFLICT (external_ref) do importador.
+    # (date, id): calendário por faixa de datas com paginação keyset; no
+    # Postgres o INCLUDE cobre as colunas da listagem (index-only scan).
+    __table_args__ = (
+        Index("ix_events_external_ref", "external_ref", unique=True),
+        Index("ix_events_date_id", "date", "id",
+              postgresql_include=["name", "price"]),
+    )
+
     def __repr__(self) -> str:
         return f"<Event(id={self.id}, name={self.name}, tickets={len(self.tickets)})>"
 
@@ -55,13 +72,199 @@ class Ticket(Base):
 
     id: int = Column(Integer, primary_key=True, index=True)
     seat_number: str = Column(String)
+    # Coordenadas do assento (ver app/seating.py); NULL em ingressos sem mapa
+    section: str | None = Column(String, nullable=True)
+    row: int | None = Column(Integer, nullable=True)
+    number: int | None = Column(Integer, nullable=True)
     price: float = Column(Float)
     event_id: int = Column(Integer, ForeignKey("events.id"), index=True)
+    # Cópia de events.date: chave de particionamento (RANGE mensal)
+    event_date: datetime = Column(DateTime, nullable=False)
     is_reserved: bool = Column(Boolean, default=False, index=True)
     reserved_at: datetime | None = Column(DateTime, nullable=True)
     user_id: int | None = Column(
         Integer, ForeignKey("users.id"), nullable=True)
-    event = relationship("Event", back_populates="tickets")
+    event = relationship(
+        "Event",
+        primaryjoin="and_(Event.id == foreign(Ticket.event_id), "
+                    "Event.date == foreign(Ticket.event_date))",
+        back_populates="tickets"
+    )
+
+    # Um assento por evento (inclui event_date: índice único em tabela
+    # particionada precisa da chave de partição)
+    # Parcial por usuário: o limite de ingressos por usuário (queries.py,
+    # ACTIVE_TICKET_COUNT) lê só as reservas ativas dele. O predicado é o
+    # mesmo `IS` que a query gera em cada banco (no SQLite o planner só usa
+    # o índice parcial se o termo do WHERE bater).
+    __table_args__ = (
+        Index("ix_tickets_event_seat", "event_id", "event_date",
+              "section", "row", "number", unique=True),
+        Index("ix_tickets_user_reserved", "user_id",
+              sqlite_where=is_reserved.is_(True),
+              postgresql_where=is_reserved.is_(True)),
+    )
 
     def __repr__(self) -> str:
         return f"<Ticket(id={self.id}, seat={self.seat_number})>"
+
+
+class UserSession(Base):
+    """Sessão de login compartilhada entre workers (SESSION_BACKEND=sql)."""
+    __tablename__ = "user_sessions"
+    __table_args__ = (
+        Index("ix_user_sessions_expires_at", "expires_at"),
+    )
+
+    # SHA-256 do token (o token em si nunca é gravado)
+    token_hash: str = Column(String(64), primary_key=True)
+    user_id: int = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at: datetime = Column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<UserSession(user_id={self.user_id}, expires_at={self.expires_at})>"
+
+
+# ═══════════════════════════════════════════════════════════
+# ROLLUPS DE VENDAS (atualizados incrementalmente, ver app/rollups.py)
+# ═══════════════════════════════════════════════════════════
+
+
+class SalesRollup(Base):
+    """Vendas por evento por minuto (delta líquido: reservas - cancelamentos)."""
+    __tablename__ = "sales_rollups"
+
+    event_id: int = Column(Integer, primary_key=True)
+    bucket_start: datetime = Column(DateTime, primary_key=True)
+    reserved_count: int = Column(Integer, nullable=False, default=0)
+    revenue: float = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self) -> str:
+        return (f"<SalesRollup(event_id={self.event_id}, "
+                f"bucket={self.bucket_start}, reserved={self.reserved_count})>")
+
+
+class EventSalesTotal(Base):
+    """Totais por evento: capacidade, vendidos e receita (1 linha por evento)."""
+    __tablename__ = "event_sales_totals"
+    __table_args__ = (
+        Index("ix_event_sales_totals_reserved_count", "reserved_count"),
+    )
+
+    event_id: int = Column(Integer, primary_key=True)
+    capacity: int = Column(Integer, nullable=False, default=0)
+    reserved_count: int = Column(Integer, nullable=False, default=0)
+    revenue: float = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self) -> str:
+        return (f"<EventSalesTotal(event_id={self.event_id}, "
+                f"reserved={self.reserved_count}/{self.capacity})>")
+
+
+class EventDayBucket(Base):
+    """Eventos por dia (visão de mês do calendário, ver app/event_calendar.py)."""
+    __tablename__ = "event_day_buckets"
+
+    day: date_type = Column(Date, primary_key=True)
+    event_count: int = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<EventDayBucket(day={self.day}, events={self.event_count})>"
+
+
+# ═══════════════════════════════════════════════════════════
+# FILA DE ESPERA POR EVENTO (ver app/waitlist.py)
+# ═══════════════════════════════════════════════════════════
+
+
+class WaitlistEntry(Base):
+    """Usuário esperando um ingresso de um evento esgotado."""
+    __tablename__ = "waitlist_entries"
+    __table_args__ = (
+        # Cabeça da fila: WHERE event_id = ? ORDER BY position LIMIT 1
+        Index("ix_waitlist_entries_event_position", "event_id", "position", unique=True),
+        # 1 lugar por usuário por evento (entrar de novo devolve o mesmo)
+        Index("ix_waitlist_entries_event_user", "event_id", "user_id", unique=True),
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    event_id: int = Column(Integer, nullable=False)
+    user_id: int = Column(Integer, nullable=False)
+    # Senha do usuário na fila (1, 2, 3... por evento; nunca reaproveitada)
+    position: int = Column(Integer, nullable=False)
+    joined_at: datetime = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return (f"<WaitlistEntry(event_id={self.event_id}, user_id={self.user_id}, "
+                f"position={self.position})>")
+
+
+class WaitlistCounter(Base):
+    """Contadores da fila de um evento (1 linha por evento)."""
+    __tablename__ = "waitlist_counters"
+
+    event_id: int = Column(Integer, primary_key=True)
+    # Última senha entregue e última senha atendida (a fila está entre as duas)
+    next_position: int = Column(Integer, nullable=False, default=0)
+    served_position: int = Column(Integer, nullable=False, default=0)
+    waiting: int = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return (f"<WaitlistCounter(event_id={self.event_id}, waiting={self.waiting}, "
+                f"served={self.served_position}/{self.next_position})>")
+
+
+# ═══════════════════════════════════════════════════════════
+# OUTBOX TRANSACIONAL (ver app/outbox.py)
+# ═══════════════════════════════════════════════════════════
+
+
+class OutboxMessage(Base):
+    """Mensagem gravada na mesma transação da reserva/cancelamento."""
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        # Fila: WHERE status = 'pending' ORDER BY id (entregues são apagadas)
+        Index("ix_outbox_messages_pending", "status", "id"),
+        Index("ix_outbox_messages_event_id", "event_id"),
+        # O consumidor deduplica pelo id: sem AUTOINCREMENT o SQLite reusa o
+        # id da última linha apagada (no Postgres a sequence nunca volta)
+        {"sqlite_autoincrement": True},
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    topic: str = Column(String, nullable=False)
+    event_id: int = Column(Integer, nullable=False)
+    payload: str = Column(Text, nullable=False)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow, nullable=False)
+    status: str = Column(String, default="pending", nullable=False)
+    attempts: int = Column(Integer, default=0, nullable=False)
+    next_attempt_at: datetime | None = Column(DateTime, nullable=True)
+    last_error: str | None = Column(String, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<OutboxMessage(id={self.id}, topic={self.topic}, status={self.status})>"
+
+
+# ═══════════════════════════════════════════════════════════
+# BACKFILLS DE MIGRATION (checkpoint para retomar, ver app/backfill.py)
+# ═══════════════════════════════════════════════════════════
+
+
+class BackfillCheckpoint(Base):
+    """Até onde um backfill em lotes já foi (1 linha por backfill)."""
+    __tablename__ = "backfill_checkpoints"
+
+    name: str = Column(String, primary_key=True)
+    table_name: str = Column(String, nullable=False)
+    # Última chave (keyset) já processada; o próximo lote começa depois dela
+    last_key: int = Column(Integer, nullable=False, default=0)
+    rows_updated: int = Column(Integer, nullable=False, default=0)
+    batches: int = Column(Integer, nullable=False, default=0)
+    started_at: datetime = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: datetime = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at: datetime | None = Column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return (f"<BackfillCheckpoint(name={self.name}, last_key={self.last_key}, "
+                f"finished={self.finished_at is not None})>")
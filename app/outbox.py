@@ -0,0 +1,349 @@
+"""
+Outbox transacional + dispatcher para sistemas externos.
+
+1. A reserva/cancelamento grava uma linha em `outbox_messages` NA MESMA
+   transação (`enqueue`). Se a transação faz rollback, a mensagem some junto.
+2. Um dispatcher em background (`OutboxDispatcher`) lê as pendentes em
+   lotes, entrega num sink e apaga as entregues.
+
+Garantias:
+- Ordem por evento: mensagens do mesmo event_id saem na ordem do id; se uma
+  falha, as seguintes do mesmo evento esperam o retry dela.
+- Entrega at-least-once: o consumidor deve deduplicar pelo "id" (nunca
+  reusado, nem depois de a mensagem entregue ser apagada).
+- Retry com backoff exponencial; depois de `max_attempts` vira "dead".
+
+Rode UM dispatcher por banco (no Postgres um advisory lock garante isso):
+    python -m app.outbox --sink file:./outbox.ndjson
+    python -m app.outbox --sink webhook:https://exemplo.com/hooks/tickets
+"""
+import argparse
+import json
+import logging
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+TICKET_RESERVED = "ticket.reserved"
+TICKET_RELEASED = "ticket.released"
+# Ingresso cancelado que foi direto para o 1º da fila de espera (app/waitlist.py):
+# vale como reserva do novo dono e é o aviso para ele
+WAITLIST_ASSIGNED = "waitlist.assigned"
+
+# Chave arbitrária do advisory lock do dispatcher (Postgres)
+_DISPATCHER_LOCK_KEY = 727_001
+
+
+def enqueue(session: Session, topic: str, event_id: int, payload: dict) -> None:
+    """Registra a mensagem na transação corrente (sem I/O externo)."""
+    session.add(OutboxMessage(
+        topic=topic,
+        event_id=event_id,
+        payload=json.dumps(payload, default=str),
+    ))
+
+
+# ═══════════════════════════════════════════════════════════
+# SINKS
+# ═══════════════════════════════════════════════════════════
+
+
+class Sink:
+    """Destino das mensagens. `send` levanta exceção em caso de falha."""
+
+    def send(self, messages: List[dict]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NDJSONFileSink(Sink):
+    """Uma linha JSON por mensagem num arquivo local (append)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def send(self, messages: List[dict]) -> None:
+        for message in messages:
+            self._fh.write(json.dumps(message, default=str) + "\n")
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class WebhookSink(Sink):
+    """POST do lote de um evento como JSON; qualquer status != 2xx é falha."""
+
+    def __init__(self, url: str, timeout: float = 5.0) -> None:
+        import httpx  # só quem usa webhook paga o import
+
+        self.url = url
+        self._client = httpx.Client(timeout=timeout)
+
+    def send(self, messages: List[dict]) -> None:
+        response = self._client.post(self.url, json={"messages": messages})
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class QueueSink(Sink):
+    """
+    Publica em qualquer objeto com `put(item)`.
+
+    Em testes/local usa `queue.Queue` como stand-in do broker; em produção
+    basta passar um adaptador do cliente de fila com a mesma interface.
+    """
+
+    def __init__(self, target: Optional[queue.Queue] = None) -> None:
+        self.queue = target if target is not None else queue.Queue()
+
+    def send(self, messages: List[dict]) -> None:
+        for message in messages:
+            self.queue.put(message)
+
+
+def sink_from_uri(uri: str) -> Sink:
+    """file:caminho.ndjson | webhook:https://... | queue:"""
+    kind, _, target = uri.partition(":")
+    if kind == "file":
+        return NDJSONFileSink(target)
+    if kind == "webhook":
+        return WebhookSink(target)
+    if kind == "queue":
+        return QueueSink()
+    raise ValueError(f"Sink desconhecido: {uri}")
+
+
+# ═══════════════════════════════════════════════════════════
+# DISPATCHER
+# ═══════════════════════════════════════════════════════════
+
+
+def _as_message(row: OutboxMessage) -> dict:
+    return {
+        "id": row.id,
+        "topic": row.topic,
+        "event_id": row.event_id,
+        "created_at": row.created_at.isoformat(),
+        "payload": json.loads(row.payload),
+    }
+
+
+class OutboxDispatcher:
+    """Drena `outbox_messages` em lotes para um sink."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        sink: Sink,
+        batch_size: int = 500,
+        poll_interval: float = 0.5,
+        max_attempts: int = 10,
+        base_backoff: float = 1.0,
+        max_backoff: float = 300.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.sink = sink
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.delivered = 0
+        self.failed = 0
+        self.dead = 0
+        self.last_lag_seconds = 0.0
+        self._stop = threading.Event()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        seconds = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        return timedelta(seconds=seconds)
+
+    def run_once(self) -> int:
+        """Entrega um lote. Retorna quantas mensagens foram entregues."""
+        now = datetime.utcnow()
+        with self.session_factory() as session:
+            # Eventos com mensagem aguardando retry: nada deles sai antes dela
+            blocked = set(session.execute(
+                select(OutboxMessage.event_id).where(
+                    OutboxMessage.status == "pending",
+                    OutboxMessage.next_attempt_at > now,
+                ).distinct()
+            ).scalars())
+
+            rows = session.execute(
+                select(OutboxMessage)
+                .where(OutboxMessage.status == "pending")
+                .where((OutboxMessage.next_attempt_at.is_(None))
+                       | (OutboxMessage.next_attempt_at <= now))
+                .order_by(OutboxMessage.id)
+                .limit(self.batch_size)
+            ).scalars().all()
+
+            groups: Dict[int, List[OutboxMessage]] = {}
+            for row in rows:
+                if row.event_id not in blocked:
+                    groups.setdefault(row.event_id, []).append(row)
+
+            sent_ids: List[int] = []
+            for event_id, group in groups.items():
+                try:
+                    self.sink.send([_as_message(row) for row in group])
+                except Exception as exc:
+                    self._mark_failed(session, group, exc, now)
+                    continue
+                sent_ids.extend(row.id for row in group)
+                self.last_lag_seconds = (now - group[0].created_at).total_seconds()
+
+            if sent_ids:
+                session.execute(
+                    delete(OutboxMessage).where(OutboxMessage.id.in_(sent_ids)))
+            session.commit()
+
+        self.delivered += len(sent_ids)
+        return len(sent_ids)
+
+    def _mark_failed(self, session: Session, group: List[OutboxMessage],
+                     exc: Exception, now: datetime) -> None:
+        """
+        Falha no lote de um evento: só a primeira mensagem conta tentativa;
+        as seguintes já ficam bloqueadas pela ordem por evento.
+        """
+        head = group[0]
+        attempts = head.attempts + 1
+        self.failed += 1
+        values = {
+            "attempts": attempts,
+            "last_error": str(exc)[:500],
+            "next_attempt_at": now + self._backoff(attempts),
+        }
+        if attempts >= self.max_attempts:
+            values["status"] = "dead"
+            self.dead += 1
+            logger.error("Outbox %s morto após %s tentativas: %s",
+                         head.id, attempts, exc)
+        else:
+            logger.warning("Outbox %s falhou (tentativa %s): %s",
+                           head.id, attempts, exc)
+        session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == head.id)
+            .values(**values)
+        )
+
+    def run_forever(self) -> None:
+        """Loop do worker: drena enquanto houver trabalho, senão dorme."""
+        with self.session_factory() as session:
+            engine = session.get_bind()
+        lock_conn = _acquire_dispatcher_lock(engine)
+        if lock_conn is None:
+            logger.warning("Outro dispatcher já está ativo; saindo.")
+            return
+        try:
+            while not self._stop.is_set():
+                try:
+                    delivered = self.run_once()
+                except Exception:
+                    logger.exception("Erro no dispatcher do outbox")
+                    delivered = 0
+                if delivered < self.batch_size:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            if lock_conn is not True:
+                lock_conn.close()
+            self.sink.close()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def metrics(self) -> dict:
+        return {
+            "delivered": self.delivered,
+            "failed_attempts": self.failed,
+            "dead": self.dead,
+            "last_lag_seconds": round(self.last_lag_seconds, 3),
+        }
+
+
+def _acquire_dispatcher_lock(engine: Engine):
+    """
+    Advisory lock no Postgres, preso a uma conexão dedicada que fica aberta
+    enquanto o dispatcher roda. Retorna a conexão, None se outro processo
+    já tem o lock, ou True em bancos sem advisory lock (SQLite).
+    """
+    if engine.dialect.name != "postgresql":
+        return True
+    conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    acquired = conn.execute(
+        text("SELECT pg_try_advisory_lock(:key)"),
+        {"key": _DISPATCHER_LOCK_KEY},
+    ).scalar()
+    if not acquired:
+        conn.close()
+        return None
+    return conn
+
+
+def outbox_stats(session: Session) -> dict:
+    """Métricas de lag direto da tabela (válidas com dispatcher em outro processo)."""
+    now = datetime.utcnow()
+    pending, oldest = session.execute(
+        select(func.count(OutboxMessage.id), func.min(OutboxMessage.created_at))
+        .where(OutboxMessage.status == "pending")
+    ).one()
+    dead = session.execute(
+        select(func.count(OutboxMessage.id))
+        .where(OutboxMessage.status == "dead")
+    ).scalar()
+    return {
+        "pending": pending,
+        "dead": dead,
+        "oldest_pending_age_seconds": (
+            round((now - oldest).total_seconds(), 3) if oldest else 0.0
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dispatcher do outbox")
+    parser.add_argument("--sink", required=True,
+                        help="file:caminho.ndjson | webhook:https://...")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--max-attempts", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from app.config import SessionLocal
+
+    dispatcher = OutboxDispatcher(
+        SessionLocal,
+        sink_from_uri(args.sink),
+        batch_size=args.batch_size,
+        poll_interval=args.poll_interval,
+        max_attempts=args.max_attempts,
+    )
+    try:
+        dispatcher.run_forever()
+    except KeyboardInterrupt:
+        dispatcher.stop()
+    finally:
+        logger.info("Dispatcher encerrado: %s", dispatcher.metrics())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Particionamento da tabela `tickets` no PostgreSQL.
+
+Estratégia: RANGE mensal pela data do evento (`tickets.event_date`, copiada
+de `events.date`). Cada mês vira uma partição pequena:
+- Queries que filtram por `event_id` + `event_date` tocam UMA partição
+  (partition pruning), então os índices dos eventos "quentes" cabem em cache.
+- Eventos passados ficam em partições antigas que podem ser DESANEXADAS
+  (DETACH) sem varrer nada — ver `detach_past_partitions`.
+- As partições dos próximos meses são criadas de antemão por cron
+  (`python -m app.partitioning --create-ahead 3`).
+
+No SQLite nada disso existe: as funções viram no-op e a coluna
+`event_date` é só mais uma coluna.
+"""
+import argparse
+import re
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+PARENT_TABLE = "tickets"
+PARTITION_BY = "RANGE (event_date)"
+DEFAULT_PARTITION = "tickets_default"
+# DETACH espera no máximo isso pelo lock de `tickets` (ms)
+DETACH_LOCK_TIMEOUT_MS = 2000
+# CREATE ... PARTITION OF espera no máximo isso pelo lock de `tickets` (ms)
+PARTITION_LOCK_TIMEOUT_MS = 2000
+
+_PARTITION_RE = re.compile(r"^tickets_p(\d{4})_(\d{2})$")
+
+# Partições já garantidas neste processo (evita DDL repetido a cada insert)
+_known_partitions: set[str] = set()
+
+
+def month_bounds(value: datetime) -> Tuple[datetime, datetime]:
+    """Retorna [inicio, fim) do mês que contém `value`."""
+    start = datetime(value.year, value.month, 1)
+    if value.month == 12:
+        end = datetime(value.year + 1, 1, 1)
+    else:
+        end = datetime(value.year, value.month + 1, 1)
+    return start, end
+
+
+def partition_name(value: datetime) -> str:
+    """Nome da partição mensal: tickets_p2026_11."""
+    return f"tickets_p{value.year:04d}_{value.month:02d}"
+
+
+def create_partition_sql(value: datetime) -> str:
+    """DDL idempotente da partição mensal que contém `value`."""
+    start, end = month_bounds(value)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} "
+        f"PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    )
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """True se `tickets` for uma tabela particionada (só PostgreSQL)."""
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :name"
+    ), {"name": PARENT_TABLE}).scalar())
+
+
+def ensure_ticket_partitions(
+    engine: Engine,
+    dates: Iterable[datetime],
+    lock_timeout_ms: int = PARTITION_LOCK_TIMEOUT_MS,
+) -> None:
+    """
+    Garante que existem as partições dos meses de `dates` ANTES de inserir
+    tickets.
+
+    Sem isso os tickets cairiam na partição default, e depois o Postgres
+    recusa criar a partição do mês ("default partition would be violated").
+
+    O CREATE TABLE ... PARTITION OF pega ACCESS EXCLUSIVE em `tickets`, então
+    roda numa conexão própria, uma transação curta por mês (com
+    lock_timeout), e nunca dentro da transação de quem chamou: lá o lock
+    ficaria preso até o commit do import inteiro. Por isso mesmo o chamador
+    precisa chamar isto ANTES de tocar em `tickets` na própria transação
+    (senão a conexão nova espera pelo lock dele). O nome só entra em
+    `_known_partitions` depois do commit. O caminho normal é o cron com
+    `--create-ahead` (ver `create_partitions_ahead`); aqui é a rede de
+    segurança para datas fora da janela.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    months = {}
+    for value in dates:
+        start, _ = month_bounds(value)
+        if partition_name(start) not in _known_partitions:
+            months[partition_name(start)] = start
+    if not months:
+        return
+
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return
+        conn.rollback()
+        for name, start in sorted(months.items()):
+            with conn.begin():
+                conn.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+                conn.execute(text(create_partition_sql(start)))
+            _known_partitions.add(name)
+
+
+def create_partitions_ahead(engine: Engine, months: int,
+                            today: Optional[datetime] = None) -> List[str]:
+    """
+    Cria as partições do mês corrente e dos `months` seguintes (para o cron).
+
+    Com a janela sempre criada de antemão, o import e o /seed só encontram
+    partições prontas e não disputam o lock de `tickets` com o tráfego.
+    """
+    start, _ = month_bounds(today or datetime.now())
+    wanted = []
+    for _ in range(months + 1):
+        wanted.append(start)
+        start = month_bounds(start)[1]
+    ensure_ticket_partitions(engine, wanted)
+    return [partition_name(value) for value in wanted]
+
+
+def ticket_partition_filter(event_id: int, event_date: datetime) -> list:
+    """
+    Critérios WHERE que permitem ao planner podar partições.
+
+    Uso: select(Ticket).where(*ticket_partition_filter(event.id, event.date))
+    """
+    from app.models import Ticket
+
+    return [Ticket.event_id == event_id, Ticket.event_date == event_date]
+
+
+def list_partitions(conn: Connection) -> List[Tuple[str, datetime]]:
+    """Partições mensais anexadas a `tickets`, em ordem cronológica."""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name"
+    ), {"name": PARENT_TABLE}).scalars().all()
+
+    partitions = []
+    for name in rows:
+        match = _PARTITION_RE.match(name)
+        if match:
+            year, month = int(match.group(1)), int(match.group(2))
+            partitions.append((name, datetime(year, month, 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def detach_past_partitions(
+    engine: Engine,
+    before: datetime,
+    drop: bool = False,
+    lock_timeout_ms: int = DETACH_LOCK_TIMEOUT_MS,
+) -> List[str]:
+    """
+    Rotina de arquivamento: desanexa partições cujo mês termina antes de
+    `before`.
+
+    A partição desanexada continua existindo como tabela comum (pronta para
+    pg_dump / arquivamento frio); com `drop=True` ela é apagada.
+
+    DETACH ... CONCURRENTLY não serve aqui: o Postgres recusa quando existe
+    partição DEFAULT (e a migração sempre cria `tickets_default`). O DETACH
+    comum pega ACCESS EXCLUSIVE em `tickets`, mas é só catálogo (não varre
+    dados): cada partição vai numa transação curta com lock_timeout, então
+    se houver query longa segurando a tabela o DETACH desiste em vez de
+    enfileirar todo mundo atrás dele. Rode de novo depois.
+    """
+    detached: List[str] = []
+    if engine.dialect.name != "postgresql":
+        return detached
+
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return detached
+        partitions = list_partitions(conn)
+        conn.rollback()
+
+        for name, start in partitions:
+            _, end = month_bounds(start)
+            if end > before:
+                break
+            with conn.begin():
+                conn.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+                conn.execute(text(
+                    f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"
+                ))
+            _known_partitions.discard(name)
+            if drop:
+                with conn.begin():
+                    conn.execute(text(f"DROP TABLE {name}"))
+            detached.append(name)
+
+    return detached
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Cria partições futuras / desanexa as de eventos passados")
+    parser.add_argument("--create-ahead", type=int, metavar="MESES",
+                        help="Cria as partições do mês corrente e dos N seguintes")
+    parser.add_argument("--before",
+                        help="Data de corte (YYYY-MM-DD) para desanexar")
+    parser.add_argument("--drop", action="store_true",
+                        help="Apaga a partição depois de desanexar")
+    args = parser.parse_args()
+    if args.create_ahead is None and args.before is None:
+        parser.error("use --create-ahead e/ou --before")
+
+    from app.config import engine
+
+    if args.create_ahead is not None:
+        for name in create_partitions_ahead(engine, args.create_ahead):
+            print(f"Partição garantida: {name}")
+    if args.before is not None:
+        cutoff = datetime.strptime(args.before, "%Y-%m-%d")
+        for name in detach_past_partitions(engine, cutoff, drop=args.drop):
+            print(f"Partição desanexada: {name}")
+
+
+if __name__ == "__main__":
+    main()
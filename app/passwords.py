@@ -0,0 +1,108 @@
+"""
+Hash de senha (scrypt) fora do event loop e fora do threadpool.
+
+scrypt é memory-hard de propósito: ~16 MB e dezenas de ms de CPU por
+hash com os parâmetros padrão. Rodando na thread do request, uma rajada
+de cadastros antes de uma abertura de vendas ocupa o threadpool inteiro
+(e o GIL) e trava as reservas. Aqui o hash roda num ProcessPoolExecutor:
+
+- PASSWORD_HASH_WORKERS processos (metade dos cores por padrão), criados
+  no primeiro uso com "spawn" (não herdam pool de banco nem threads). O
+  pool é POR worker do uvicorn: app/server.py divide o padrão entre os
+  workers para o total continuar em metade dos cores
+- no máximo PASSWORD_HASH_MAX_PENDING hashes em fila; passou disso,
+  PasswordHasherBusy (a rota responde 503 + Retry-After em vez de
+  acumular fila sem fim)
+
+Formato armazenado: scrypt$<n>$<r>$<p>$<salt b64>$<hash b64>
+(os parâmetros vão junto: dá para subir o custo sem invalidar senhas).
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.config import PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WORKERS, SCRYPT_N
+
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r, dklen=KEY_BYTES)
+
+
+def hash_password(password: str, n: int = SCRYPT_N) -> str:
+    """Hash síncrono (roda dentro do processo do pool)."""
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, n, SCRYPT_R, SCRYPT_P)
+    return "$".join(["scrypt", str(n), str(SCRYPT_R), str(SCRYPT_P),
+                     base64.b64encode(salt).decode(), base64.b64encode(key).decode()])
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Confere a senha contra o hash armazenado (comparação em tempo constante)."""
+    try:
+        scheme, n, r, p, salt, key = encoded.split("$")
+    except ValueError:
+        return False
+    if scheme != "scrypt":
+        return False
+    expected = base64.b64decode(key)
+    actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    return hmac.compare_digest(actual, expected)
+
+
+class PasswordHasherBusy(Exception):
+    """Fila de hashes cheia: o cliente deve tentar de novo mais tarde."""
+
+
+class PasswordHasher:
+    """Pool de processos limitado para hash/verificação de senha."""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def _run(self, func, *args):
+        # Contador simples: só o event loop mexe nele (sem lock)
+        if self.pending >= self.max_pending:
+            raise PasswordHasherBusy()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, encoded: str) -> bool:
+        return await self._run(verify_password, password, encoded)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,252 @@
+"""
+Modo de profiling de SQL por request.
+
+Liga por request com o header `X-SQL-Profile: 1` (só vale junto com um
+X-Admin-Token válido: o relatório expõe o SQL da aplicação) ou para tudo
+com SQL_PROFILE=1. Com o profiling ligado, cada statement do request é
+registrado com tempo e "forma" (SQL normalizado), e a resposta ganha:
+
+    X-SQL-Queries: 11
+    X-SQL-Time-Ms: 4.2
+    X-SQL-NPlusOne: 1           (formas repetidas > SQL_NPLUSONE_THRESHOLD)
+    X-SQL-Profile-Id: 3f2a...   (relatório em /debug/sql-profile/{id}, admin)
+
+Independente do profiling, statements acima de SQL_SLOW_QUERY_MS vão para
+o log com a forma dos parâmetros (tipos, nunca os valores).
+
+`assert_max_queries` / `assert_endpoint_queries` travam regressões como o
+/events-bad (N+1): python -m benchmarks.query_budget falha se uma rota
+passar do orçamento de queries.
+"""
+import logging
+import re
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.admin import is_admin_token
+from app.config import ADMIN_TOKEN, SQL_NPLUSONE_THRESHOLD, SQL_PROFILE, SQL_SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-sql-profile"
+ADMIN_HEADER = "x-admin-token"
+MAX_STORED_REPORTS = 100
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL normalizado: mesmo "formato" => mesma query com outros valores."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _IN_LIST.sub("(?...)", shape)
+
+
+def parameter_shape(parameters, executemany: bool) -> str:
+    """Tipos dos parâmetros (sem valores: nada de dado sensível no log)."""
+    if executemany:
+        return f"executemany[{len(parameters)}]"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}"
+                               for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return type(parameters).__name__
+
+
+class QueryProfile:
+    """Statements executados durante um request (ou bloco de código)."""
+
+    def __init__(self, threshold: int = SQL_NPLUSONE_THRESHOLD) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.threshold = threshold
+        self.queries: List[dict] = []
+
+    def add(self, statement: str, seconds: float, params: str) -> None:
+        self.queries.append({
+            "shape": statement_shape(statement),
+            "ms": round(seconds * 1000, 3),
+            "params": params,
+        })
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return round(sum(q["ms"] for q in self.queries), 3)
+
+    def repeated_shapes(self) -> List[dict]:
+        """Formas repetidas mais que o limite: suspeitas de N+1."""
+        counts = Counter(q["shape"] for q in self.queries)
+        return [
+            {"shape": shape, "count": count}
+            for shape, count in counts.most_common()
+            if count > self.threshold
+        ]
+
+    def report(self, path: str = "") -> dict:
+        return {
+            "id": self.id,
+            "path": path,
+            "queries": self.count,
+            "total_ms": self.total_ms,
+            "n_plus_one": self.repeated_shapes(),
+            "statements": self.queries,
+        }
+
+
+_active_profile: ContextVar[Optional[QueryProfile]] = ContextVar(
+    "active_sql_profile", default=None)
+_reports: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def get_report(profile_id: str) -> Optional[dict]:
+    return _reports.get(profile_id)
+
+
+def _store(report: dict) -> None:
+    _reports[report["id"]] = report
+    while len(_reports) > MAX_STORED_REPORTS:
+        _reports.popitem(last=False)
+
+
+# ═══════════════════════════════════════════════════════════
+# SQLALCHEMY
+# ═══════════════════════════════════════════════════════════
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("profile_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+
+    profile = _active_profile.get()
+    slow = SQL_SLOW_QUERY_MS > 0 and elapsed * 1000 >= SQL_SLOW_QUERY_MS
+    if profile is None and not slow:
+        return
+
+    params = parameter_shape(parameters, executemany)
+    if profile is not None:
+        profile.add(statement, elapsed, params)
+    if slow:
+        logger.warning("Slow query (%.1f ms): %s params=%s",
+                       elapsed * 1000, statement_shape(statement), params)
+
+
+def instrument_profiling(engine: Engine) -> None:
+    """Liga o profiler a um Engine (idempotente)."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ═══════════════════════════════════════════════════════════
+# ASGI
+# ═══════════════════════════════════════════════════════════
+
+
+class SQLProfilerMiddleware:
+    """Ativa o profile por request e publica o resultado nos headers."""
+
+    def __init__(self, app, enabled: bool = SQL_PROFILE) -> None:
+        self.app = app
+        self.enabled = enabled
+
+    def _wants_profile(self, scope) -> bool:
+        if self.enabled:
+            return True
+        headers = dict(scope.get("headers", ()))
+        requested = headers.get(PROFILE_HEADER.encode(), b"0") not in (b"0", b"")
+        # Cliente anônimo não liga o profiling (nem gera relatório com SQL)
+        token = headers.get(ADMIN_HEADER.encode())
+        return requested and is_admin_token(token.decode("latin-1") if token else None)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = _active_profile.set(profile)
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                suspects = profile.repeated_shapes()
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-sql-queries", str(profile.count).encode()),
+                    (b"x-sql-time-ms", str(profile.total_ms).encode()),
+                    (b"x-sql-nplusone", str(len(suspects)).encode()),
+                    (b"x-sql-profile-id", profile.id.encode()),
+                ]
+                message = {**message, "headers": headers}
+                _store(profile.report(scope.get("path", "")))
+                for suspect in suspects:
+                    logger.warning("Possível N+1 em %s: %sx %s", scope.get("path"),
+                                   suspect["count"], suspect["shape"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _active_profile.reset(token)
+
+
+# ═══════════════════════════════════════════════════════════
+# HELPERS DE TESTE
+# ═══════════════════════════════════════════════════════════
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryProfile]:
+    """
+    Conta os statements executados no bloco (mesma thread/contexto):
+
+        with assert_max_queries(2):
+            get_events_good(session)
+    """
+    profile = QueryProfile()
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+    assert profile.count <= max_queries, (
+        f"{profile.count} queries (máximo {max_queries}); "
+        f"N+1: {profile.repeated_shapes()}")
+
+
+def assert_endpoint_queries(client, method: str, url: str, max_queries: int,
+                            admin_token: str = ADMIN_TOKEN, **kwargs):
+    """
+    Faz o request com profiling ligado e falha se passar de `max_queries`.
+
+        assert_endpoint_queries(client, "GET", "/events-good", max_queries=1)
+    """
+    headers = {**kwargs.pop("headers", {}), "X-SQL-Profile": "1",
+               "X-Admin-Token": admin_token}
+    response = client.request(method, url, headers=headers, **kwargs)
+    count = int(response.headers["x-sql-queries"])
+    assert count <= max_queries, (
+        f"{method} {url}: {count} queries (máximo {max_queries}); "
+        f"N+1 suspeitos: {response.headers.get('x-sql-nplusone')}")
+    return response
@@ -0,0 +1,166 @@
+"""
+Queries quentes pré-construídas (reserva, cancelamento, busca e calendário).
+
+Antes, cada request montava os constructs do zero (`select(...).where(...)`)
+e o SQLAlchemy recalculava a cache key a cada execução para achar o SQL
+compilado. Aqui os statements são construídos UMA vez, no import, com
+`bindparam` no lugar dos valores:
+- construção: custo zero por request
+- cache key: memoizada no próprio objeto (ClauseElement), então cada
+  execução vai direto ao SQL compilado no cache do engine
+
+Prepared statements no servidor (Postgres):
+- psycopg2 não prepara nada sozinho. Com DB_SERVER_PREPARE=1, cada conexão
+  nova do pool roda PREPARE das queries quentes (gerado a partir dos
+  mesmos constructs, então não diverge dos models) e `execute()` passa a
+  mandar `EXECUTE nome(...)`: o servidor pula parse + plan.
+- psycopg 3 (`postgresql+psycopg://`) já prepara sozinho a partir da
+  5ª execução (prepare_threshold); nada a fazer.
+- Atrás de PgBouncer em modo transaction, deixe DB_SERVER_PREPARE=0:
+  prepared statements são por conexão do servidor.
+
+Custo medido: python -m benchmarks.query_construction
+"""
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import (
+    DateTime, Integer, bindparam, event, func, select, text, tuple_, update,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import DB_SERVER_PREPARE
+from app.models import Event, Ticket, User
+
+logger = logging.getLogger(__name__)
+
+PREPARED_KEY = "prepared_statements"
+
+# Placeholders $1, $2... como o PREPARE do Postgres espera
+_PG_DIALECT = postgresql.psycopg2.dialect(paramstyle="numeric_dollar")
+
+
+class HotQuery:
+    """Statement construído 1x + (no Postgres) sua versão PREPARE/EXECUTE."""
+
+    def __init__(self, name: str, statement, entity=None) -> None:
+        self.name = name
+        self.statement = statement
+        compiled = statement.compile(dialect=_PG_DIALECT)
+        names = list(compiled.positiontup)
+        types = [compiled.binds[n].type.compile(dialect=_PG_DIALECT) for n in names]
+        self.prepare_sql = (f"PREPARE {name} ({', '.join(types)}) AS "
+                            f"{compiled.string}")
+        # Valores fixos do construct (ex.: o LIMIT 1) viram parâmetros do EXECUTE
+        self.defaults = {
+            n: compiled.binds[n].value for n in names
+            if not compiled.binds[n].required
+        }
+        execute = text(f"EXECUTE {name} ({', '.join(':' + n for n in names)})")
+        # Select de entidade ORM: o resultado do EXECUTE ainda vira objeto
+        self.prepared = (select(entity).from_statement(execute)
+                         if entity is not None else execute)
+
+
+def execute(session: Session, query: HotQuery, **params):
+    """Executa a query quente; usa o EXECUTE se a conexão tiver o PREPARE."""
+    connection = session.connection()
+    if query.name in connection.info.get(PREPARED_KEY, ()):
+        return session.execute(query.prepared, {**query.defaults, **params})
+    return session.execute(query.statement, params)
+
+
+# ═══════════════════════════════════════════════════════════
+# QUERIES QUENTES
+# ═══════════════════════════════════════════════════════════
+
+
+ACTIVE_TICKET_COUNT = HotQuery("hot_active_ticket_count", select(
+    func.count(Ticket.id)).where(
+    Ticket.user_id == bindparam("user_id", required=True),
+    Ticket.is_reserved.is_(True),
+))
+
+LOCK_USER = HotQuery("hot_lock_user_for_update", select(User.id).where(
+    User.id == bindparam("user_id", required=True)).with_for_update())
+
+# SQLite não tem FOR UPDATE: UPDATE no-op pega o lock de escrita (sem PREPARE)
+LOCK_USER_SQLITE = update(User).where(
+    User.id == bindparam("user_id", required=True)).values(id=User.id)
+
+AVAILABLE_TICKET = HotQuery("hot_available_ticket_for_update", select(Ticket).where(
+    Ticket.event_id == bindparam("event_id", required=True),
+    Ticket.event_date == bindparam("event_date", required=True),
+    Ticket.is_reserved.is_(False),
+).limit(1).with_for_update(skip_locked=True), entity=Ticket)
+
+AVAILABLE_TICKET_SQLITE = select(Ticket).where(
+    Ticket.event_id == bindparam("event_id", required=True),
+    Ticket.event_date == bindparam("event_date", required=True),
+    Ticket.is_reserved.is_(False),
+).limit(1)
+
+TICKET_FOR_UPDATE = HotQuery("hot_ticket_for_update", select(Ticket).where(
+    Ticket.id == bindparam("ticket_id", required=True)).with_for_update(),
+    entity=Ticket)
+
+TICKET_BY_ID_SQLITE = select(Ticket).where(
+    Ticket.id == bindparam("ticket_id", required=True))
+
+SEARCH_EVENTS = HotQuery("hot_search_events", select(
+    Event.id, Event.name, Event.price).where(
+    Event.name.ilike(bindparam("pattern", required=True))))
+
+# Calendário: página seguinte = linhas DEPOIS da última (date, id) vista.
+# Com o índice (date, id) é um range scan que para em `limit`, em qualquer
+# página (OFFSET teria de pular as linhas anteriores uma a uma).
+EVENTS_IN_RANGE = HotQuery("hot_events_in_range", select(
+    Event.id, Event.name, Event.date, Event.price).where(
+    Event.date >= bindparam("start", type_=DateTime, required=True),
+    Event.date < bindparam("end", type_=DateTime, required=True),
+    tuple_(Event.date, Event.id) > tuple_(
+        bindparam("after_date", type_=DateTime, required=True),
+        bindparam("after_id", type_=Integer, required=True)),
+).order_by(Event.date, Event.id).limit(
+    bindparam("limit", type_=Integer, required=True)))
+
+HOT_QUERIES: Dict[str, HotQuery] = {
+    query.name: query
+    for query in (ACTIVE_TICKET_COUNT, LOCK_USER, AVAILABLE_TICKET,
+                  TICKET_FOR_UPDATE, SEARCH_EVENTS, EVENTS_IN_RANGE)
+}
+
+
+# ═══════════════════════════════════════════════════════════
+# PREPARE POR CONEXÃO (Postgres + psycopg2)
+# ═══════════════════════════════════════════════════════════
+
+
+def _prepare_on_connect(dbapi_connection, connection_record) -> None:
+    prepared = set()
+    cursor = dbapi_connection.cursor()
+    try:
+        for query in HOT_QUERIES.values():
+            cursor.execute(query.prepare_sql)
+            prepared.add(query.name)
+        dbapi_connection.commit()
+    except Exception as exc:  # tabela ainda não migrada, permissão, etc.
+        dbapi_connection.rollback()
+        logger.warning("PREPARE das queries quentes falhou: %s", exc)
+        prepared = set()
+    finally:
+        cursor.close()
+    connection_record.info[PREPARED_KEY] = frozenset(prepared)
+
+
+def install_prepared_statements(engine: Engine, enabled: Optional[bool] = None) -> bool:
+    """Liga o PREPARE em cada conexão nova do pool (só Postgres + psycopg2)."""
+    enabled = DB_SERVER_PREPARE if enabled is None else enabled
+    if not enabled or engine.dialect.name != "postgresql" \
+            or engine.dialect.driver != "psycopg2":
+        return False
+    if not event.contains(engine, "connect", _prepare_on_connect):
+        event.listen(engine, "connect", _prepare_on_connect)
+    return True
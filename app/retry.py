@@ -0,0 +1,165 @@
+"""
+Retry automático de transações que falharam por concorrência.
+
+Em abertura de vendas, boa parte dos 500 não é bug: é o banco abortando
+uma transação que pode simplesmente rodar de novo.
+
+- Postgres: 40001 (serialization_failure), 40P01 (deadlock_detected),
+  55P03 (lock_not_available, ex.: lock_timeout / NOWAIT)
+- SQLite: "database is locked" / "database is busy". O `timeout=30` de
+  app/config.py espera o lock do arquivo, mas o SQLite devolve BUSY na
+  hora quando uma transação de leitura tenta virar escrita e outra já
+  escreve (esperar ali seria deadlock).
+
+Como usar: a função roda a transação INTEIRA (com session.begin()) e
+recebe a Session no parâmetro `session`:
+
+    @retry_transaction("reserve")
+    def _reserve_once(req, session): ...
+
+Entre tentativas: rollback, espera com backoff exponencial + jitter
+("full jitter": uniforme entre 0 e min(teto, base x 2^tentativa)) para
+os concorrentes não colidirem de novo no mesmo instante.
+
+Orçamento de retries (RetryBudget): cada chamada deposita `ratio` fichas
+e cada retry gasta 1. Com o banco sobrecarregado, retry multiplica a
+carga; o orçamento limita os retries a ~ratio das chamadas e, acabando,
+a falha sobe como TransactionRetryExhausted (a rota responde 503 +
+Retry-After, não 500).
+"""
+import functools
+import inspect
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from app.config import (
+    DB_RETRY_ATTEMPTS, DB_RETRY_BASE_DELAY_MS, DB_RETRY_BUDGET_RATIO,
+    DB_RETRY_MAX_DELAY_MS,
+)
+from app.metrics import TRANSACTION_RETRIES, TRANSACTION_RETRY_GIVEUPS
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE -> motivo (label das métricas)
+PG_RETRYABLE = {
+    "40001": "serialization_failure",
+    "40P01": "deadlock",
+    "55P03": "lock_not_available",
+}
+SQLITE_RETRYABLE = ("database is locked", "database is busy")
+
+
+def retry_reason(exc: BaseException) -> Optional[str]:
+    """Motivo se o erro é transitório (vale tentar de novo); None caso contrário."""
+    if not isinstance(exc, DBAPIError):
+        return None
+    orig = exc.orig
+    # psycopg2: .pgcode; psycopg 3: .sqlstate
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if code in PG_RETRYABLE:
+        return PG_RETRYABLE[code]
+    if isinstance(exc, OperationalError) and any(
+            message in str(orig).lower() for message in SQLITE_RETRYABLE):
+        return "sqlite_busy"
+    return None
+
+
+class TransactionRetryExhausted(Exception):
+    """Erro transitório que persistiu (tentativas ou orçamento esgotados)."""
+
+    def __init__(self, operation: str, reason: str, attempts: int) -> None:
+        super().__init__(f"{operation}: {reason} após {attempts} tentativa(s)")
+        self.operation = operation
+        self.reason = reason
+        self.attempts = attempts
+
+
+class RetryBudget:
+    """Fichas de retry: `ratio` por chamada, 1 por retry, no máximo `max_tokens`."""
+
+    def __init__(self, ratio: float = DB_RETRY_BUDGET_RATIO,
+                 max_tokens: float = 100.0, initial: float = 10.0) -> None:
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min(initial, max_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """Quantas tentativas e quanto esperar entre elas."""
+
+    def __init__(self, attempts: int = DB_RETRY_ATTEMPTS,
+                 base_delay: float = DB_RETRY_BASE_DELAY_MS / 1000,
+                 max_delay: float = DB_RETRY_MAX_DELAY_MS / 1000,
+                 budget: Optional[RetryBudget] = None) -> None:
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget if budget is not None else RetryBudget()
+
+    def backoff(self, retry: int) -> float:
+        """Espera antes do retry nº `retry` (1, 2, ...): full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+# Orçamento compartilhado por todas as operações deste worker
+default_policy = RetryPolicy()
+
+
+def retry_transaction(operation: str, policy: Optional[RetryPolicy] = None,
+                      sleep: Callable[[float], None] = time.sleep):
+    """Decorator: reexecuta a transação quando o banco aborta por concorrência."""
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        if "session" not in signature.parameters:
+            raise TypeError(f"{func.__name__} precisa de um parâmetro `session`")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            active = policy or default_policy
+            session = signature.bind(*args, **kwargs).arguments["session"]
+            active.budget.deposit()
+            attempt = 1
+            while True:
+                try:
+                    return func(*args, **kwargs)
+                except DBAPIError as exc:
+                    reason = retry_reason(exc)
+                    if reason is None:
+                        raise
+                    session.rollback()
+                    if attempt >= active.attempts:
+                        cause = "attempts"
+                    elif not active.budget.withdraw():
+                        cause = "budget"
+                    else:
+                        delay = active.backoff(attempt)
+                        TRANSACTION_RETRIES.inc(operation, reason)
+                        logger.info("%s: %s, tentativa %s em %.0f ms",
+                                    operation, reason, attempt + 1, delay * 1000)
+                        sleep(delay)
+                        attempt += 1
+                        continue
+                    TRANSACTION_RETRY_GIVEUPS.inc(operation, cause)
+                    raise TransactionRetryExhausted(operation, reason, attempt) from exc
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,197 @@
+"""
+Rollups incrementais de vendas.
+
+Em vez de COUNT(*) sobre `tickets` (que compete com as reservas), cada
+reserva/cancelamento aplica um delta em duas tabelas pequenas, NA MESMA
+transação:
+- sales_rollups:      (event_id, minuto) -> reservas líquidas, receita
+- event_sales_totals: event_id -> capacidade, vendidos, receita
+- event_day_buckets:  dia -> eventos (calendário; delta na criação do evento)
+
+Os endpoints de analytics leem só essas tabelas.
+
+Obs.: a linha do rollup é um ponto de contenção para eventos muito
+disputados (o UPDATE segura o lock até o commit), por isso o delta é
+aplicado como último comando antes do commit.
+"""
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import CALENDAR_DAY_BUCKETS
+from app.models import Event, EventDayBucket, EventSalesTotal, SalesRollup
+
+GRANULARITIES = {"minute", "hour"}
+
+
+def _truncate(moment: datetime, granularity: str = "minute") -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(second=0, microsecond=0)
+
+
+def _increment(session: Session, model, key: dict, deltas: dict) -> None:
+    """
+    UPSERT aditivo: INSERT ... ON CONFLICT (pk) DO UPDATE SET c = c + delta.
+
+    Um único comando, sem read-modify-write (seguro sob concorrência).
+    """
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    stmt = insert(model).values(**key, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={
+            name: getattr(model, name) + stmt.excluded[name]
+            for name in deltas
+        },
+    )
+    session.execute(stmt)
+
+
+def record_sale(session: Session, event_id: int, price: float,
+                at: datetime, quantity: int = 1) -> None:
+    """Aplica o delta de uma reserva (quantity > 0) ou cancelamento (< 0)."""
+    revenue = (price or 0.0) * quantity
+    _increment(
+        session, SalesRollup,
+        {"event_id": event_id, "bucket_start": _truncate(at)},
+        {"reserved_count": quantity, "revenue": revenue},
+    )
+    _increment(
+        session, EventSalesTotal,
+        {"event_id": event_id},
+        {"reserved_count": quantity, "revenue": revenue},
+    )
+
+
+def record_inventory(session: Session, event_id: int, tickets: int) -> None:
+    """Soma `tickets` à capacidade do evento (criação/remoção de ingressos)."""
+    _increment(
+        session, EventSalesTotal,
+        {"event_id": event_id},
+        {"capacity": tickets},
+    )
+
+
+def record_event_day(session: Session, at: datetime, events: int = 1) -> None:
+    """Soma `events` ao dia de `at` (evento novo; -1 ao remover)."""
+    if not CALENDAR_DAY_BUCKETS:
+        return
+    _increment(
+        session, EventDayBucket,
+        {"day": at.date()},
+        {"event_count": events},
+    )
+
+
+def rebuild_event_days(session: Session) -> int:
+    """Recalcula event_day_buckets do zero (GROUP BY no índice de data)."""
+    day = func.date(Event.date)
+    counts = session.execute(
+        select(day, func.count(Event.id)).group_by(day)).all()
+    session.execute(delete(EventDayBucket))
+    for value, count in counts:
+        # SQLite devolve date() como texto 'YYYY-MM-DD'
+        if isinstance(value, str):
+            value = date.fromisoformat(value)
+        session.add(EventDayBucket(day=value, event_count=count))
+    return len(counts)
+
+
+def clear_rollups(session: Session) -> None:
+    """Zera todos os rollups (usado pelo /seed)."""
+    session.execute(delete(SalesRollup))
+    session.execute(delete(EventSalesTotal))
+    session.execute(delete(EventDayBucket))
+
+
+def clear_event_rollups(session: Session, event_ids: Iterable[int]) -> None:
+    """
+    Apaga a série e o total de vendas dos eventos (arquivamento).
+
+    Sem isso o top_events continuaria listando evento arquivado (sem nome).
+    Nada se perde: o arquivo frio guarda os tickets, e /archive/events
+    recalcula vendidos e receita a partir deles.
+    """
+    event_ids = list(event_ids)
+    session.execute(delete(SalesRollup).where(SalesRollup.event_id.in_(event_ids)))
+    session.execute(
+        delete(EventSalesTotal).where(EventSalesTotal.event_id.in_(event_ids)))
+
+
+# ═══════════════════════════════════════════════════════════
+# LEITURA
+# ═══════════════════════════════════════════════════════════
+
+
+def sales_timeseries(
+    session: Session,
+    event_id: int,
+    granularity: str = "minute",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[dict]:
+    """
+    Série temporal de vendas de um evento.
+
+    Guardamos só minutos; a série por hora soma no máximo 60 linhas por
+    bucket, então não vale manter (e travar) uma segunda linha por reserva.
+    """
+    stmt = select(
+        SalesRollup.bucket_start,
+        SalesRollup.reserved_count,
+        SalesRollup.revenue,
+    ).where(SalesRollup.event_id == event_id)
+    if start is not None:
+        stmt = stmt.where(SalesRollup.bucket_start >= start)
+    if end is not None:
+        stmt = stmt.where(SalesRollup.bucket_start < end)
+    stmt = stmt.order_by(SalesRollup.bucket_start)
+
+    buckets: "OrderedDict[datetime, dict]" = OrderedDict()
+    for bucket_start, reserved, revenue in session.execute(stmt):
+        key = _truncate(bucket_start, granularity)
+        bucket = buckets.setdefault(
+            key, {"bucket_start": key, "reserved_count": 0, "revenue": 0.0})
+        bucket["reserved_count"] += reserved
+        bucket["revenue"] += revenue
+    return list(buckets.values())
+
+
+def top_events(session: Session, limit: int = 10) -> List[dict]:
+    """Eventos com mais ingressos vendidos (usa o índice de reserved_count)."""
+    stmt = (
+        select(
+            EventSalesTotal.event_id,
+            Event.name,
+            EventSalesTotal.reserved_count,
+            EventSalesTotal.capacity,
+            EventSalesTotal.revenue,
+        )
+        .outerjoin(Event, Event.id == EventSalesTotal.event_id)
+        .order_by(EventSalesTotal.reserved_count.desc())
+        .limit(limit)
+    )
+    return [dict(row) for row in session.execute(stmt).mappings()]
+
+
+def sell_through(session: Session, event_id: int) -> Optional[dict]:
+    """Taxa de venda (vendidos / capacidade) de um evento."""
+    total = session.get(EventSalesTotal, event_id)
+    if total is None:
+        return None
+    rate = total.reserved_count / total.capacity if total.capacity else 0.0
+    return {
+        "event_id": event_id,
+        "capacity": total.capacity,
+        "reserved_count": total.reserved_count,
+        "revenue": total.revenue,
+        "sell_through_rate": round(rate, 4),
+    }
+
@@ -49,6 +49,18 @@ class UserResponse(UserBase):
     class Config:  # CORREÇÃO: "C" maiúsculo
         from_attributes = True
 
+class LoginRequest(BaseModel):
+    email: EmailStr
+    password: str = Field(..., min_length=1, max_length=100)
+
+
+class LoginResponse(BaseModel):
+    """Token Bearer: só é mostrado aqui (o servidor guarda o hash)."""
+    token: str
+    token_type: str = "bearer"
+    user_id: int
+    expires_at: datetime
+
 # ----------------------
 # EVENT SCHEMAS
 # ----------------------
@@ -157,3 +169,122 @@ class TicketReserveResponse(BaseModel):
     event_id: int
     user_id: int
     reserved_at: datetime
+
+
+class TicketBlockReserveRequest(BaseModel):
+    """
+    Reserva de N assentos lado a lado (mesma fileira).
+    - section: opcional; sem ela, a melhor fileira de qualquer seção
+    """
+    event_id: int = Field(..., gt=0)
+    user_id: int = Field(..., gt=0)
+    quantity: int = Field(default=2, gt=0, le=10)
+    section: Optional[str] = None
+
+
+class SeatResponse(BaseModel):
+    ticket_id: int
+    section: str
+    row: int
+    number: int
+
+
+class TicketBlockReserveResponse(BaseModel):
+    event_id: int
+    user_id: int
+    reserved_at: datetime
+    seats: List[SeatResponse]
+
+
+class TicketCancelRequest(BaseModel):
+    """Cancelamento: só o dono da reserva pode liberar o ingresso."""
+    user_id: int = Field(..., gt=0)
+
+
+class TicketCancelResponse(BaseModel):
+    ticket_id: int
+    event_id: int
+    released_at: datetime
+    # True: o ingresso foi direto para o 1º da fila de espera (não voltou à venda)
+    waitlist_handoff: bool = False
+
+# ----------------------
+# WAITLIST SCHEMAS (fila de espera por evento, ver app/waitlist.py)
+# ----------------------
+
+
+class WaitlistJoinRequest(BaseModel):
+    user_id: int = Field(..., gt=0)
+
+
+class WaitlistPositionResponse(BaseModel):
+    """
+    - position: no máximo quantas pessoas serão atendidas até você (contando
+      você); pode cair mais rápido se alguém na frente sair da fila
+    - waiting: total na fila do evento
+    """
+    event_id: int
+    user_id: int
+    position: int
+    waiting: int
+    joined_at: datetime
+
+# ----------------------
+# IMPORT SCHEMAS (linhas do catálogo, ver app/importer.py)
+# ----------------------
+
+
+class EventImportRow(EventCreate):
+    """
+    Linha `type=event` do catálogo: mesmas regras do EventCreate +
+    - external_ref: id do evento no sistema do organizador (chave do upsert)
+    - seated: False = `total_tickets` de pista (seção GA);
+              True  = assentos vêm das linhas `type=seats`
+    """
+    external_ref: str = Field(..., min_length=1, max_length=100)
+    description: str = ""
+    creator_id: Optional[int] = Field(default=None, gt=0)
+    seated: bool = False
+
+
+class SeatRangeImportRow(BaseModel):
+    """Linha `type=seats`: assentos first_number..last_number de uma fileira."""
+    event_ref: str = Field(..., min_length=1, max_length=100)
+    section: str = Field(..., min_length=1, max_length=20)
+    row: int = Field(..., gt=0)
+    first_number: int = Field(..., gt=0)
+    last_number: int = Field(..., gt=0)
+    price: Optional[float] = Field(default=None, gt=0)
+
+    @field_validator('last_number')
+    def check_range(cls, v: int, info) -> int:
+        first = info.data.get("first_number")
+        if first is not None and not 0 <= v - first < 10000:
+            raise ValueError("Faixa inválida (last_number >= first_number, até 10.000 assentos)")
+        return v
+
+# ----------------------
+# ANALYTICS SCHEMAS
+# ----------------------
+
+
+class SalesBucket(BaseModel):
+    bucket_start: datetime
+    reserved_count: int
+    revenue: float
+
+
+class TopEvent(BaseModel):
+    event_id: int
+    name: Optional[str] = None
+    reserved_count: int
+    capacity: int
+    revenue: float
+
+
+class SellThrough(BaseModel):
+    event_id: int
+    capacity: int
+    reserved_count: int
+    revenue: float
+    sell_through_rate: float
@@ -0,0 +1,323 @@
+"""
+Alocação "melhores N assentos lado a lado" com índice em memória.
+
+Fazer isso em SQL por request (achar N números consecutivos livres na
+mesma fileira) é varrer o mapa inteiro do evento: inviável em locais de
+10.000 lugares. Aqui cada worker mantém, por evento:
+
+- RowSeats: os intervalos LIVRES de uma fileira, ordenados
+  ([1-4], [7-20] ...). Reservar/liberar divide ou junta intervalos.
+- MaxSegmentTree: árvore de segmentos sobre as fileiras de uma seção com
+  o maior bloco livre de cada uma. "Primeira fileira com >= N livres
+  seguidos" sai em O(log fileiras), sem olhar fileira por fileira.
+
+"Melhor" = a fileira mais à frente (row menor) e, dentro dela, o bloco
+mais perto do centro.
+
+O índice é uma CACHE: a verdade é o banco. Ele é montado no startup
+(eventos de hoje em diante) ou no primeiro uso do evento, e atualizado
+pelas reservas/cancelamentos deste worker. Com vários workers um índice
+pode ficar desatualizado; a reserva confere os assentos no banco (com
+lock) e, se algum já foi vendido, recarrega o evento e tenta de novo.
+"""
+import logging
+import threading
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Event, Ticket
+
+logger = logging.getLogger(__name__)
+
+Seat = Tuple[str, int, int]  # (section, row, number)
+
+
+class RowSeats:
+    """Intervalos livres [start, end] (inclusivos) de uma fileira, ordenados."""
+
+    def __init__(self, free_numbers: Iterable[int] = ()) -> None:
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for number in sorted(free_numbers):
+            if self.ends and number == self.ends[-1] + 1:
+                self.ends[-1] = number
+            else:
+                self.starts.append(number)
+                self.ends.append(number)
+        self.center = 0.0
+        self.max_run = 0
+        self._refresh()
+
+    def _refresh(self) -> None:
+        self.max_run = max((e - s + 1 for s, e in zip(self.starts, self.ends)),
+                           default=0)
+
+    def set_bounds(self, first: int, last: int) -> None:
+        """Centro da fileira (primeiro e último número, livres ou não)."""
+        self.center = (first + last) / 2
+
+    def best_block(self, count: int) -> Optional[int]:
+        """Início do bloco de `count` livres mais perto do centro."""
+        best, best_distance = None, None
+        for start, end in zip(self.starts, self.ends):
+            if end - start + 1 < count:
+                continue
+            # Posição ideal: bloco centrado; limitada ao intervalo
+            ideal = round(self.center - (count - 1) / 2)
+            candidate = min(max(ideal, start), end - count + 1)
+            distance = abs(candidate + (count - 1) / 2 - self.center)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = candidate, distance
+        return best
+
+    def take(self, start: int, count: int) -> None:
+        """Marca [start, start+count-1] como ocupado (precisa estar livre)."""
+        end = start + count - 1
+        i = bisect_right(self.starts, start) - 1
+        if i < 0 or self.ends[i] < end:
+            raise ValueError(f"Assentos {start}-{end} não estão livres")
+        left, right = self.starts[i], self.ends[i]
+        del self.starts[i], self.ends[i]
+        if end < right:
+            self.starts.insert(i, end + 1)
+            self.ends.insert(i, right)
+        if left < start:
+            self.starts.insert(i, left)
+            self.ends.insert(i, start - 1)
+        self._refresh()
+
+    def release(self, number: int) -> None:
+        """Devolve um assento, juntando com os vizinhos livres."""
+        i = bisect_right(self.starts, number) - 1
+        if i >= 0 and self.ends[i] >= number:
+            return  # já estava livre
+        joins_left = i >= 0 and self.ends[i] == number - 1
+        joins_right = i + 1 < len(self.starts) and self.starts[i + 1] == number + 1
+        if joins_left and joins_right:
+            self.ends[i] = self.ends[i + 1]
+            del self.starts[i + 1], self.ends[i + 1]
+        elif joins_left:
+            self.ends[i] = number
+        elif joins_right:
+            self.starts[i + 1] = number
+        else:
+            self.starts.insert(i + 1, number)
+            self.ends.insert(i + 1, number)
+        self._refresh()
+
+    def is_free(self, number: int) -> bool:
+        i = bisect_right(self.starts, number) - 1
+        return i >= 0 and self.ends[i] >= number
+
+
+class MaxSegmentTree:
+    """Máximo por faixa com atualização pontual e busca do 1º índice >= N."""
+
+    def __init__(self, values: List[int]) -> None:
+        self.size = 1
+        while self.size < max(1, len(values)):
+            self.size *= 2
+        self.tree = [0] * (2 * self.size)
+        self.tree[self.size:self.size + len(values)] = values
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def update(self, index: int, value: int) -> None:
+        node = self.size + index
+        self.tree[node] = value
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def first_at_least(self, minimum: int) -> Optional[int]:
+        if self.tree[1] < minimum:
+            return None
+        node = 1
+        while node < self.size:
+            node = 2 * node if self.tree[2 * node] >= minimum else 2 * node + 1
+        return node - self.size
+
+
+class SectionSeats:
+    """Fileiras de uma seção + árvore com o maior bloco livre de cada uma."""
+
+    def __init__(self, rows: Dict[int, RowSeats]) -> None:
+        self.row_numbers = sorted(rows)
+        self.rows = [rows[n] for n in self.row_numbers]
+        self._position = {n: i for i, n in enumerate(self.row_numbers)}
+        self.tree = MaxSegmentTree([row.max_run for row in self.rows])
+
+    def row(self, number: int) -> RowSeats:
+        return self.rows[self._position[number]]
+
+    def has_row(self, number: int) -> bool:
+        return number in self._position
+
+    def sync(self, number: int) -> None:
+        position = self._position[number]
+        self.tree.update(position, self.rows[position].max_run)
+
+    def best_block(self, count: int) -> Optional[Tuple[int, int]]:
+        """(row, primeiro número) da fileira mais à frente com `count` seguidos."""
+        position = self.tree.first_at_least(count)
+        if position is None:
+            return None
+        return self.row_numbers[position], self.rows[position].best_block(count)
+
+
+class EventSeatMap:
+    """Mapa de assentos livres de um evento (todas as seções)."""
+
+    def __init__(self, event_id: int, event_date: datetime,
+                 seats: Iterable[Tuple[str, int, int, bool]]) -> None:
+        self.event_id = event_id
+        self.event_date = event_date
+        self.lock = threading.Lock()
+        free: Dict[str, Dict[int, List[int]]] = {}
+        bounds: Dict[Tuple[str, int], List[int]] = {}
+        for section, row, number, reserved in seats:
+            free.setdefault(section, {}).setdefault(row, [])
+            if not reserved:
+                free[section][row].append(number)
+            low_high = bounds.setdefault((section, row), [number, number])
+            low_high[0] = min(low_high[0], number)
+            low_high[1] = max(low_high[1], number)
+
+        self.sections: Dict[str, SectionSeats] = {}
+        for section, rows in free.items():
+            row_seats = {}
+            for row, numbers in rows.items():
+                row_seats[row] = RowSeats(numbers)
+                row_seats[row].set_bounds(*bounds[(section, row)])
+            self.sections[section] = SectionSeats(row_seats)
+
+    def best_available(self, count: int,
+                       section: Optional[str] = None) -> Optional[List[Seat]]:
+        """Melhor bloco de `count` assentos lado a lado (não reserva nada)."""
+        names = [section] if section is not None else sorted(self.sections)
+        best = None
+        for name in names:
+            seats = self.sections.get(name)
+            found = seats.best_block(count) if seats is not None else None
+            # Entre seções: a fileira mais à frente ganha
+            if found is not None and (best is None or found[0] < best[1]):
+                best = (name, *found)
+        if best is None:
+            return None
+        name, row, start = best
+        return [(name, row, number) for number in range(start, start + count)]
+
+    def take(self, seats: List[Seat]) -> None:
+        """Marca um bloco (mesma fileira, números seguidos) como ocupado."""
+        section, row, start = seats[0]
+        self.sections[section].row(row).take(start, len(seats))
+        self.sections[section].sync(row)
+
+    def _section_for(self, section: str, row: int) -> Optional[SectionSeats]:
+        """Seção do assento; None se a seção/fileira não está no mapa."""
+        seats = self.sections.get(section)
+        if seats is None or not seats.has_row(row):
+            return None
+        return seats
+
+    def take_one(self, seat: Seat) -> bool:
+        """Marca um assento; False se o mapa não conhece a seção/fileira."""
+        section, row, number = seat
+        seats = self._section_for(section, row)
+        if seats is None:
+            return False
+        if seats.row(row).is_free(number):
+            seats.row(row).take(number, 1)
+            seats.sync(row)
+        return True
+
+    def release(self, seats: Iterable[Seat]) -> bool:
+        """Devolve assentos; False se algum é de seção/fileira fora do mapa."""
+        for section, row, number in seats:
+            section_seats = self._section_for(section, row)
+            if section_seats is None:
+                return False
+            section_seats.row(row).release(number)
+            section_seats.sync(row)
+        return True
+
+
+class SeatIndex:
+    """Índices de todos os eventos deste worker (carregados sob demanda)."""
+
+    def __init__(self) -> None:
+        self._events: Dict[int, EventSeatMap] = {}
+        self._lock = threading.Lock()
+
+    def load(self, session: Session, event: Event) -> EventSeatMap:
+        """(Re)monta o mapa do evento a partir do banco."""
+        rows = session.execute(
+            select(Ticket.section, Ticket.row, Ticket.number, Ticket.is_reserved)
+            .where(Ticket.event_id == event.id,
+                   Ticket.event_date == event.date,
+                   Ticket.section.is_not(None))
+        ).all()
+        seat_map = EventSeatMap(event.id, event.date, rows)
+        with self._lock:
+            self._events[event.id] = seat_map
+        return seat_map
+
+    def get(self, session: Session, event: Event) -> EventSeatMap:
+        seat_map = self._events.get(event.id)
+        if seat_map is None:
+            seat_map = self.load(session, event)
+        return seat_map
+
+    def cached(self, event_id: int) -> Optional[EventSeatMap]:
+        return self._events.get(event_id)
+
+    def _update(self, event_id: int, seat: Seat, change) -> None:
+        """
+        Aplica `change(seat_map)` no mapa em cache do evento.
+
+        Roda depois do commit da reserva/cancelamento: nada aqui pode virar
+        erro para o cliente. Assento de seção/fileira que o mapa não conhece
+        (criada depois de montado, ex.: pelo import ou por outro worker) =
+        mapa velho, descartado e remontado do banco no próximo uso.
+        """
+        seat_map = self._events.get(event_id)
+        if seat_map is None or seat[0] is None:
+            return
+        try:
+            with seat_map.lock:
+                current = change(seat_map)
+        except Exception:
+            logger.exception("mapa de assentos do evento %s inconsistente", event_id)
+            current = False
+        if not current:
+            self.invalidate(event_id)
+
+    def mark_taken(self, event_id: int, seat: Seat) -> None:
+        """Reserva feita fora do alocador (ex.: /tickets/reserve)."""
+        self._update(event_id, seat, lambda seat_map: seat_map.take_one(seat))
+
+    def mark_released(self, event_id: int, seat: Seat) -> None:
+        self._update(event_id, seat, lambda seat_map: seat_map.release([seat]))
+
+    def invalidate(self, event_id: Optional[int] = None) -> None:
+        with self._lock:
+            if event_id is None:
+                self._events.clear()
+            else:
+                self._events.pop(event_id, None)
+
+    def rebuild(self, session: Session, since: datetime) -> int:
+        """Startup: monta o índice dos eventos a partir de `since`."""
+        events = session.execute(
+            select(Event).where(Event.date >= since)).scalars().all()
+        for event in events:
+            self.load(session, event)
+        return len(events)
+
+
+seat_index = SeatIndex()
@@ -0,0 +1,64 @@
+"""
+Caminho rápido de serialização JSON.
+
+O caminho padrão do FastAPI para `return [dict, ...]` é:
+    response_model (validação Pydantic por item) -> jsonable_encoder
+    (percorre tudo de novo) -> json.dumps da stdlib
+Em listagens grandes isso é a maior parte do CPU do request.
+
+Aqui:
+- FastJSONResponse: orjson quando instalado (datetime, UUID e dataclass
+  nativos, bytes direto), senão json da stdlib compacto. É a
+  default_response_class da app.
+- Rotas de listagem montam dicts direto das linhas do Core
+  (`rows_to_dicts`) e devolvem a Response pronta: o FastAPI não valida
+  nem re-encoda uma Response (o response_model fica só para a doc).
+
+Só para dado INTERNO e confiável (vindo do banco / dos rollups). Entrada
+do cliente continua passando pelos schemas.
+
+Custo por 10k itens: python -m benchmarks.serialization
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable, List
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # declarada no pyproject; sem wheel na plataforma, stdlib
+    orjson = None
+
+# Logado no startup (app.main.lifespan): qual caminho está servindo as respostas
+BACKEND = "orjson" if orjson is not None else "json (stdlib)"
+
+
+def _default(value: Any) -> Any:
+    """Tipos que nenhum dos dois encoders conhece."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse com orjson (ou stdlib compacta) e sem jsonable_encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(rows: Iterable) -> List[dict]:
+    """Linhas do Core (`session.execute(select(colunas...))`) -> dicts."""
+    return [dict(row._mapping) for row in rows]
@@ -0,0 +1,161 @@
+"""
+Entry point de produção: N workers (1 por core por padrão).
+
+    python -m app.server                       # workers = núcleos da máquina
+    python -m app.server --workers 8 --port 8000
+    python -m app.server --db-max-connections 200 --reserved-connections 20
+
+`uvicorn app.main:app` roda UM processo (um core). Aqui o supervisor do
+uvicorn sobe N workers, cada um com a própria app (create_app) e o próprio
+engine/pool, criado no lifespan DEPOIS de o processo existir: nenhum
+socket de banco é herdado entre processos (ver também o register_at_fork
+em app/config.py).
+
+Sinais no processo supervisor:
+- SIGHUP:  reload gracioso, reinicia os workers um de cada vez
+- SIGTTIN / SIGTTOU: +1 / -1 worker
+- SIGTERM / SIGINT: encerra; cada worker termina os requests em andamento
+  (até --graceful-timeout segundos)
+
+Pool x workers: o banco vê workers x (pool_size + max_overflow) conexões
+no pior caso. `plan_pool` divide o max_connections do banco (lido com
+SHOW max_connections no Postgres, ou --db-max-connections) entre os
+workers, descontando uma reserva para migrations, admin e jobs.
+
+Hash de senha x workers: cada worker tem o próprio pool de processos de
+scrypt (app/passwords.py). Sem PASSWORD_HASH_WORKERS no ambiente, a metade
+dos núcleos reservada para hash é dividida entre os workers (mínimo 1 por
+worker); definido pelo operador, o valor vale POR worker.
+
+Métricas: cada worker grava snapshots em METRICS_MULTIPROC_DIR e o
+/metrics soma todos (ver app/metrics.py).
+"""
+import argparse
+import logging
+import os
+import re
+import tempfile
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def plan_pool(workers: int, max_connections: int, reserved: int = 10,
+              overflow_ratio: float = 0.5) -> Tuple[int, int]:
+    """
+    (pool_size, max_overflow) por worker para caber no limite do banco:
+
+        workers x (pool_size + max_overflow) <= max_connections - reserved
+    """
+    budget = (max_connections - reserved) // workers
+    if budget < 1:
+        raise ValueError(
+            f"{workers} workers não cabem em {max_connections} conexões "
+            f"({reserved} reservadas): reduza --workers ou use um pooler")
+    pool_size = max(1, round(budget / (1 + overflow_ratio)))
+    return pool_size, budget - pool_size
+
+
+def plan_hash_workers(workers: int, cpus: int) -> int:
+    """Processos de hash por worker: metade dos núcleos dividida entre todos."""
+    return max(1, (cpus // 2) // workers)
+
+
+def db_max_connections(url: str) -> Optional[int]:
+    """max_connections do Postgres (None para SQLite ou banco inacessível)."""
+    if not url.startswith("postgresql"):
+        return None
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import SQLAlchemyError
+    from sqlalchemy.pool import NullPool
+
+    # Engine descartável no supervisor: não deixa pool vivo para os workers
+    engine = create_engine(url, poolclass=NullPool)
+    try:
+        with engine.connect() as conn:
+            return int(conn.execute(text("SHOW max_connections")).scalar())
+    except SQLAlchemyError as exc:
+        logger.warning("Não consegui ler max_connections: %s", exc)
+        return None
+    finally:
+        engine.dispose()
+
+
+# Só os arquivos que os workers gravam (metrics-<pid>.json e o .tmp da escrita)
+_SNAPSHOT_FILE = re.compile(r"^metrics-\d+\.json(\.tmp)?$")
+
+
+def prepare_metrics_dir(path: Optional[str]) -> str:
+    """
+    Diretório para os snapshots, sem restos de um run anterior.
+
+    O --metrics-dir vem do operador e pode ser um diretório com outras
+    coisas: apagamos só os snapshots (metrics-<pid>.json), nunca o resto.
+    """
+    path = path or os.path.join(tempfile.gettempdir(), f"ticket-metrics-{os.getpid()}")
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if _SNAPSHOT_FILE.match(name):
+            os.remove(os.path.join(path, name))
+    return path
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Servidor com N workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--db-max-connections", type=int,
+                        help="Padrão: SHOW max_connections (Postgres)")
+    parser.add_argument("--reserved-connections", type=int, default=10,
+                        help="Conexões deixadas para admin/migrations/jobs")
+    parser.add_argument("--metrics-dir", help="Padrão: diretório temporário")
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    from app.config import DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_SIZE
+
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+
+    max_connections = args.db_max_connections or db_max_connections(DATABASE_URL)
+    if max_connections is not None:
+        pool_size, max_overflow = plan_pool(args.workers, max_connections,
+                                            args.reserved_connections)
+    else:
+        pool_size, max_overflow = DB_POOL_SIZE, DB_MAX_OVERFLOW
+    metrics_dir = prepare_metrics_dir(args.metrics_dir)
+
+    # Os workers são processos novos (spawn) e leem a config do ambiente
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    os.environ["METRICS_MULTIPROC_DIR"] = metrics_dir
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", str(
+        plan_hash_workers(args.workers, os.cpu_count() or 2)))
+
+    logger.info("%s workers, pool %s + overflow %s por worker "
+                "(até %s conexões; limite do banco: %s), %s processos de hash "
+                "por worker, métricas em %s",
+                args.workers, pool_size, max_overflow,
+                args.workers * (pool_size + max_overflow),
+                max_connections or "desconhecido",
+                os.environ["PASSWORD_HASH_WORKERS"], metrics_dir)
+
+    uvicorn.run(
+        "app.main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
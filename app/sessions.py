@@ -0,0 +1,313 @@
+"""
+Sessões de login (token Bearer) sem ir ao banco a cada request.
+
+Token: 32 bytes aleatórios entregues UMA vez no login. O store guarda só
+o SHA-256 do token: um dump da memória ou da tabela não serve para se
+passar por ninguém.
+
+MemorySessionStore (por worker):
+- dict ordenado hash -> sessão: get/put/delete em O(1), e a ordem é a de
+  uso (LRU)
+- heap por expires_at: a expiração olha só o topo do heap (as que vencem
+  primeiro), nunca varre todas as sessões
+- teto rígido (SESSION_MAX_ENTRIES): passou, sai a menos usada. Memória
+  fica plana não importa quantos logins aconteçam
+  (python -m benchmarks.session_memory --sessions 1000000)
+
+Vários workers (SESSION_BACKEND=sql): a tabela user_sessions é a fonte
+da verdade e a memória vira cache. Sessão que não está no cache deste
+worker é buscada 1x no banco e fica no cache por até
+SESSION_CACHE_SECONDS; por isso um logout feito em outro worker leva até
+esse tempo para valer aqui. Outro backend compartilhado (ex.: Redis) só
+precisa implementar SessionBackend.
+"""
+import hashlib
+import heapq
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Protocol, Tuple
+
+from fastapi import Header, HTTPException, status
+from sqlalchemy import delete, select
+
+from app.config import (
+    AUTH_REQUIRED, SESSION_BACKEND, SESSION_CACHE_SECONDS, SESSION_MAX_ENTRIES, SESSION_TTL_SECONDS,
+    SessionLocal,
+)
+from app.models import UserSession
+
+TOKEN_BYTES = 32
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class AuthSession:
+    """Sessão autenticada (o que a rota recebe)."""
+
+    __slots__ = ("user_id", "expires_at")
+
+    def __init__(self, user_id: int, expires_at: float) -> None:
+        self.user_id = user_id
+        self.expires_at = expires_at  # time.time()
+
+    def __repr__(self) -> str:
+        return f"<AuthSession(user_id={self.user_id}, expires_at={self.expires_at})>"
+
+
+class MemorySessionStore:
+    """LRU com teto + expiração por heap. Thread-safe."""
+
+    def __init__(self, max_entries: int = SESSION_MAX_ENTRIES,
+                 clock=time.time) -> None:
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, AuthSession]" = OrderedDict()
+        # (expires_at, hash). Entradas removidas antes de vencer (logout,
+        # LRU) ficam no heap até o compact: ver _compact
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, key: str, session: AuthSession) -> None:
+        with self._lock:
+            self._expire()
+            self._entries[key] = session
+            self._entries.move_to_end(key)
+            heapq.heappush(self._heap, (session.expires_at, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._compact()
+
+    def get(self, key: str) -> Optional[AuthSession]:
+        with self._lock:
+            session = self._entries.get(key)
+            if session is None:
+                return None
+            if session.expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return session
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._heap.clear()
+
+    def _expire(self) -> None:
+        """Remove as vencidas do topo do heap (custo proporcional às vencidas)."""
+        now = self.clock()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            session = self._entries.get(key)
+            # Só remove se for ESTA sessão (a chave pode ter sido regravada)
+            if session is not None and session.expires_at == expires_at:
+                del self._entries[key]
+                self.expirations += 1
+
+    def _compact(self) -> None:
+        # Heap com muito lixo (sessões já removidas por LRU/logout):
+        # reconstrói só com as vivas. O(n), amortizado O(1) por put.
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._heap = [(session.expires_at, key)
+                          for key, session in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries,
+                "heap": len(self._heap), "evictions": self.evictions,
+                "expirations": self.expirations}
+
+
+class SessionBackend(Protocol):
+    """Armazenamento compartilhado entre workers."""
+
+    def load(self, key: str) -> Optional[AuthSession]: ...
+
+    def save(self, key: str, session: AuthSession) -> None: ...
+
+    def remove(self, key: str) -> None: ...
+
+
+class SqlSessionBackend:
+    """Tabela user_sessions (1 linha por login)."""
+
+    def __init__(self, session_factory=SessionLocal) -> None:
+        self.session_factory = session_factory
+
+    def load(self, key: str) -> Optional[AuthSession]:
+        with self.session_factory() as db:
+            row = db.execute(
+                select(UserSession.user_id, UserSession.expires_at)
+                .where(UserSession.token_hash == key)).first()
+        if row is None:
+            return None
+        return AuthSession(row.user_id, row.expires_at.timestamp())
+
+    def save(self, key: str, session: AuthSession) -> None:
+        with self.session_factory() as db, db.begin():
+            db.add(UserSession(token_hash=key, user_id=session.user_id,
+                               expires_at=datetime.fromtimestamp(session.expires_at)))
+
+    def remove(self, key: str) -> None:
+        with self.session_factory() as db, db.begin():
+            db.execute(delete(UserSession).where(UserSession.token_hash == key))
+
+    def purge_expired(self, batch_size: int = 1000) -> int:
+        """Apaga sessões vencidas em lotes (pelo índice de expires_at)."""
+        removed = 0
+        while True:
+            with self.session_factory() as db, db.begin():
+                keys = db.execute(
+                    select(UserSession.token_hash)
+                    .where(UserSession.expires_at <= datetime.now())
+                    .limit(batch_size)).scalars().all()
+                if not keys:
+                    return removed
+                db.execute(delete(UserSession).where(UserSession.token_hash.in_(keys)))
+            removed += len(keys)
+
+
+class SessionStore:
+    """Login/lookup/logout: memória na frente, backend opcional atrás."""
+
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS,
+                 memory: Optional[MemorySessionStore] = None,
+                 backend: Optional[SessionBackend] = None,
+                 cache_seconds: float = SESSION_CACHE_SECONDS) -> None:
+        self.ttl = ttl
+        self.memory = memory if memory is not None else MemorySessionStore()
+        self.backend = backend
+        self.cache_seconds = cache_seconds
+
+    def _cache(self, key: str, session: AuthSession) -> None:
+        if self.backend is not None:
+            # No cache, no máximo cache_seconds: logout em outro worker vale logo
+            cached = AuthSession(session.user_id, min(
+                session.expires_at, self.memory.clock() + self.cache_seconds))
+            self.memory.put(key, cached)
+        else:
+            self.memory.put(key, session)
+
+    def create(self, user_id: int) -> Tuple[str, AuthSession]:
+        """Nova sessão; devolve (token, sessão). O token não fica guardado."""
+        token = secrets.token_urlsafe(TOKEN_BYTES)
+        key = hash_token(token)
+        session = AuthSession(user_id, self.memory.clock() + self.ttl)
+        if self.backend is not None:
+            self.backend.save(key, session)
+        self._cache(key, session)
+        return token, session
+
+    def get(self, token: str) -> Optional[AuthSession]:
+        key = hash_token(token)
+        session = self.memory.get(key)
+        if session is not None or self.backend is None:
+            return session
+        session = self.backend.load(key)
+        if session is None or session.expires_at <= self.memory.clock():
+            return None
+        self._cache(key, session)
+        return session
+
+    def revoke(self, token: str) -> None:
+        key = hash_token(token)
+        self.memory.delete(key)
+        if self.backend is not None:
+            self.backend.remove(key)
+
+    def clear(self) -> None:
+        """Esquece as sessões em memória deste worker (ex.: /seed)."""
+        self.memory.clear()
+
+    def stats(self) -> dict:
+        return {"backend": type(self.backend).__name__ if self.backend else "memory",
+                **self.memory.stats()}
+
+
+def expires_at_datetime(session: AuthSession) -> datetime:
+    return datetime.fromtimestamp(session.expires_at)
+
+
+session_store = SessionStore(
+    backend=SqlSessionBackend() if SESSION_BACKEND == "sql" else None)
+
+
+# ═══════════════════════════════════════════════════════════
+# FASTAPI: dependência das rotas autenticadas
+# ═══════════════════════════════════════════════════════════
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def bearer_token(authorization: str | None) -> Optional[str]:
+    if authorization is None:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        raise _unauthorized("Authorization deve ser 'Bearer <token>'")
+    return token.strip()
+
+
+def optional_session(
+        authorization: str | None = Header(default=None)) -> Optional[AuthSession]:
+    """
+    Sessão do header Authorization (só memória, sem banco no caminho comum).
+    Sem header: None, a menos que AUTH_REQUIRED=1. Token inválido/vencido: 401.
+    """
+    token = bearer_token(authorization)
+    if token is None:
+        if AUTH_REQUIRED:
+            raise _unauthorized("Login necessário")
+        return None
+    session = session_store.get(token)
+    if session is None:
+        raise _unauthorized("Sessão inválida ou expirada")
+    return session
+
+
+def check_owner(auth: Optional[AuthSession], user_id: int) -> None:
+    """Com sessão, só dá para agir em nome do próprio usuário."""
+    if auth is not None and auth.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="user_id diferente do usuário logado",
+        )
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manutenção das sessões de login")
+    parser.add_argument("--purge-expired", action="store_true",
+                        help="Apaga da tabela user_sessions as sessões vencidas")
+    args = parser.parse_args()
+    if not args.purge_expired:
+        parser.error("nada a fazer (use --purge-expired)")
+    print(f"{SqlSessionBackend().purge_expired()} sessões vencidas apagadas")
+
+
+if __name__ == "__main__":
+    main()
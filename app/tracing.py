@@ -0,0 +1,396 @@
+"""
+Tracing distribuído compatível com OpenTelemetry (sem dependência nova).
+
+Modelo igual ao do OTel: trace_id de 16 bytes, span_id de 8 bytes,
+propagação W3C `traceparent` e export em JSON no formato dos spans OTLP.
+Spans gerados:
+
+    HTTP POST /tickets/reserve            (middleware)
+    ├── db.acquire_connection             (get_db: checkout do pool)
+    ├── lock_user_row / check_user_ticket_limit
+    ├── db.query  (1 por statement)       (eventos do SQLAlchemy)
+    ├── db.lock_wait  (SELECT ... FOR UPDATE)
+    └── db.commit
+
+Configuração (env):
+    TRACING_EXPORTER=none | memory | file:/caminho/spans.ndjson
+    TRACE_SAMPLE_RATIO=0.01    (fração de traces novos amostrados)
+
+Sampling "parent-based": um traceparent recebido com flag sampled decide
+pelo cliente; traces novos usam a fração (pela trace_id, igual ao
+TraceIdRatioBased do OTel). Spans não amostrados não alocam nada além de um
+objeto no-op, então dá para deixar ligado em produção.
+"""
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import TRACE_SAMPLE_RATIO, TRACING_EXPORTER
+
+_TRACE_ID_LIMIT = 1 << 64
+
+
+class Span:
+    """Span gravável (só existe para traces amostrados)."""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind",
+                 "start_ns", "end_ns", "attributes", "status")
+    recording = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str],
+                 kind: str = "INTERNAL") -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: dict = {}
+        self.status = "UNSET"
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.attributes["exception.type"] = type(exc).__name__
+
+    def to_otlp(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind}",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": f"STATUS_CODE_{self.status}"},
+        }
+
+
+class _NonRecordingSpan:
+    """Trace não amostrado: carrega só o trace_id para propagação."""
+    __slots__ = ("trace_id", "span_id")
+    recording = False
+
+    def __init__(self, trace_id: str, span_id: str) -> None:
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def set_error(self, exc: BaseException) -> None:
+        pass
+
+
+class _RemoteParent:
+    """Span de outro serviço (traceparent amostrado): só serve de pai."""
+    __slots__ = ("trace_id", "span_id")
+    recording = True
+
+    def __init__(self, trace_id: str, span_id: str) -> None:
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+# ═══════════════════════════════════════════════════════════
+# EXPORTERS
+# ═══════════════════════════════════════════════════════════
+
+
+class InMemoryExporter:
+    """Coletor para testes: `exporter.spans` guarda os spans finalizados."""
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+    def flush(self) -> None:
+        pass
+
+
+class FileExporter:
+    """Uma linha JSON (span OTLP) por span, com escrita em buffer."""
+
+    def __init__(self, path: str, flush_every: int = 100) -> None:
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_otlp())
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.flush_every:
+                self._write()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write()
+
+    def _write(self) -> None:
+        if not self._buffer:
+            return
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write("\n".join(self._buffer) + "\n")
+        self._buffer.clear()
+
+
+def exporter_from_config(value: str):
+    if value == "memory":
+        return InMemoryExporter()
+    if value.startswith("file:"):
+        return FileExporter(value[len("file:"):])
+    return None
+
+
+# ═══════════════════════════════════════════════════════════
+# TRACER
+# ═══════════════════════════════════════════════════════════
+
+
+_current_span: ContextVar = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample_ratio: float = 1.0) -> None:
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def _should_sample(self, trace_id: str) -> bool:
+        # TraceIdRatioBased: decisão determinística pelos 64 bits baixos
+        return int(trace_id[16:], 16) < self.sample_ratio * _TRACE_ID_LIMIT
+
+    def start_span(self, name: str, kind: str = "INTERNAL",
+                   parent=None, sampled: Optional[bool] = None):
+        """Cria um span filho do atual (ou do `parent`). Não vira o atual."""
+        parent = parent if parent is not None else _current_span.get()
+        if parent is not None:
+            if not parent.recording:
+                return parent
+            return Span(name, parent.trace_id, parent.span_id, kind)
+
+        trace_id = f"{random.getrandbits(128):032x}"
+        if sampled is None:
+            sampled = self.enabled and self._should_sample(trace_id)
+        if not sampled or not self.enabled:
+            return _NonRecordingSpan(trace_id, f"{random.getrandbits(64):016x}")
+        return Span(name, trace_id, None, kind)
+
+    def end_span(self, span) -> None:
+        if span.recording and span.end_ns == 0:
+            span.end_ns = time.time_ns()
+            self.exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator:
+        """Span filho do atual, ativo durante o bloco."""
+        current = _current_span.get()
+        if current is None or not current.recording:
+            yield current
+            return
+
+        span = Span(name, current.trace_id, current.span_id)
+        span.attributes.update(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.set_error(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def is_recording() -> bool:
+    span = _current_span.get()
+    return span is not None and span.recording
+
+
+tracer = Tracer(exporter_from_config(TRACING_EXPORTER), TRACE_SAMPLE_RATIO)
+
+
+# ═══════════════════════════════════════════════════════════
+# SQLALCHEMY: statements, lock wait e commit
+# ═══════════════════════════════════════════════════════════
+
+
+# `EXECUTE hot_..._for_update (...)`: versões PREPARE de app/queries.py
+_PREPARED_LOCK = "_for_update ("
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not is_recording():
+        return
+    locking = "FOR UPDATE" in statement or _PREPARED_LOCK in statement
+    name = "db.lock_wait" if locking else "db.query"
+    span = tracer.start_span(name, kind="CLIENT")
+    span.set_attribute("db.system", conn.dialect.name)
+    span.set_attribute("db.statement", statement[:500])
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        span = spans.pop()
+        span.set_attribute("db.rows", cursor.rowcount)
+        tracer.end_span(span)
+
+
+# O evento "commit" do Engine dispara ANTES do COMMIT; o "after_commit" da
+# Session dispara depois. O span fica num contextvar entre os dois.
+_pending_commit: ContextVar = ContextVar("pending_commit", default=None)
+
+
+def _on_commit(conn):
+    if is_recording():
+        _pending_commit.set(tracer.start_span("db.commit", kind="CLIENT"))
+
+
+def _on_rollback(conn):
+    span = _pending_commit.get()
+    if span is not None:
+        _pending_commit.set(None)
+        span.status = "ERROR"
+        tracer.end_span(span)
+
+
+def _after_session_commit(session):
+    span = _pending_commit.get()
+    if span is not None:
+        _pending_commit.set(None)
+        tracer.end_span(span)
+
+
+def instrument_tracing(engine: Engine) -> None:
+    """Liga os spans de SQL a um Engine (idempotente)."""
+    if not tracer.enabled:
+        return
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "commit", _on_commit)
+    event.listen(engine, "rollback", _on_rollback)
+    event.listen(Session, "after_commit", _after_session_commit)
+
+
+# ═══════════════════════════════════════════════════════════
+# ASGI
+# ═══════════════════════════════════════════════════════════
+
+
+def parse_traceparent(value: str):
+    """`00-<trace_id>-<span_id>-<flags>` -> (trace_id, span_id, sampled)."""
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class TracingMiddleware:
+    """Span SERVER por request; respeita o `traceparent` do cliente."""
+
+    def __init__(self, app, tracer_: Optional[Tracer] = None) -> None:
+        self.app = app
+        self.tracer = tracer_ or tracer
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        parent, sampled = None, None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                parsed = parse_traceparent(value.decode("latin-1"))
+                if parsed is not None:
+                    trace_id, span_id, sampled = parsed
+                    parent = (_RemoteParent(trace_id, span_id) if sampled
+                              else _NonRecordingSpan(trace_id, span_id))
+                break
+
+        span = self.tracer.start_span(f"HTTP {scope['method']}", kind="SERVER",
+                                      parent=parent, sampled=sampled)
+        if not span.recording:
+            token = _current_span.set(span)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _current_span.reset(token)
+            return
+
+        span.set_attribute("http.method", scope["method"])
+        span.set_attribute("http.target", scope.get("path", ""))
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                span.set_attribute("http.status_code", status)
+                if status >= 500:
+                    span.status = "ERROR"
+            await send(message)
+
+        token = _current_span.set(span)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            span.set_error(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            # Nome só é conhecido depois do roteamento (template, não o path)
+            route = getattr(scope.get("route"), "path", None)
+            if route is not None:
+                span.name = f"HTTP {scope['method']} {route}"
+                span.set_attribute("http.route", route)
+            self.tracer.end_span(span)
@@ -0,0 +1,139 @@
+"""
+Fila de espera por evento (FIFO) com repasse automático do ingresso.
+
+Depois de esgotar, quem recebia 409 tentava a reserva de novo em loop: cada
+tentativa trava a linha do usuário e procura ingresso livre para nada. Com
+a fila, o usuário entra UMA vez e espera; quando um ingresso é cancelado,
+ele vai direto para o 1º da fila NA MESMA transação do cancelamento (o
+ingresso nunca aparece livre, então ninguém "fura" a fila) e o novo dono é
+avisado pelo outbox (tópico waitlist.assigned).
+
+Estrutura (tudo O(1) ou uma descida de índice):
+- waitlist_counters: 1 linha por evento com a última senha entregue
+  (next_position), a última atendida (served_position) e quantos esperam
+- waitlist_entries: 1 linha por usuário na fila com a senha dele
+- entrar: UPSERT no contador (RETURNING da senha nova) + 1 INSERT
+- atender: cabeça pelo índice (event_id, position) + DELETE
+- sair: DELETE pelo índice (event_id, user_id)
+- posição: senha - served_position, sem contar ninguém. É um limite
+  superior: quem saiu da fila na frente ainda conta até ser atendido
+  alguém depois dele
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import WaitlistCounter, WaitlistEntry
+
+
+def _status(entry: WaitlistEntry, counter: WaitlistCounter) -> dict:
+    return {
+        "event_id": entry.event_id,
+        "user_id": entry.user_id,
+        "position": max(1, entry.position - counter.served_position),
+        "waiting": counter.waiting,
+        "joined_at": entry.joined_at,
+    }
+
+
+def _find(session: Session, event_id: int, user_id: int) -> Optional[WaitlistEntry]:
+    return session.execute(
+        select(WaitlistEntry).where(WaitlistEntry.event_id == event_id,
+                                    WaitlistEntry.user_id == user_id)
+    ).scalar_one_or_none()
+
+
+def join(session: Session, event_id: int, user_id: int) -> tuple[dict, bool]:
+    """
+    Coloca o usuário no fim da fila; devolve (posição, entrou_agora).
+
+    Já na fila: devolve a posição atual (entrar de novo não perde o lugar).
+    Dois joins simultâneos do mesmo usuário: o índice único recusa o 2º
+    (IntegrityError) e quem chamou relê a posição.
+    """
+    entry = _find(session, event_id, user_id)
+    if entry is not None:
+        return _status(entry, session.get(WaitlistCounter, event_id)), False
+
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(WaitlistCounter).values(
+        event_id=event_id, next_position=1, served_position=0, waiting=1)
+    # A linha do contador serializa os joins do evento: cada um sai com uma
+    # senha diferente, sem SELECT max(position)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["event_id"],
+        set_={"next_position": WaitlistCounter.next_position + 1,
+              "waiting": WaitlistCounter.waiting + 1},
+    ).returning(WaitlistCounter)
+    counter = session.execute(
+        select(WaitlistCounter).from_statement(stmt)
+        .execution_options(populate_existing=True)).scalar_one()
+
+    entry = WaitlistEntry(event_id=event_id, user_id=user_id,
+                          position=counter.next_position)
+    session.add(entry)
+    session.flush()
+    return _status(entry, counter), True
+
+
+def position(session: Session, event_id: int, user_id: int) -> Optional[dict]:
+    """Posição do usuário na fila (None se não está nela)."""
+    entry = _find(session, event_id, user_id)
+    if entry is None:
+        return None
+    return _status(entry, session.get(WaitlistCounter, event_id))
+
+
+def leave(session: Session, event_id: int, user_id: int) -> bool:
+    """Tira o usuário da fila; False se ele não estava nela."""
+    removed = session.execute(
+        delete(WaitlistEntry).where(WaitlistEntry.event_id == event_id,
+                                    WaitlistEntry.user_id == user_id)).rowcount
+    if removed:
+        session.execute(
+            update(WaitlistCounter).where(WaitlistCounter.event_id == event_id)
+            .values(waiting=WaitlistCounter.waiting - 1))
+    return bool(removed)
+
+
+def pop_next(session: Session, event_id: int,
+             exclude_user_id: Optional[int] = None) -> Optional[WaitlistEntry]:
+    """
+    Tira da fila e devolve o 1º da fila (None se vazia).
+
+    `exclude_user_id`: quem está cancelando não recebe de volta o próprio
+    ingresso. No Postgres, SKIP LOCKED: dois cancelamentos simultâneos do
+    mesmo evento atendem pessoas diferentes em vez de um esperar o outro.
+    """
+    query = select(WaitlistEntry).where(WaitlistEntry.event_id == event_id)
+    if exclude_user_id is not None:
+        query = query.where(WaitlistEntry.user_id != exclude_user_id)
+    query = query.order_by(WaitlistEntry.position).limit(1)
+    if session.get_bind().dialect.name != "sqlite":
+        query = query.with_for_update(skip_locked=True)
+    entry = session.execute(query).scalar_one_or_none()
+    if entry is None:
+        return None
+
+    session.delete(entry)
+    session.execute(
+        update(WaitlistCounter).where(WaitlistCounter.event_id == event_id)
+        .values(waiting=WaitlistCounter.waiting - 1,
+                served_position=case(
+                    (WaitlistCounter.served_position < entry.position, entry.position),
+                    else_=WaitlistCounter.served_position)))
+    return entry
+
+
+def clear_waitlists(session: Session, event_ids: Optional[Iterable[int]] = None) -> None:
+    """Apaga as filas dos eventos (todas, sem `event_ids`): /seed e arquivamento."""
+    entries, counters = delete(WaitlistEntry), delete(WaitlistCounter)
+    if event_ids is not None:
+        event_ids = list(event_ids)
+        entries = entries.where(WaitlistEntry.event_id.in_(event_ids))
+        counters = counters.where(WaitlistCounter.event_id.in_(event_ids))
+    session.execute(entries)
+    session.execute(counters)
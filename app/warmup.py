@@ -0,0 +1,72 @@
+"""
+Warm-up do banco no startup (chamado pelo lifespan da app).
+
+Um worker recém-criado pelo autoscaler paga no 1º request:
+- conexão nova ao banco (TCP + auth no Postgres: vários ms)
+- compilação SQL de cada statement (o cache de compilação do SQLAlchemy
+  começa vazio em cada processo)
+
+O warm-up faz isso antes de o worker receber tráfego:
+1. abre `connections` conexões ao mesmo tempo e devolve ao pool
+2. roda as queries quentes (as mesmas funções do hot path) com ids que não
+   existem, numa transação que sofre ROLLBACK: compila e cacheia os
+   statements sem tocar em dado nenhum
+
+Falha no warm-up (banco fora, tabela faltando) só vira log: a app sobe do
+mesmo jeito e paga o custo no primeiro request, como antes.
+"""
+import logging
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+WarmupQuery = Callable[[Session], object]
+
+
+def open_pool_connections(engine: Engine, connections: int) -> int:
+    """Abre N conexões simultâneas (força o pool a criá-las) e devolve."""
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+def run_warmup_queries(engine: Engine, queries: Iterable[WarmupQuery]) -> int:
+    """Executa cada query quente numa transação descartada (ROLLBACK)."""
+    executed = 0
+    with Session(engine) as session:
+        try:
+            for query in queries:
+                query(session)
+                executed += 1
+        finally:
+            session.rollback()
+    return executed
+
+
+def warm_up(engine: Engine, connections: int,
+            queries: Iterable[WarmupQuery] = ()) -> dict:
+    """Pré-abre o pool e pré-compila as queries quentes. Nunca levanta."""
+    if connections <= 0:
+        return {"skipped": True}
+
+    start = time.perf_counter()
+    result = {"connections": 0, "queries": 0}
+    try:
+        result["connections"] = open_pool_connections(engine, connections)
+        result["queries"] = run_warmup_queries(engine, queries)
+    except SQLAlchemyError as exc:
+        logger.warning("Warm-up do banco incompleto: %s", exc)
+        result["error"] = type(exc).__name__
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    logger.info("Warm-up do banco: %s", result)
+    return result
@@ -0,0 +1,7 @@
+"""
+Benchmarks e testes de carga da API.
+
+Substituem os antigos scripts stress_test*.py (que chamavam rotas que não
+existem mais). Rode como módulos:
+    python -m benchmarks.loadgen --in-process --scenario flash-sale
+"""
@@ -0,0 +1,145 @@
+"""
+Migration com backfill interrompida no meio e rodada de novo (exit 1 se falhar).
+
+Usa o upgrade() do exemplo de app/backfill.py, copiado do docstring para
+uma revision temporária: se o exemplo documentado deixar de ser seguro
+para re-rodar, este check quebra junto.
+
+Roteiro, num SQLite temporário:
+1. alembic upgrade head (migrations reais) + BATCHES lotes de tickets
+2. upgrade da revision do exemplo com o 2º lote do backfill falhando:
+   a coluna já foi commitada, o alembic_version não andou
+3. upgrade de novo: não pode falhar com "duplicate column", retoma do
+   checkpoint (não refaz o 1º lote) e termina com todas as linhas
+   preenchidas e o índice criado
+
+Exemplo:
+    python -m benchmarks.backfill_rerun
+"""
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+from datetime import datetime
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, insert, inspect, text
+
+import app.backfill
+from app.backfill import Backfill
+from app.models import Ticket
+
+ROOT = Path(__file__).resolve().parent.parent
+REVISION = "backfill_rerun_check"
+BATCH_SIZE = 5000  # o mesmo do exemplo
+BATCHES = 3
+
+
+def example_upgrade() -> str:
+    """O bloco de exemplo do docstring de app/backfill.py, sem indentação."""
+    doc = app.backfill.__doc__
+    start = doc.index("    from app.backfill import")
+    end = doc.index("\nAcompanhar", start)
+    return textwrap.dedent(doc[start:end]).strip() + "\n"
+
+
+def write_revision(directory: Path, down_revision: str) -> None:
+    (directory / f"{REVISION}.py").write_text(
+        f'revision = "{REVISION}"\n'
+        f'down_revision = "{down_revision}"\n'
+        "branch_labels = None\n"
+        "depends_on = None\n\n"
+        "from alembic import op\n"
+        "import sqlalchemy as sa\n\n"
+        + example_upgrade(), encoding="utf-8")
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def main() -> int:
+    workdir = Path(tempfile.mkdtemp(prefix="backfill-rerun-"))
+    url = f"sqlite:///{workdir}/rerun.db"
+    versions = workdir / "versions"
+    versions.mkdir()
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", url)
+    # path_separator = os no alembic.ini
+    config.set_main_option("version_locations", os.pathsep.join(
+        [str(ROOT / "migrations" / "versions"), str(versions)]))
+    engine = create_engine(url)
+    original_run_batch = Backfill._run_batch
+    try:
+        head = ScriptDirectory.from_config(config).get_current_head()
+        command.upgrade(config, head)
+        with engine.begin() as conn:
+            conn.execute(insert(Ticket), [
+                {"seat_number": f"A{i}", "price": 10.0, "event_id": 1,
+                 "event_date": datetime(2030, 1, 1), "is_reserved": False}
+                for i in range(BATCH_SIZE * BATCHES)])
+        write_revision(versions, head)
+
+        # 1ª tentativa: o 2º lote "cai" (deploy cancelado no meio)
+        calls = []
+
+        def failing_batch(self, session, low, upper):
+            calls.append(low)
+            if len(calls) == 2:
+                raise _Interrupted()
+            return original_run_batch(self, session, low, upper)
+
+        Backfill._run_batch = failing_batch
+        try:
+            command.upgrade(config, REVISION)
+            raise AssertionError("o upgrade deveria ter sido interrompido")
+        except _Interrupted:
+            pass
+        finally:
+            Backfill._run_batch = original_run_batch
+
+        with engine.connect() as conn:
+            columns = {c["name"] for c in inspect(conn).get_columns("tickets")}
+            assert "currency" in columns, "ADD COLUMN não foi commitado"
+            version = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+            assert version == head, f"alembic_version andou: {version}"
+            batches = conn.execute(text(
+                "SELECT batches FROM backfill_checkpoints WHERE name = 'tickets_currency'"
+            )).scalar()
+            assert batches == 1, f"checkpoint com {batches} lotes (esperado 1)"
+        print(f"interrompido: coluna commitada, 1 lote no checkpoint, versão {version}")
+
+        # 2ª tentativa: o mesmo upgrade() do início
+        command.upgrade(config, REVISION)
+        with engine.connect() as conn:
+            version = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+            missing = conn.execute(text(
+                "SELECT count(*) FROM tickets WHERE currency IS NULL")).scalar()
+            checkpoint = conn.execute(text(
+                "SELECT batches, rows_updated, finished_at FROM backfill_checkpoints "
+                "WHERE name = :name"), {"name": "tickets_currency"}).one()
+            indexes = {i["name"] for i in inspect(conn).get_indexes("tickets")}
+        assert version == REVISION, f"alembic_version = {version}"
+        assert missing == 0, f"{missing} linhas sem currency"
+        assert checkpoint.finished_at is not None, "checkpoint não concluído"
+        assert checkpoint.batches == BATCHES, f"{checkpoint.batches} lotes (refez algum?)"
+        assert checkpoint.rows_updated == BATCH_SIZE * BATCHES, checkpoint
+        assert "ix_tickets_currency" in indexes, "índice não criado"
+        print(f"re-run: versão {version}, {checkpoint.rows_updated} linhas em "
+              f"{checkpoint.batches} lotes, índice criado")
+    except AssertionError as exc:
+        print(f"FAIL {exc}")
+        return 1
+    finally:
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
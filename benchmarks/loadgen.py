@@ -0,0 +1,351 @@
+"""
+Gerador de carga assíncrono (httpx + asyncio).
+
+Cenários:
+- flash-sale: todo mundo tentando reservar o MESMO evento
+- browse:     navegação (listagens, busca, analytics) com poucas reservas
+- search:     só busca por nome
+
+Modos de chegada:
+- fechado (padrão): `--concurrency` workers, cada um dispara o próximo
+  request assim que o anterior responde
+- aberto: `--rate` requests/s com chegadas Poisson, independente da
+  latência (mostra a fila crescendo quando o servidor satura);
+  `--concurrency` vira o teto de requests em voo
+
+Alvo:
+- `--base-url http://localhost:8000` (servidor rodando), ou
+- `--in-process`: importa a app e fala ASGI direto, com um SQLite
+  temporário (ou o DATABASE_URL do ambiente, ex.: um Postgres local)
+
+Exemplos:
+    python -m benchmarks.loadgen --in-process --scenario flash-sale -d 10
+    python -m benchmarks.loadgen --base-url http://localhost:8000 \\
+        --scenario browse --rate 200 --out results/browse.json
+    python -m benchmarks.loadgen ... --compare results/browse.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from collections import Counter
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+PERCENTILES = (50, 95, 99, 99.9)
+
+Request = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Config:
+    scenario: str = "flash-sale"
+    duration: float = 10.0
+    concurrency: int = 50
+    rate: Optional[float] = None
+    event_id: int = 1
+    events: int = 10
+    users: Tuple[int, int] = (1, 10)
+    seed: bool = True
+    base_url: Optional[str] = None
+    in_process: bool = False
+
+
+@dataclass
+class Recorder:
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    statuses: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+
+    def record(self, name: str, seconds: float, status: Optional[int],
+               error: Optional[str] = None) -> None:
+        self.latencies.setdefault(name, []).append(seconds)
+        if status is not None:
+            self.statuses[str(status)] += 1
+        if error is not None:
+            self.errors[error] += 1
+
+
+# ═══════════════════════════════════════════════════════════
+# CENÁRIOS
+# ═══════════════════════════════════════════════════════════
+
+
+def _reserve(cfg: Config) -> Request:
+    async def call(client, rng):
+        return await client.post("/tickets/reserve", json={
+            "event_id": cfg.event_id,
+            "user_id": rng.randint(*cfg.users),
+        })
+    return call
+
+
+def _reserve_any(cfg: Config) -> Request:
+    async def call(client, rng):
+        return await client.post("/tickets/reserve", json={
+            "event_id": rng.randint(1, cfg.events),
+            "user_id": rng.randint(*cfg.users),
+        })
+    return call
+
+
+def _search(cfg: Config) -> Request:
+    async def call(client, rng):
+        return await client.get("/events/search",
+                                params={"name": f"Concert {rng.randint(1, cfg.events)}"})
+    return call
+
+
+def _get(path: str) -> Request:
+    async def call(client, rng):
+        return await client.get(path)
+    return call
+
+
+def build_scenario(cfg: Config) -> List[Tuple[str, float, Request]]:
+    """Lista de (nome, peso, request)."""
+    if cfg.scenario == "flash-sale":
+        return [("reserve", 1.0, _reserve(cfg))]
+    if cfg.scenario == "search":
+        return [("search", 1.0, _search(cfg))]
+    if cfg.scenario == "browse":
+        return [
+            ("events-good", 0.35, _get("/events-good")),
+            ("search", 0.35, _search(cfg)),
+            ("top-events", 0.15, _get("/analytics/top-events")),
+            ("sell-through", 0.10, _get(f"/analytics/events/{cfg.event_id}/sell-through")),
+            ("reserve", 0.05, _reserve_any(cfg)),
+        ]
+    raise ValueError(f"Cenário desconhecido: {cfg.scenario}")
+
+
+# ═══════════════════════════════════════════════════════════
+# EXECUÇÃO
+# ═══════════════════════════════════════════════════════════
+
+
+async def _one(client, rng, scenario, weights, recorder: Recorder) -> None:
+    name, _, request = rng.choices(scenario, weights=weights)[0]
+    start = time.perf_counter()
+    try:
+        response = await request(client, rng)
+    except httpx.HTTPError as exc:
+        recorder.record(name, time.perf_counter() - start, None, type(exc).__name__)
+        return
+    recorder.record(name, time.perf_counter() - start, response.status_code)
+
+
+async def run_closed(client, cfg: Config, recorder: Recorder) -> None:
+    scenario = build_scenario(cfg)
+    weights = [weight for _, weight, _ in scenario]
+    deadline = time.perf_counter() + cfg.duration
+
+    async def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            await _one(client, rng, scenario, weights, recorder)
+
+    await asyncio.gather(*(worker(i) for i in range(cfg.concurrency)))
+
+
+async def run_open(client, cfg: Config, recorder: Recorder) -> None:
+    scenario = build_scenario(cfg)
+    weights = [weight for _, weight, _ in scenario]
+    rng = random.Random(0)
+    limit = asyncio.Semaphore(cfg.concurrency)
+    tasks = set()
+    deadline = time.perf_counter() + cfg.duration
+
+    async def fire() -> None:
+        async with limit:
+            await _one(client, rng, scenario, weights, recorder)
+
+    next_at = time.perf_counter()
+    while next_at < deadline:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if limit.locked():
+            # Servidor saturado: chegada descartada (não esconde a fila)
+            recorder.errors["dropped_arrival"] += 1
+        else:
+            task = asyncio.create_task(fire())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        next_at += rng.expovariate(cfg.rate)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def _prepare_in_process():
+    """App em processo com banco temporário (se DATABASE_URL não vier)."""
+    if "DATABASE_URL" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix="loadgen-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from app.config import Base, engine
+    from app.main import app
+
+    engine.echo = False
+    Base.metadata.create_all(engine)
+    return app
+
+
+async def run(cfg: Config) -> dict:
+    async with AsyncExitStack() as stack:
+        if cfg.in_process:
+            app = _prepare_in_process()
+            # ASGITransport não dispara o lifespan: roda o startup à mão
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport, base_url = httpx.ASGITransport(app=app), "http://testserver"
+        else:
+            transport, base_url = None, cfg.base_url or "http://localhost:8000"
+        return await _run_against(cfg, transport, base_url)
+
+
+async def _run_against(cfg: Config, transport, base_url: str) -> dict:
+    limits = httpx.Limits(max_connections=cfg.concurrency,
+                          max_keepalive_connections=cfg.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, transport=transport,
+                                 limits=limits, timeout=30) as client:
+        if cfg.seed:
+            (await client.post("/seed")).raise_for_status()
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        if cfg.rate:
+            await run_open(client, cfg, recorder)
+        else:
+            await run_closed(client, cfg, recorder)
+        elapsed = time.perf_counter() - started
+
+    return report(cfg, recorder, elapsed)
+
+
+# ═══════════════════════════════════════════════════════════
+# RELATÓRIO
+# ═══════════════════════════════════════════════════════════
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Percentis nearest-rank em milissegundos."""
+    if not samples:
+        return {f"p{p:g}": 0.0 for p in PERCENTILES}
+    ordered = sorted(samples)
+    result = {}
+    for p in PERCENTILES:
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        result[f"p{p:g}"] = round(ordered[index] * 1000, 3)
+    return result
+
+
+def report(cfg: Config, recorder: Recorder, elapsed: float) -> dict:
+    everything = [s for samples in recorder.latencies.values() for s in samples]
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "config": asdict(cfg),
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": len(everything),
+        "throughput_rps": round(len(everything) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": percentiles(everything),
+        "by_route": {
+            name: {"requests": len(samples), "latency_ms": percentiles(samples)}
+            for name, samples in sorted(recorder.latencies.items())
+        },
+        "status_codes": dict(recorder.statuses),
+        "errors": dict(recorder.errors),
+    }
+
+
+def compare(current: dict, baseline: dict) -> List[str]:
+    """Diferença percentual contra um resultado anterior."""
+    lines = []
+
+    def delta(name: str, new: float, old: float) -> None:
+        change = (new - old) / old * 100 if old else 0.0
+        lines.append(f"{name:<16} {old:>10.2f} -> {new:>10.2f} ({change:+.1f}%)")
+
+    delta("throughput_rps", current["throughput_rps"], baseline["throughput_rps"])
+    for key, value in current["latency_ms"].items():
+        delta(f"latency {key}", value, baseline["latency_ms"].get(key, 0.0))
+    return lines
+
+
+def print_report(result: dict) -> None:
+    print(f"\nCenário: {result['config']['scenario']}  "
+          f"({result['elapsed_seconds']}s, {result['requests']} requests)")
+    print(f"Throughput: {result['throughput_rps']} req/s")
+    print("Latência (ms): " + "  ".join(
+        f"{k}={v}" for k, v in result["latency_ms"].items()))
+    for name, data in result["by_route"].items():
+        print(f"  {name:<14} n={data['requests']:<7} " + "  ".join(
+            f"{k}={v}" for k, v in data["latency_ms"].items()))
+    print(f"Status: {result['status_codes']}  Erros: {result['errors']}")
+
+
+def parse_args(argv=None) -> Tuple[Config, argparse.Namespace]:
+    parser = argparse.ArgumentParser(description="Gerador de carga da API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url")
+    target.add_argument("--in-process", action="store_true")
+    parser.add_argument("--scenario", default="flash-sale",
+                        choices=["flash-sale", "browse", "search"])
+    parser.add_argument("-d", "--duration", type=float, default=10.0)
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("--rate", type=float,
+                        help="Chegadas por segundo (modo aberto)")
+    parser.add_argument("--event-id", type=int, default=1)
+    parser.add_argument("--events", type=int, default=10)
+    parser.add_argument("--users", default="1-10", help="Faixa de user_id (a-b)")
+    parser.add_argument("--no-seed", action="store_true")
+    parser.add_argument("--out", help="Grava o resultado em JSON")
+    parser.add_argument("--compare", help="JSON de um run anterior")
+    args = parser.parse_args(argv)
+
+    low, high = (int(part) for part in args.users.split("-"))
+    cfg = Config(
+        scenario=args.scenario,
+        duration=args.duration,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        event_id=args.event_id,
+        events=args.events,
+        users=(low, high),
+        seed=not args.no_seed,
+        base_url=args.base_url,
+        in_process=args.in_process,
+    )
+    return cfg, args
+
+
+def main(argv=None) -> None:
+    cfg, args = parse_args(argv)
+    result = asyncio.run(run(cfg))
+    print_report(result)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as fh:
+            json.dump(result, fh, indent=2)
+        print(f"Resultado salvo em {args.out}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        print("\nComparação com", args.compare)
+        for line in compare(result, baseline):
+            print("  " + line)
+
+
+if __name__ == "__main__":
+    main()
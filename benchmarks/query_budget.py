@@ -0,0 +1,79 @@
+"""
+Orçamento de queries por rota: falha (exit 1) se alguma rota passar dele.
+
+Trava regressões de N+1 antes de chegarem em produção: um joinedload
+esquecido ou um lazy load dentro de loop multiplica as queries e aparece
+aqui como "3 queries (máximo 1)". Roda contra um SQLite temporário com o
+/seed, usando os helpers de app/profiling.py:
+- assert_endpoint_queries: request com X-SQL-Profile (+ X-Admin-Token)
+- assert_max_queries:      bloco de código chamado direto (sem HTTP)
+
+Exemplo:
+    python -m benchmarks.query_budget
+"""
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+_DB_DIR = tempfile.mkdtemp(prefix="query-budget-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/budget.db"
+os.environ.setdefault("ADMIN_TOKEN", "query-budget")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.config import Base, SessionLocal, get_engine  # noqa: E402
+from app.event_calendar import events_in_range  # noqa: E402
+from app.main import app  # noqa: E402
+from app.profiling import assert_endpoint_queries, assert_max_queries  # noqa: E402
+from app.rollups import top_events  # noqa: E402
+
+# (método, url, máximo de queries)
+ENDPOINT_BUDGETS = [
+    ("GET", "/events-good", 1),
+    ("GET", "/events/search?name=Evento", 1),
+    ("GET", "/events?from=2000-01-01&to=2100-01-01&limit=20", 1),
+    ("GET", "/events/calendar/2026/12", 1),
+    ("GET", "/analytics/top-events", 1),
+]
+
+
+def _check_functions() -> None:
+    with SessionLocal() as session:
+        with assert_max_queries(1):
+            top_events(session)
+        with assert_max_queries(1):
+            events_in_range(session, datetime(2000, 1, 1), datetime(2100, 1, 1), 20)
+
+
+def main() -> int:
+    engine = get_engine()
+    engine.echo = False  # o echo do SQLite esconderia o resultado
+    Base.metadata.create_all(engine)
+    failures = []
+    with TestClient(app) as client:
+        client.post("/seed").raise_for_status()
+        for method, url, budget in ENDPOINT_BUDGETS:
+            try:
+                response = assert_endpoint_queries(client, method, url, budget)
+                print(f"ok   {method} {url}: "
+                      f"{response.headers['x-sql-queries']}/{budget} queries")
+            except AssertionError as exc:
+                failures.append(str(exc))
+                print(f"FAIL {exc}")
+        try:
+            _check_functions()
+            print("ok   top_events / events_in_range: 1 query cada")
+        except AssertionError as exc:
+            failures.append(str(exc))
+            print(f"FAIL {exc}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    try:
+        code = main()
+    finally:
+        shutil.rmtree(_DB_DIR, ignore_errors=True)
+    sys.exit(code)
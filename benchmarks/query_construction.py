@@ -0,0 +1,124 @@
+"""
+Custo Python por request de montar + compilar as queries quentes.
+
+Roda contra um SQLite em memória (tabelas vazias), então o tempo medido
+é quase só o lado Python: construção do construct, cache key, busca no
+cache de compilação e o processamento do resultado.
+
+Variantes por query:
+- adhoc:    monta select(...).where(...) a cada chamada (o código antigo)
+- lambda:   lambda_stmt (cache key pela posição do código + closures)
+- hot:      construct pronto de app/queries.py (cache key memoizada)
+- build:    só a construção ad-hoc, sem executar (custo puro de montar)
+
+Exemplo:
+    python -m benchmarks.query_construction --iterations 20000
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+from sqlalchemy import create_engine, func, lambda_stmt, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import queries
+from app.config import Base
+from app.models import Event, Ticket
+
+EVENT_DATE = datetime(2026, 1, 1, 20, 0)
+
+
+def _count_adhoc(session: Session, user_id: int):
+    return session.query(func.count(Ticket.id)).filter(
+        Ticket.user_id == user_id, Ticket.is_reserved == True).scalar()  # noqa: E712
+
+
+def _count_lambda(session: Session, user_id: int):
+    stmt = lambda_stmt(lambda: select(func.count(Ticket.id)).where(
+        Ticket.user_id == user_id, Ticket.is_reserved.is_(True)))
+    return session.execute(stmt).scalar()
+
+
+def _count_hot(session: Session, user_id: int):
+    return queries.execute(session, queries.ACTIVE_TICKET_COUNT,
+                           user_id=user_id).scalar()
+
+
+def _ticket_adhoc(session: Session, event_id: int):
+    return session.execute(select(Ticket).where(
+        Ticket.event_id == event_id, Ticket.event_date == EVENT_DATE,
+        Ticket.is_reserved.is_(False)).limit(1)).scalar_one_or_none()
+
+
+def _ticket_lambda(session: Session, event_id: int):
+    stmt = lambda_stmt(lambda: select(Ticket).where(
+        Ticket.event_id == event_id, Ticket.event_date == EVENT_DATE,
+        Ticket.is_reserved.is_(False)).limit(1))
+    return session.execute(stmt).scalar_one_or_none()
+
+
+def _ticket_hot(session: Session, event_id: int):
+    return session.execute(queries.AVAILABLE_TICKET_SQLITE, {
+        "event_id": event_id, "event_date": EVENT_DATE}).scalar_one_or_none()
+
+
+def _search_adhoc(session: Session, i: int):
+    return session.execute(select(Event.id, Event.name, Event.price).where(
+        Event.name.ilike(f"%{i}%"))).all()
+
+
+def _search_hot(session: Session, i: int):
+    return queries.execute(session, queries.SEARCH_EVENTS, pattern=f"%{i}%").all()
+
+
+def _build_only(session: Session, event_id: int):
+    return select(Ticket).where(
+        Ticket.event_id == event_id, Ticket.event_date == EVENT_DATE,
+        Ticket.is_reserved.is_(False)).limit(1)
+
+
+CASES: Dict[str, Callable] = {
+    "count adhoc": _count_adhoc,
+    "count lambda": _count_lambda,
+    "count hot": _count_hot,
+    "ticket adhoc": _ticket_adhoc,
+    "ticket lambda": _ticket_lambda,
+    "ticket hot": _ticket_hot,
+    "search adhoc": _search_adhoc,
+    "search hot": _search_hot,
+    "ticket build": _build_only,
+}
+
+
+def run(iterations: int) -> Dict[str, float]:
+    """Microssegundos por chamada de cada variante."""
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    results = {}
+    with Session(engine) as session:
+        for name, case in CASES.items():
+            for i in range(100):  # aquece o cache de compilação
+                case(session, i)
+            start = time.perf_counter()
+            for i in range(iterations):
+                case(session, i)
+            results[name] = (time.perf_counter() - start) / iterations * 1e6
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Custo de construir queries")
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations)
+    print(f"{'variante':<16} {'µs/chamada':>12}")
+    for name, micros in results.items():
+        print(f"{name:<16} {micros:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
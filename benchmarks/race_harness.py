@@ -0,0 +1,353 @@
+"""
+Harness de corretude concorrente para `POST /tickets/reserve`.
+
+Dispara N reservadores concorrentes (threads, processos ou asyncio) contra
+vários eventos e usuários e, no fim, confere invariantes direto no banco:
+
+1. Nenhum ingresso com dois donos: cada ticket_id aparece em no máximo
+   uma resposta 201, e o dono no banco é o da resposta.
+2. Vendidos por evento <= inventário, e 201s do evento == reservados no
+   banco (detecta lost update).
+3. Nenhum usuário com mais de 5 reservas ativas (check_user_ticket_limit).
+4. Rollups (event_sales_totals) batem com a tabela de tickets.
+
+Também reporta contenção: status por código, taxa de 409, retries do
+cliente em 5xx e (no Postgres) amostras de sessões esperando lock.
+
+    python -m benchmarks.race_harness --in-process --mode threads -n 32
+    python -m benchmarks.race_harness --base-url http://localhost:8000 \\
+        --database-url postgresql://... --mode processes -n 64
+
+Sai com código 1 se algum invariante for violado.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import create_engine, text
+
+USER_LIMIT = 5
+Outcome = Tuple[int, int, int, Optional[int], int]  # event, user, status, ticket, retries
+
+
+# ═══════════════════════════════════════════════════════════
+# RESERVADORES
+# ═══════════════════════════════════════════════════════════
+
+
+def _payload(rng: random.Random, events: int, users: int) -> dict:
+    return {"event_id": rng.randint(1, events), "user_id": rng.randint(1, users)}
+
+
+def _record(payload: dict, response: Optional[httpx.Response], retries: int) -> Outcome:
+    if response is None:
+        return payload["event_id"], payload["user_id"], 0, None, retries
+    ticket_id = response.json().get("ticket_id") if response.status_code == 201 else None
+    return payload["event_id"], payload["user_id"], response.status_code, ticket_id, retries
+
+
+def _sync_reserver(client: httpx.Client, seed: int, attempts: int, events: int,
+                   users: int, max_retries: int) -> List[Outcome]:
+    rng = random.Random(seed)
+    outcomes = []
+    for _ in range(attempts):
+        payload = _payload(rng, events, users)
+        response, retries = None, 0
+        while True:
+            try:
+                response = client.post("/tickets/reserve", json=payload)
+            except httpx.HTTPError:
+                response = None
+            if (response is None or response.status_code >= 500) and retries < max_retries:
+                retries += 1
+                continue
+            break
+        outcomes.append(_record(payload, response, retries))
+    return outcomes
+
+
+def _process_reserver(args) -> List[Outcome]:
+    base_url, seed, attempts, events, users, max_retries = args
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        return _sync_reserver(client, seed, attempts, events, users, max_retries)
+
+
+def run_threads(make_client, reservers: int, **kwargs) -> List[Outcome]:
+    results: List[Outcome] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(reservers)
+
+    def target(seed: int) -> None:
+        with make_client() as client:
+            barrier.wait()  # todos largam juntos
+            outcomes = _sync_reserver(client, seed, **kwargs)
+        with lock:
+            results.extend(outcomes)
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(reservers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def run_processes(base_url: str, reservers: int, attempts: int, events: int,
+                  users: int, max_retries: int) -> List[Outcome]:
+    jobs = [(base_url, i, attempts, events, users, max_retries) for i in range(reservers)]
+    with multiprocessing.get_context("spawn").Pool(reservers) as pool:
+        return [o for outcomes in pool.map(_process_reserver, jobs) for o in outcomes]
+
+
+async def run_asyncio(client: httpx.AsyncClient, reservers: int, attempts: int,
+                      events: int, users: int, max_retries: int) -> List[Outcome]:
+    async def reserver(seed: int) -> List[Outcome]:
+        rng = random.Random(seed)
+        outcomes = []
+        for _ in range(attempts):
+            payload = _payload(rng, events, users)
+            response, retries = None, 0
+            while True:
+                try:
+                    response = await client.post("/tickets/reserve", json=payload)
+                except httpx.HTTPError:
+                    response = None
+                if (response is None or response.status_code >= 500) and retries < max_retries:
+                    retries += 1
+                    continue
+                break
+            outcomes.append(_record(payload, response, retries))
+        return outcomes
+
+    batches = await asyncio.gather(*(reserver(i) for i in range(reservers)))
+    return [o for batch in batches for o in batch]
+
+
+# ═══════════════════════════════════════════════════════════
+# CONTENÇÃO (Postgres): amostras de espera por lock
+# ═══════════════════════════════════════════════════════════
+
+
+class LockWaitSampler(threading.Thread):
+    """Amostra pg_stat_activity a cada `interval` s durante o teste."""
+
+    def __init__(self, engine, interval: float = 0.05) -> None:
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.interval = interval
+        self.samples = 0
+        self.waiting_total = 0
+        self.waiting_max = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        if self.engine.dialect.name != "postgresql":
+            return
+        with self.engine.connect() as conn:
+            while not self._stop_event.is_set():
+                waiting = conn.execute(text(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE wait_event_type = 'Lock' AND datname = current_database()"
+                )).scalar()
+                conn.rollback()
+                self.samples += 1
+                self.waiting_total += waiting
+                self.waiting_max = max(self.waiting_max, waiting)
+                self._stop_event.wait(self.interval)
+
+    def stop(self) -> dict:
+        self._stop_event.set()
+        self.join()
+        if not self.samples:
+            return {}
+        return {
+            "samples": self.samples,
+            "avg_waiting_on_lock": round(self.waiting_total / self.samples, 2),
+            "max_waiting_on_lock": self.waiting_max,
+        }
+
+
+# ═══════════════════════════════════════════════════════════
+# INVARIANTES
+# ═══════════════════════════════════════════════════════════
+
+
+def check_invariants(engine, outcomes: List[Outcome], events: int) -> List[str]:
+    violations: List[str] = []
+
+    # 1. Nenhum ticket vendido duas vezes
+    winners: Dict[int, List[int]] = defaultdict(list)
+    successes_per_event: Counter = Counter()
+    for event_id, user_id, status, ticket_id, _ in outcomes:
+        if status == 201:
+            winners[ticket_id].append(user_id)
+            successes_per_event[event_id] += 1
+    for ticket_id, users in winners.items():
+        if len(users) > 1:
+            violations.append(f"ticket {ticket_id} vendido {len(users)}x (users {users})")
+
+    with engine.connect() as conn:
+        owners = dict(conn.execute(text(
+            "SELECT id, user_id FROM tickets WHERE is_reserved"
+        )).all())
+        for ticket_id, users in winners.items():
+            if owners.get(ticket_id) != users[-1]:
+                violations.append(
+                    f"ticket {ticket_id}: dono no banco {owners.get(ticket_id)}, "
+                    f"respostas 201 para {users}")
+
+        # 2. Inventário por evento
+        rows = conn.execute(text(
+            "SELECT event_id, COUNT(*), "
+            "SUM(CASE WHEN is_reserved THEN 1 ELSE 0 END) "
+            "FROM tickets WHERE event_id <= :events GROUP BY event_id"
+        ), {"events": events}).all()
+        for event_id, inventory, reserved in rows:
+            reserved = reserved or 0
+            if reserved > inventory:
+                violations.append(f"evento {event_id}: {reserved} vendidos > {inventory}")
+            if successes_per_event[event_id] != reserved:
+                violations.append(
+                    f"evento {event_id}: {successes_per_event[event_id]} respostas 201, "
+                    f"{reserved} reservados no banco")
+
+        # 3. Limite por usuário
+        for user_id, active in conn.execute(text(
+            "SELECT user_id, COUNT(*) FROM tickets "
+            "WHERE is_reserved GROUP BY user_id HAVING COUNT(*) > :limit"
+        ), {"limit": USER_LIMIT}).all():
+            violations.append(f"usuário {user_id}: {active} reservas ativas (> {USER_LIMIT})")
+
+        # 4. Rollups consistentes
+        for event_id, rollup, actual in conn.execute(text(
+            "SELECT s.event_id, s.reserved_count, "
+            "(SELECT COUNT(*) FROM tickets t WHERE t.event_id = s.event_id AND t.is_reserved) "
+            "FROM event_sales_totals s"
+        )).all():
+            if rollup != actual:
+                violations.append(
+                    f"evento {event_id}: rollup diz {rollup}, tickets dizem {actual}")
+
+    return violations
+
+
+def contention_stats(outcomes: List[Outcome], elapsed: float) -> dict:
+    statuses = Counter(status for _, _, status, _, _ in outcomes)
+    total = len(outcomes)
+    return {
+        "requests": total,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+        "conflict_rate": round(statuses[409] / total, 4) if total else 0.0,
+        "client_retries": sum(retries for *_, retries in outcomes),
+    }
+
+
+# ═══════════════════════════════════════════════════════════
+# MAIN
+# ═══════════════════════════════════════════════════════════
+
+
+def _in_process_app():
+    if "DATABASE_URL" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix="race-"), "race.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from app.config import Base, engine
+    from app.main import app
+
+    engine.echo = False
+    Base.metadata.create_all(engine)
+    return app, engine
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Harness de race conditions")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url")
+    target.add_argument("--in-process", action="store_true")
+    parser.add_argument("--database-url",
+                        help="Banco para checar invariantes (com --base-url)")
+    parser.add_argument("--mode", choices=["threads", "processes", "asyncio"],
+                        default="threads")
+    parser.add_argument("-n", "--reservers", type=int, default=32)
+    parser.add_argument("--attempts", type=int, default=10,
+                        help="Reservas tentadas por reservador")
+    parser.add_argument("--events", type=int, default=3,
+                        help="Quantos eventos do seed disputar (50 ingressos cada)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--retries", type=int, default=0,
+                        help="Retries do cliente em 5xx/erro de rede")
+    args = parser.parse_args(argv)
+
+    kwargs = dict(attempts=args.attempts, events=args.events,
+                  users=args.users, max_retries=args.retries)
+
+    if args.in_process:
+        if args.mode == "processes":
+            parser.error("--mode processes precisa de --base-url")
+        app, engine = _in_process_app()
+        from fastapi.testclient import TestClient
+
+        make_client = lambda: TestClient(app)  # noqa: E731
+        async_transport = httpx.ASGITransport(app=app)
+        base_url = "http://testserver"
+    else:
+        if not args.database_url:
+            parser.error("--base-url precisa de --database-url para checar o banco")
+        engine = create_engine(args.database_url)
+        base_url = args.base_url
+        make_client = lambda: httpx.Client(base_url=base_url, timeout=30)  # noqa: E731
+        async_transport = None
+
+    with make_client() as client:
+        client.post("/seed").raise_for_status()
+
+    sampler = LockWaitSampler(engine)
+    sampler.start()
+    started = time.perf_counter()
+
+    if args.mode == "threads":
+        outcomes = run_threads(make_client, args.reservers, **kwargs)
+    elif args.mode == "processes":
+        outcomes = run_processes(base_url, args.reservers, **kwargs)
+    else:
+        async def go():
+            async with httpx.AsyncClient(base_url=base_url, transport=async_transport,
+                                         timeout=30) as client:
+                return await run_asyncio(client, args.reservers, **kwargs)
+        outcomes = asyncio.run(go())
+
+    elapsed = time.perf_counter() - started
+    locks = sampler.stop()
+
+    stats = contention_stats(outcomes, elapsed)
+    print(f"\nModo: {args.mode}  reservadores: {args.reservers}  "
+          f"tentativas: {stats['requests']}")
+    print(f"Throughput: {stats['throughput_rps']} req/s  "
+          f"Status: {stats['status_codes']}  409: {stats['conflict_rate']:.1%}  "
+          f"retries: {stats['client_retries']}")
+    if locks:
+        print(f"Espera por lock: {locks}")
+
+    violations = check_invariants(engine, outcomes, args.events)
+    if violations:
+        print(f"\n❌ {len(violations)} invariante(s) violado(s):")
+        for violation in violations[:50]:
+            print("  - " + violation)
+        return 1
+    print("\n✓ Invariantes OK (sem overselling, sem dono duplo, limite respeitado)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
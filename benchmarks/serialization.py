@@ -0,0 +1,109 @@
+"""
+Custo de serialização por 10k itens (sem banco, sem HTTP).
+
+Compara os caminhos de uma listagem de eventos:
+- pydantic:   EventResponse.model_validate (from_attributes) por objeto +
+              jsonable_encoder + json.dumps (o caminho com response_model)
+- encoder:    dicts montados à mão + jsonable_encoder + json.dumps
+              (rota sem response_model devolvendo list[dict])
+- stdlib:     dicts + json.dumps direto
+- fast:       dicts + app.serialization.dumps (orjson se instalado)
+- adapter:    TypeAdapter(List[EventResponse]).dump_json (pydantic-core)
+
+Exemplo:
+    python -m benchmarks.serialization --items 10000 --repeat 5
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.schemas import EventResponse
+from app.serialization import dumps, orjson
+
+
+def make_objects(count: int) -> List[SimpleNamespace]:
+    """Objetos com os atributos do model Event (como viriam do ORM)."""
+    base = datetime(2026, 1, 1, 20, 0)
+    return [
+        SimpleNamespace(
+            id=i, name=f"Concert {i}", description=f"Evento número {i}",
+            date=base + timedelta(days=i % 365), price=50.0 + i % 100,
+            creator_id=1 + i % 10,
+        )
+        for i in range(count)
+    ]
+
+
+def as_dicts(objects) -> List[dict]:
+    return [
+        {"id": o.id, "name": o.name, "description": o.description,
+         "date": o.date, "price": o.price, "creator_id": o.creator_id}
+        for o in objects
+    ]
+
+
+def build_cases(objects) -> Dict[str, Callable[[], bytes]]:
+    adapter = TypeAdapter(List[EventResponse])
+
+    def pydantic_path() -> bytes:
+        models = [EventResponse.model_validate(o) for o in objects]
+        return json.dumps(jsonable_encoder(models)).encode()
+
+    def encoder_path() -> bytes:
+        return json.dumps(jsonable_encoder(as_dicts(objects))).encode()
+
+    def stdlib_path() -> bytes:
+        return json.dumps(as_dicts(objects), default=str).encode()
+
+    def fast_path() -> bytes:
+        return dumps(as_dicts(objects))
+
+    def adapter_path() -> bytes:
+        return adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+
+    return {
+        "pydantic": pydantic_path,
+        "encoder": encoder_path,
+        "stdlib": stdlib_path,
+        "fast": fast_path,
+        "adapter": adapter_path,
+    }
+
+
+def run(items: int, repeat: int) -> Dict[str, float]:
+    """Melhor tempo (ms) de cada caminho, normalizado para 10k itens."""
+    objects = make_objects(items)
+    results = {}
+    for name, case in build_cases(objects).items():
+        case()  # aquecimento
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            case()
+            best = min(best, time.perf_counter() - start)
+        results[name] = best * 1000 * 10_000 / items
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Custo de serialização JSON")
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"Encoder rápido: {'orjson' if orjson is not None else 'json (stdlib)'}")
+    results = run(args.items, args.repeat)
+    baseline = results["pydantic"]
+    print(f"{'caminho':<10} {'ms/10k':>10} {'vs pydantic':>12}")
+    for name, ms in results.items():
+        print(f"{name:<10} {ms:>10.2f} {baseline / ms:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
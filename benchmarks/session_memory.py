@@ -0,0 +1,77 @@
+"""
+Memória do store de sessões com muitos logins (sem banco, sem HTTP).
+
+Cria `--sessions` sessões pelo SessionStore (token + SHA-256 + put) e
+mede o RSS a cada 10% do caminho. Com teto (--max-entries), passado o
+teto o RSS fica plano: cada login novo tira a sessão menos usada. Com
+--max-entries 0 (sem teto) dá para ver quanto custa cada sessão.
+
+No final mede o lookup (o que a reserva autenticada paga por request).
+
+Exemplo:
+    python -m benchmarks.session_memory --sessions 1000000 --max-entries 100000
+    python -m benchmarks.session_memory --sessions 1000000 --max-entries 0
+"""
+import argparse
+import gc
+import os
+import time
+
+import psutil
+
+from app.sessions import MemorySessionStore, SessionStore
+
+MB = 1024 * 1024
+
+
+def run(sessions: int, max_entries: int, lookups: int = 100_000) -> dict:
+    process = psutil.Process(os.getpid())
+    store = SessionStore(ttl=3600, memory=MemorySessionStore(
+        max_entries=max_entries or sessions))
+    start_rss = process.memory_info().rss
+    step = max(1, sessions // 10)
+    samples = []
+    tokens = []
+    started = time.perf_counter()
+    for i in range(1, sessions + 1):
+        token, _ = store.create(user_id=i)
+        if len(tokens) < 1000:
+            tokens.append(token)
+        elif i > sessions - 1000:
+            tokens[i % 1000] = token  # os mais recentes: ainda no store
+        if i % step == 0:
+            gc.collect()
+            samples.append((i, len(store.memory),
+                            (process.memory_info().rss - start_rss) / MB))
+    create_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    hits = sum(store.get(tokens[i % len(tokens)]) is not None for i in range(lookups))
+    lookup_seconds = time.perf_counter() - started
+    return {
+        "samples": samples,
+        "create_us": create_seconds / sessions * 1e6,
+        "lookup_us": lookup_seconds / lookups * 1e6,
+        "hit_ratio": hits / lookups,
+        "stats": store.stats(),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="RSS do store de sessões")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--max-entries", type=int, default=100_000,
+                        help="Teto do store (0 = sem teto)")
+    args = parser.parse_args(argv)
+
+    result = run(args.sessions, args.max_entries)
+    print(f"{'logins':>10} {'no store':>10} {'RSS +MB':>10}")
+    for created, stored, rss in result["samples"]:
+        print(f"{created:>10} {stored:>10} {rss:>10.1f}")
+    print(f"\ncriar sessão: {result['create_us']:.1f} µs  "
+          f"lookup: {result['lookup_us']:.2f} µs  (hits {result['hit_ratio']:.0%})")
+    print(f"store: {result['stats']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Tempo de cold start de um worker (o que o autoscaler espera).
+
+Cada medição roda num processo NOVO (import frio) e reporta:
+- import_ms:        `import app.main` (não pode abrir conexão nenhuma)
+- startup_ms:       lifespan: cria o engine + warm-up
+- first_request_ms: 1ª reserva depois do startup (conexão + compilação SQL
+                    se o warm-up estiver desligado)
+- second_request_ms: 2ª reserva (referência "quente")
+
+Compara warm-up ligado (DB_WARMUP_CONNECTIONS) e desligado (=0).
+
+Exemplo:
+    python -m benchmarks.startup --runs 5
+    DATABASE_URL=postgresql://... python -m benchmarks.startup
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+METRICS = ("import_ms", "startup_ms", "first_request_ms", "second_request_ms")
+
+
+async def _measure(user_id: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    result = {"import_ms": (imported - started) * 1000}
+    async with app.router.lifespan_context(app):
+        result["startup_ms"] = (time.perf_counter() - imported) * 1000
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport,
+                                     base_url="http://testserver") as client:
+            for key in ("first_request_ms", "second_request_ms"):
+                start = time.perf_counter()
+                response = await client.post("/tickets/reserve", json={
+                    "event_id": 1, "user_id": user_id})
+                result[key] = (time.perf_counter() - start) * 1000
+                response.raise_for_status()
+                # Devolve o ingresso: o banco fica igual entre as medições
+                await client.post(f"/tickets/{response.json()['ticket_id']}/cancel",
+                                  json={"user_id": user_id})
+    return result
+
+
+async def _seed() -> None:
+    from app.config import Base, engine
+    from app.main import app
+
+    Base.metadata.create_all(engine)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                 base_url="http://testserver") as client:
+        (await client.post("/seed")).raise_for_status()
+
+
+def _child(args: List[str], env: dict) -> str:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", *args],
+        env=env, capture_output=True, text=True, check=True)
+    return completed.stdout.strip().splitlines()[-1]
+
+
+def run(runs: int, warmup_connections: int) -> Dict[str, Dict[str, float]]:
+    env = dict(os.environ)
+    if "DATABASE_URL" not in env:
+        path = os.path.join(tempfile.mkdtemp(prefix="startup-"), "bench.db")
+        env["DATABASE_URL"] = f"sqlite:///{path}"
+    _child(["--child-seed"], env)
+
+    results = {}
+    for label, connections in (("warm-up", warmup_connections), ("sem warm-up", 0)):
+        samples = []
+        for i in range(runs):
+            child_env = {**env, "DB_WARMUP_CONNECTIONS": str(connections)}
+            samples.append(json.loads(_child(["--child", str(1 + i % 10)], child_env)))
+        results[label] = {
+            metric: round(statistics.median(s[metric] for s in samples), 2)
+            for metric in METRICS
+        }
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup-connections", type=int, default=2)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-seed", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child_seed:
+        asyncio.run(_seed())
+        return
+    if args.child is not None:
+        # Última linha do stdout (o echo do SQLite escreve antes dela)
+        print(json.dumps(asyncio.run(_measure(args.child))))
+        return
+
+    results = run(args.runs, args.warmup_connections)
+    print(f"Mediana de {args.runs} processos (ms)")
+    print(f"{'':<12}" + "".join(f"{m:>20}" for m in METRICS))
+    for label, data in results.items():
+        print(f"{label:<12}" + "".join(f"{data[m]:>20.2f}" for m in METRICS))
+
+
+if __name__ == "__main__":
+    main()
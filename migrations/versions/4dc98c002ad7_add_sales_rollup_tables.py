@@ -0,0 +1,66 @@
+"""Add sales rollup tables
+
+Revision ID: 4dc98c002ad7
+Revises: a4669aa2c4e0
+Create Date: 2026-10-19 10:03:17.552091
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4dc98c002ad7'
+down_revision: Union[str, Sequence[str], None] = 'a4669aa2c4e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sales_rollups',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('reserved_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('event_id', 'bucket_start')
+    )
+    op.create_table('event_sales_totals',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('reserved_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+    with op.batch_alter_table('event_sales_totals', schema=None) as batch_op:
+        batch_op.create_index('ix_event_sales_totals_reserved_count', ['reserved_count'], unique=False)
+
+    # Backfill a partir dos dados existentes (uma única varredura de tickets)
+    op.execute(
+        "INSERT INTO event_sales_totals (event_id, capacity, reserved_count, revenue) "
+        "SELECT event_id, COUNT(*), "
+        "SUM(CASE WHEN is_reserved THEN 1 ELSE 0 END), "
+        "COALESCE(SUM(CASE WHEN is_reserved THEN price ELSE 0 END), 0) "
+        "FROM tickets WHERE event_id IS NOT NULL GROUP BY event_id"
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        minute = "date_trunc('minute', reserved_at)"
+    else:
+        minute = "strftime('%Y-%m-%d %H:%M:00.000000', reserved_at)"
+    op.execute(
+        "INSERT INTO sales_rollups (event_id, bucket_start, reserved_count, revenue) "
+        f"SELECT event_id, {minute}, COUNT(*), COALESCE(SUM(price), 0) "
+        "FROM tickets WHERE is_reserved AND reserved_at IS NOT NULL "
+        f"GROUP BY event_id, {minute}"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('event_sales_totals', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_sales_totals_reserved_count')
+
+    op.drop_table('event_sales_totals')
+    op.drop_table('sales_rollups')
@@ -0,0 +1,38 @@
+"""Use autoincrement ids for outbox messages
+
+Revision ID: 6767dc40b669
+Revises: 91140dcac92b
+Create Date: 2026-10-19 02:52:23.238934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6767dc40b669'
+down_revision: Union[str, Sequence[str], None] = '91140dcac92b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _recreate_outbox(autoincrement: bool) -> None:
+    # AUTOINCREMENT só existe no CREATE TABLE: o batch recria a tabela e
+    # copia as linhas (o sqlite_sequence parte do maior id copiado)
+    with op.batch_alter_table('outbox_messages', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': autoincrement}):
+        pass
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Postgres: o id já vem de uma sequence, que não reusa valores apagados
+    if op.get_bind().dialect.name == 'sqlite':
+        _recreate_outbox(True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        _recreate_outbox(False)
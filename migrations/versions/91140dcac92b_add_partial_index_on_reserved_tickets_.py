@@ -0,0 +1,37 @@
+"""Add partial index on reserved tickets per user
+
+Revision ID: 91140dcac92b
+Revises: a0beeec629c4
+Create Date: 2026-10-19 02:48:57.198890
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.backfill import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '91140dcac92b'
+down_revision: Union[str, Sequence[str], None] = 'a0beeec629c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _reserved_predicate() -> str:
+    # O mesmo `is_reserved IS ...` que Ticket.is_reserved.is_(True) gera em
+    # cada banco (ver app/models.py): o planner do SQLite compara o termo
+    return "is_reserved IS 1" if op.get_bind().dialect.name == "sqlite" else "is_reserved IS true"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY (e por partição no Postgres): tickets é a tabela grande
+    create_index_concurrently("ix_tickets_user_reserved", "tickets", ["user_id"],
+                              where=_reserved_predicate())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_tickets_user_reserved", "tickets")
@@ -0,0 +1,111 @@
+"""Partition tickets by event date
+
+Revision ID: a4669aa2c4e0
+Revises: d1bc059c3f4d
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.partitioning import (
+    DEFAULT_PARTITION, PARTITION_BY, create_partition_sql, month_bounds,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4669aa2c4e0'
+down_revision: Union[str, Sequence[str], None] = 'd1bc059c3f4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _partition_tickets() -> None:
+    """Recria `tickets` como tabela particionada (só PostgreSQL)."""
+    bind = op.get_bind()
+
+    op.execute("ALTER TABLE tickets RENAME TO tickets_unpartitioned")
+    op.execute(
+        "CREATE TABLE tickets "
+        "(LIKE tickets_unpartitioned INCLUDING DEFAULTS) "
+        f"PARTITION BY {PARTITION_BY}"
+    )
+    # PK/UNIQUE em tabela particionada precisa conter a chave de partição
+    op.execute("ALTER TABLE tickets ADD PRIMARY KEY (id, event_date)")
+    op.execute(
+        "ALTER TABLE tickets ADD FOREIGN KEY (event_id) REFERENCES events (id)")
+    op.execute(
+        "ALTER TABLE tickets ADD FOREIGN KEY (user_id) REFERENCES users (id)")
+    op.execute(
+        f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF tickets DEFAULT")
+
+    # Uma partição por mês que já tem tickets
+    low, high = bind.execute(sa.text(
+        "SELECT MIN(event_date), MAX(event_date) FROM tickets_unpartitioned"
+    )).one()
+    if low is not None:
+        month, _ = month_bounds(low)
+        while month <= high:
+            op.execute(create_partition_sql(month))
+            _, month = month_bounds(month)
+
+    op.execute("INSERT INTO tickets SELECT * FROM tickets_unpartitioned")
+    # A sequence do id pertence à tabela antiga: transferir antes do DROP
+    op.execute("ALTER SEQUENCE tickets_id_seq OWNED BY tickets.id")
+    op.execute("DROP TABLE tickets_unpartitioned")
+
+    # Índices no pai são replicados em cada partição (índices pequenos)
+    op.create_index('ix_tickets_id', 'tickets', ['id'])
+    op.create_index('ix_tickets_event_id', 'tickets', ['event_id'])
+    op.create_index('ix_tickets_is_reserved', 'tickets', ['is_reserved'])
+
+
+def _unpartition_tickets() -> None:
+    """Volta `tickets` para tabela comum (só PostgreSQL)."""
+    op.execute("ALTER TABLE tickets RENAME TO tickets_partitioned")
+    op.execute(
+        "CREATE TABLE tickets "
+        "(LIKE tickets_partitioned INCLUDING DEFAULTS)")
+    op.execute("ALTER TABLE tickets ADD PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE tickets ADD FOREIGN KEY (event_id) REFERENCES events (id)")
+    op.execute(
+        "ALTER TABLE tickets ADD FOREIGN KEY (user_id) REFERENCES users (id)")
+    op.execute("INSERT INTO tickets SELECT * FROM tickets_partitioned")
+    op.execute("ALTER SEQUENCE tickets_id_seq OWNED BY tickets.id")
+    op.execute("DROP TABLE tickets_partitioned CASCADE")
+
+    op.create_index('ix_tickets_id', 'tickets', ['id'])
+    op.create_index('ix_tickets_event_id', 'tickets', ['event_id'])
+    op.create_index('ix_tickets_is_reserved', 'tickets', ['is_reserved'])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('event_date', sa.DateTime(), nullable=True))
+
+    # Backfill: tickets órfãos recebem a data atual para não ficarem NULL
+    op.execute(
+        "UPDATE tickets SET event_date = COALESCE("
+        "(SELECT events.date FROM events WHERE events.id = tickets.event_id), "
+        "CURRENT_TIMESTAMP)"
+    )
+
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.alter_column(
+            'event_date', existing_type=sa.DateTime(), nullable=False)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        _partition_tickets()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        _unpartition_tickets()
+
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_column('event_date')
@@ -1,135 +1,109 @@
 #!/usr/bin/env python
 """
-Stress test: Simula 50 usuários criando sessões (com e sem cleanup).
-Mostra na prática o memory leak vs memory cleanup.
-"""
+Stress test: muitos logins contra o servidor rodando, olhando a RAM.
 
-import requests
-import time
-import json
-
-BASE_URL = "http://localhost:8000"
+Cada login abre uma sessão no store em memória (app/sessions.py). O store
+tem teto (SESSION_MAX_ENTRIES): depois dele, cada login novo derruba a
+sessão menos usada e a RAM para de crescer.
 
+Rode o servidor com um teto pequeno para ver o platô rápido:
 
-def get_memory():
-    """Retorna uso de RAM em MB."""
-    response = requests.get(f"{BASE_URL}/memory")
-    data = response.json()
-    return data["rss_mb"]
-
-
-def test_sessions_bad():
-    """Testa endpóint RUIM (memory leak)."""
-    print("\n" + "="*60)
-    print("TESTE1: Memory Leak (RUIM) - /sessions-bad")
-    print("="*60)
-    print("Criando 50 sessẽs SEM cleanup...")
-    print("Observe a RAM crescer cada vez mais!\n")
-
-    print(f"{'Iteração':<10} {'RAM (MB)'} {'Tendência':<15}")
-    print("-" * 40)
-
-    for i in range(1, 51):
-        # Fazer requisição
-        response = requests.post(
-            f"{BASE_URL}/sessions-bad",
-            params={"user_id": i},
-            timeout=5)
-        if response.status_code != 200:
-            print(f"Erro na iteração {i}: {response.status_code}")
-            continue
-
-        # checar ram
-        ram = get_memory()
+    ADMIN_TOKEN=dev SESSION_MAX_ENTRIES=500 poetry run uvicorn app.main:app
+    ADMIN_TOKEN=dev python stress_test.py --logins 3000
 
-        # Mostrar tendência
-        if i > 1:
-            trend = "↑ (crescendo)" if i % 10 == 0 else ""
+(1 milhão de sessões, sem HTTP: python -m benchmarks.session_memory)
+"""
 
-        else:
-            trend = ""
+import argparse
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-        if i % 5 == 0 or i == 1 or i == 50:
-            print(F"{i:<10} {ram:<15.2f} {trend:<15}")
+import requests
 
-        time.sleep(0.1)  # 100ms entre requisições
+BASE_URL = "http://localhost:8000"
+# Mesmo valor do ADMIN_TOKEN do servidor (o /admin/memory é protegido)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PASSWORD = "Stress123!"
 
-    final_ram = get_memory()
-    print(f"\nRAMFINAL: {final_ram:.2f} MB")
-    print("Resultado: RAM cresceu constantemente (VAZAMENTO)")
-    print("Explicação: Cada sesão fica armazenada forever. Sem cleanup!")
 
+def get_memory():
+    """RSS em MB e estado do store de sessões."""
+    response = requests.get(f"{BASE_URL}/admin/memory",
+                            headers={"X-Admin-Token": ADMIN_TOKEN})
+    response.raise_for_status()
+    data = response.json()
+    return data["rss_mb"], data["auth_sessions"]
 
-def test_sessions_good():
-    """Testa endpoint BOM (com cleanup)."""
-    print("\n" + "="*60)
-    print("TESTE 2: Memory Cleanup (BOM) - /sessions-good")
-    print("="*60)
-    print("Criando 50 sessões COM cleanup automático...")
-    print("Observe a RAM ficar estável!\n")
 
-    print(f"{'Iteração':<10} {'RAM (MB)':<15} {'Status':<15}")
-    print("-" * 40)
+def create_user():
+    email = f"stress-{uuid.uuid4().hex[:8]}@example.com"
+    response = requests.post(f"{BASE_URL}/users", json={
+        "name": "Stress", "email": email, "password": PASSWORD}, timeout=10)
+    response.raise_for_status()
+    return email
 
-    for i in range(1, 51):
-        # Fazer requisição
-        response = requests.post(
-            f"{BASE_URL}/sessions-good",
-            params={"user_id": i},
-            timeout=5
-        )
-        if response.status_code != 200:
-            print(f"Erro na iteração {i}: {response.status_code}")
-            continue
 
-        # Checar RAM
-        ram = get_memory()
+def login(session, email):
+    response = session.post(f"{BASE_URL}/auth/login",
+                            json={"email": email, "password": PASSWORD}, timeout=30)
+    return response.status_code
 
-        # Status
-        status = "Estável ✓" if i > 5 else "Aquecendo..."
 
-        if i % 5 == 0 or i == 1 or i == 50:
-            print(f"{i:<10} {ram:<15.2f} {status:<15}")
+def test_session_store(logins, concurrency):
+    print("\n" + "=" * 60)
+    print(f"{logins} logins ({concurrency} em paralelo)")
+    print("=" * 60)
+    email = create_user()
 
-        time.sleep(0.1)  # 100ms entre requisições
+    print(f"{'Logins':<10} {'RAM (MB)':<12} {'No store':<10} {'Despejadas':<12}")
+    print("-" * 46)
+    step = max(1, logins // 10)
+    statuses = {}
+    with ThreadPoolExecutor(concurrency) as pool, requests.Session() as http:
+        done = 0
+        while done < logins:
+            batch = min(step, logins - done)
+            for status in pool.map(lambda _: login(http, email), range(batch)):
+                statuses[status] = statuses.get(status, 0) + 1
+            done += batch
+            ram, store = get_memory()
+            print(f"{done:<10} {ram:<12.2f} {store['entries']:<10} {store['evictions']:<12}")
 
-    final_ram = get_memory()
-    print(f"\nRAM FINAL: {final_ram:.2f} MB")
-    print("Resultado: RAM permaneceu estável (SEM VAZAMENTO!)")
-    print("Explicação: Cleanup automático libera memória expirada.")
+    print(f"\nStatus: {statuses}  (503 = pool de hash cheio, tente menos paralelo)")
+    print("Resultado esperado: 'No store' para no teto e a RAM fica estável.")
 
 
 def main():
-    print("\n" + "█"*60)
-    print("MEMORY LEAK STRESS TEST - Ticket Reservation API")
-    print("█"*60)
+    parser = argparse.ArgumentParser(description="Stress de sessões de login")
+    parser.add_argument("--logins", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print("\n" + "█" * 60)
+    print("SESSION STORE STRESS TEST - Ticket Reservation API")
+    print("█" * 60)
 
-    # Testar conexão
     try:
         response = requests.get(f"{BASE_URL}/health", timeout=2)
         if response.status_code != 200:
             print("❌ FastAPI não está respondendo!")
-            print("Execute primeiro: poetry run uvicorn app.main:app --reload")
             return
+        ram, _ = get_memory()
         print("✓ FastAPI está rodando!")
-        print(f"✓ RAM inicial: {get_memory():.2f} MB")
+        print(f"✓ RAM inicial: {ram:.2f} MB")
     except requests.ConnectionError:
         print("❌ Não consegui conectar ao FastAPI!")
-        print("Execute em outro terminal: poetry run uvicorn app.main:app --reload")
+        print("Execute em outro terminal: ADMIN_TOKEN=dev poetry run uvicorn app.main:app")
+        return
+    except requests.HTTPError as exc:
+        print(f"❌ /admin/memory recusou ({exc}): confira o ADMIN_TOKEN")
         return
 
-    # Rodar testes
-    test_sessions_bad()
-    time.sleep(2)  # Pausa entre testes
-    test_sessions_good()
-
-    print("\n" + "█"*60)
-    print("CONCLUSÃO")
-    print("█"*60)
-    print("❌ /sessions-bad: RAM cresceu (memory leak)")
-    print("✓ /sessions-good: RAM estável (cleanup correto)")
-    print("\nVocê acabou de VER na prática a diferença!")
-    print("█"*60 + "\n")
+    start = time.time()
+    test_session_store(args.logins, args.concurrency)
+    print(f"\nTempo total: {time.time() - start:.1f}s")
 
 
 if __name__ == "__main__":